@@ -0,0 +1,289 @@
+import asyncio
+import datetime as _dt
+import json
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import httpx
+
+
+# the detector's answer for an outage (proxy or service unavailable); a plain 500 means it failed on the batch
+UNAVAILABLE = (502, 503, 504)
+
+
+def build_detector_payload(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a reporter report onto the AI backend's LoginEvent model."""
+    now = _dt.datetime.utcnow()
+    payload = {
+        'event_id': f'evt-{uuid4().hex[:8]}',
+        'timestamp': now.isoformat() + 'Z',
+        'username': report.get('username'),
+        # site picks the detector's per-site rules, ip_address feeds its geo-IP lookup
+        'site': report.get('site'),
+        'device_fingerprint': report.get('device_fingerprint') or '',
+        'location': report.get('location') or '',
+        'typing_speed': report.get('typing_speed') or 0.0,
+        # the detector reads HH:MM (or an ISO datetime's clock time)
+        'access_time': report.get('access_time') or now.strftime('%H:%M'),
+        'ip_address': report.get('ip_address'),
+    }
+    # include any extra fields under 'additional' key (exclude keys we've already set)
+    known = set(payload.keys())
+    payload['additional'] = {k: v for k, v in report.items() if k not in known}
+    return payload
+
+
+class Forwarder:
+    """Forward suspicious-login reports to the detector in micro-batches.
+
+    ``submit`` never blocks the request path: reports go into a bounded
+    asyncio queue, and when that queue is full (or the forwarder is not
+    running) they are appended to an on-disk NDJSON spill file instead.
+    One worker task drains the queue into batches for the detector's batch
+    endpoint over a single pooled ``httpx.AsyncClient``, retrying failed
+    batches with capped exponential backoff. Batches that still fail are
+    spilled, and the spill file is replayed after the next successful send.
+
+    A replay renames the spill file to ``<spill>.sending`` and streams it
+    back ``batch_size`` reports at a time; the file is removed only once
+    every chunk is acknowledged. If the detector goes away mid-replay, the
+    unsent rest is kept in ``.sending``, and a ``.sending`` left by a crash
+    is replayed when the forwarder starts (reports sent just before a crash
+    may be sent twice).
+
+    Spill file I/O runs on one dedicated thread, never on the event loop;
+    being a single thread it also keeps appends and replays in order.
+    """
+
+    def __init__(self, url: str, spill_path: str, max_queue: int = 10000, batch_size: int = 100,
+                 max_wait: float = 0.05, max_retries: int = 4, backoff_base: float = 0.2,
+                 backoff_max: float = 5.0, timeout: float = 10.0, max_connections: int = 20,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = url
+        self.spill_path = spill_path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.transport = transport
+        self.client: Optional[httpx.AsyncClient] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._io = _spill_executor()
+        self.stats = {
+            'submitted': 0, 'sent': 0, 'rejected': 0, 'retries': 0, 'failed_batches': 0,
+            'spilled': 0, 'replayed': 0, 'batches': 0,
+            'latency_ms_last': 0.0, 'latency_ms_max': 0.0, 'latency_ms_total': 0.0,
+        }
+
+    async def start(self):
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            transport=self.transport,
+        )
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Flush what is queued (best effort), spill the rest, close the pool."""
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            leftover = []
+            while not self.queue.empty():
+                leftover.append(self.queue.get_nowait())
+            self._spill(leftover)
+        # wait for queued spill writes before reporting stopped; a fresh
+        # executor (its thread starts on first use) takes spills after stop
+        io, self._io = self._io, _spill_executor()
+        await asyncio.get_running_loop().run_in_executor(None, io.shutdown)
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def submit(self, report: Dict[str, Any]) -> bool:
+        """Queue a report; returns False if it had to be spilled to disk."""
+        self.stats['submitted'] += 1
+        payload = build_detector_payload(report)
+        if self.queue is None:
+            self._spill([payload])
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            self._spill([payload])
+            return False
+
+    def metrics(self) -> Dict[str, Any]:
+        batches = self.stats['batches']
+        return {
+            **{k: v for k, v in self.stats.items() if k != 'latency_ms_total'},
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'queue_capacity': self.max_queue,
+            'spill_bytes': os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0,
+            'latency_ms_avg': self.stats['latency_ms_total'] / batches if batches else 0.0,
+        }
+
+    # --- worker ---
+    async def _run(self):
+        # a replay cut short by a crash or an outage left its rest behind
+        await self._replay_spill()
+        while True:
+            batch = [await self.queue.get()]
+            if self.queue.qsize() < self.batch_size - 1:
+                # give concurrent requests a moment to fill the batch
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                if await self._send_with_retry(batch):
+                    await self._replay_spill()
+                else:
+                    self._spill(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _send_with_retry(self, batch: List[Dict[str, Any]], retries: Optional[int] = None) -> bool:
+        """Deliver one batch; False means the detector was unreachable and the batch should be spilled.
+
+        A batch the detector keeps failing on with a 500, while otherwise up,
+        holds a report it cannot process. Such a batch is split in halves
+        that are sent on their own, down to single reports, and a single
+        report that still fails is dropped as rejected. Spilling it instead
+        would replay it, and every good report next to it, forever.
+        """
+        retries = self.max_retries if retries is None else retries
+        unreachable = False
+        for attempt in range(retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+            started = time.perf_counter()
+            try:
+                resp = await self.client.post(self.url, json=batch)
+            except httpx.HTTPError:
+                unreachable = True
+                continue
+            if resp.status_code >= 500:
+                unreachable = unreachable or resp.status_code in UNAVAILABLE
+                continue
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self.stats['batches'] += 1
+            self.stats['latency_ms_last'] = elapsed
+            self.stats['latency_ms_total'] += elapsed
+            self.stats['latency_ms_max'] = max(self.stats['latency_ms_max'], elapsed)
+            if resp.status_code >= 400:
+                # the detector refused the batch itself; retrying will not help
+                self.stats['rejected'] += len(batch)
+            else:
+                invalid = _invalid_count(resp)
+                self.stats['rejected'] += invalid
+                self.stats['sent'] += len(batch) - invalid
+            return True
+        self.stats['failed_batches'] += 1
+        if unreachable:
+            return False
+        if len(batch) == 1:
+            self.stats['rejected'] += 1
+            return True
+        mid = len(batch) // 2
+        for half in (batch[:mid], batch[mid:]):
+            if not await self._send_with_retry(half, retries=1):
+                self._spill(half)
+        return True
+
+    # --- spill file ---
+    def _spill(self, payloads: List[Dict[str, Any]]):
+        """Append to the spill file on the I/O thread; returns without waiting."""
+        if not payloads:
+            return
+        self.stats['spilled'] += len(payloads)
+        self._io.submit(self._write_spill, payloads)
+
+    def _write_spill(self, payloads: List[Dict[str, Any]]):
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(p) + '\n' for p in payloads))
+
+    def _claim_spill(self) -> Optional[str]:
+        """Path of the file to replay: a leftover ``.sending``, else the spill file renamed to it."""
+        sending = self.spill_path + '.sending'
+        if os.path.exists(sending):
+            if os.path.getsize(sending):
+                return sending
+            os.unlink(sending)
+        if not os.path.exists(self.spill_path) or os.path.getsize(self.spill_path) == 0:
+            return None
+        os.replace(self.spill_path, sending)
+        return sending
+
+    def _read_spill(self, path: str, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Up to ``batch_size`` reports from byte ``offset`` on, and the offset after them."""
+        payloads = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while len(payloads) < self.batch_size:
+                line = f.readline()
+                if not line:
+                    break
+                offset += len(line)
+                if line.strip():
+                    payloads.append(json.loads(line))
+        return payloads, offset
+
+    def _keep_spill(self, path: str, offset: int):
+        """Cut the acknowledged reports off the front of ``path``, copying the rest in blocks."""
+        tmp = path + '.tmp'
+        with open(path, 'rb') as src, open(tmp, 'wb') as dst:
+            src.seek(offset)
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp, path)
+
+    async def _replay_spill(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            path = await loop.run_in_executor(self._io, self._claim_spill)
+            if path is None:
+                return
+            offset = 0
+            while True:
+                chunk, end = await loop.run_in_executor(self._io, self._read_spill, path, offset)
+                if not chunk:
+                    break
+                if not await self._send_with_retry(chunk):
+                    await loop.run_in_executor(self._io, self._keep_spill, path, offset)
+                    return
+                self.stats['replayed'] += len(chunk)
+                offset = end
+            await loop.run_in_executor(self._io, os.unlink, path)
+
+def _spill_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='forwarder-spill')
+
+
+def _invalid_count(resp: httpx.Response) -> int:
+    # the batch endpoint answers 200 with a per-event summary; reports it could not accept are not "sent"
+    try:
+        return int(resp.json().get('summary', {}).get('invalid', 0))
+    except (ValueError, AttributeError, TypeError):
+        return 0
@@ -0,0 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Hashable, Iterable, List, Optional
+
+
+class KeyedLocks:
+    """Striped asyncio locks keyed by e.g. ``(site, username)``.
+
+    Each key maps to one of ``stripes`` locks by hash, so memory is fixed
+    however many keys there are; two keys sharing a stripe only serialise
+    needlessly. Handlers hold a key's lock from the profile read, which
+    awaits a worker thread when the profile is not cached, to the update, so
+    concurrent requests for the same user cannot lose an update; requests
+    for other users keep running while a read is in flight.
+
+    Locks are created per event loop (test clients each run their own).
+    """
+
+    def __init__(self, stripes: int = 1024):
+        self.stripes = stripes
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._locks: List[Optional[asyncio.Lock]] = []
+
+    def _lock(self, index: int) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._locks = [None] * self.stripes
+        lock = self._locks[index]
+        if lock is None:
+            lock = self._locks[index] = asyncio.Lock()
+        return lock
+
+    def lock(self, key: Hashable) -> asyncio.Lock:
+        return self._lock(hash(key) % self.stripes)
+
+    @asynccontextmanager
+    async def hold(self, keys: Iterable[Hashable]):
+        """Hold the locks of several keys; stripes are taken in index order so batches cannot deadlock."""
+        held = []
+        try:
+            for index in sorted({hash(k) % self.stripes for k in keys}):
+                lock = self._lock(index)
+                await lock.acquire()
+                held.append(lock)
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
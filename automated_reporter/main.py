@@ -1,14 +1,25 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any, Optional
-import httpx
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Dict, Any, List, Optional
 import asyncio
 import math
+import os
+import time
 
 from .models import LoginEvent, ProfileCreate, CheckResult
 from . import storage
+from . import scoring
+from .forwarder import Forwarder
+from .locks import KeyedLocks
+from telemetry import CONTENT_TYPE, MetricsMiddleware, Registry, metrics_enabled
+from serialization import JSONBytesResponse, grouped_object_chunks
+import geoip
+import incidents
+import ingest
+import rules
 
-app = FastAPI(title="Automated Reporting Server")
+app = FastAPI(title="Automated Reporting Server", default_response_class=JSONBytesResponse)
 
 # allow cors from local frontend/backend
 app.add_middleware(
@@ -20,18 +31,113 @@ app.add_middleware(
 )
 
 AI_BACKEND_URL = "http://localhost:8000/api/login_event"
+AI_BACKEND_BATCH_URL = "http://localhost:8000/api/login_events/batch"
+FORWARD_SPILL_PATH = os.environ.get('FORWARD_SPILL_PATH', os.path.join(os.path.dirname(__file__), 'forward_spill.ndjson'))
 
-# Adjustable sensitivity threshold: lower => fewer forwards, higher => more sensitive
-SENSITIVITY_THRESHOLD = 0.65
+# Per-site weights and thresholds (rules/); hot-reloaded when the file changes, built-in defaults while it is missing
+RULES_PATH = os.environ.get('RULES_PATH', rules.DEFAULT_PATH)
+rules_handle = rules.RulesHandle(RULES_PATH, check_interval=float(os.environ.get('RULES_CHECK_INTERVAL', '1.0')))
 
-# Enable geo-IP lookups (best-effort; disabled by default to avoid external dependency)
-GEOIP_ENABLED = False
+# Local geo-IP database (python -m geoip.build); lookups are off while the file is missing
+GEOIP_DB_PATH = os.environ.get('GEOIP_DB_PATH', geoip.DEFAULT_PATH)
+geo_db = geoip.open_database(GEOIP_DB_PATH)
+GEOIP_ENABLED = geo_db is not None and os.environ.get('GEOIP_ENABLED', '1').lower() not in ('0', 'false', 'off', 'no')
+
+# Suspicious reports repeating an open incident (same site, user and risk factors, within REPORT_INCIDENT_WINDOW
+# seconds of its last sighting) are counted instead of forwarded again, and each site/user may forward at most
+# REPORT_RATE_PER_MINUTE reports (bursts of REPORT_BURST); 0 disables either
+REPORT_INCIDENT_WINDOW = float(os.environ.get('REPORT_INCIDENT_WINDOW', '300'))
+REPORT_RATE_PER_MINUTE = float(os.environ.get('REPORT_RATE_PER_MINUTE', '6'))
+REPORT_BURST = int(os.environ.get('REPORT_BURST', '3'))
+
+# Streaming intake (ingest/): events over TCP ('host:port') or a Unix socket, and/or a tailed NDJSON log;
+# each batch is checked like /check/batch. Each source is off while unset.
+REPORTER_INGEST_TCP = os.environ.get('REPORTER_INGEST_TCP', '')
+REPORTER_INGEST_UNIX = os.environ.get('REPORTER_INGEST_UNIX', '')
+REPORTER_INGEST_TAIL = os.environ.get('REPORTER_INGEST_TAIL', '')
 
 profiles = storage.load_profiles()
+# held across every await between reading a profile and writing it back
+profile_locks = KeyedLocks()
+forwarder = Forwarder(AI_BACKEND_BATCH_URL, FORWARD_SPILL_PATH)
+open_incidents = incidents.IncidentWindow(REPORT_INCIDENT_WINDOW) if REPORT_INCIDENT_WINDOW > 0 else None
+report_limiter = (incidents.TokenBucket(REPORT_RATE_PER_MINUTE / 60, REPORT_BURST)
+                  if REPORT_RATE_PER_MINUTE > 0 else None)
+
+# Metrics (METRICS_ENABLED=0 turns recording and /metrics off)
+metrics = Registry(prefix='reporter_', enabled=metrics_enabled())
+app.add_middleware(MetricsMiddleware, registry=metrics)
+STAGE_HELP = 'Time spent in each /check stage'
+stage_lookup = metrics.histogram('check_stage_duration_seconds', STAGE_HELP, {'stage': 'profile_lookup'})
+stage_score = metrics.histogram('check_stage_duration_seconds', STAGE_HELP, {'stage': 'score'})
+stage_geoip = metrics.histogram('check_stage_duration_seconds', STAGE_HELP, {'stage': 'geoip'})
+stage_forward = metrics.histogram('check_stage_duration_seconds', STAGE_HELP, {'stage': 'forward'})
+stage_update = metrics.histogram('check_stage_duration_seconds', STAGE_HELP, {'stage': 'profile_update'})
+checks_suspicious = metrics.counter('checks_total', 'Scored login events', {'result': 'suspicious'})
+checks_ok = metrics.counter('checks_total', 'Scored login events', {'result': 'ok'})
+checks_no_profile = metrics.counter('checks_total', 'Scored login events', {'result': 'no_profile'})
+profile_flush = metrics.histogram('profile_flush_duration_seconds', 'Profile store flush transaction time')
+profile_flush_rows = metrics.counter('profile_flush_rows_total', 'Profiles written by flushes')
+
+
+def _observe_flush(seconds: float, rows: int):
+    profile_flush.observe(seconds)
+    profile_flush_rows.inc(rows)
+
+
+profiles.on_flush = _observe_flush
+metrics.gauge('profiles_cached', 'Profiles held in the store cache', fn=profiles.cache_size)
+metrics.counter('profile_cache_hits_total', 'Profile lookups served by the in-memory hot tier',
+                fn=lambda: profiles.hits)
+metrics.counter('profile_cache_misses_total', 'Profile lookups that went to the write-back buffer or SQLite',
+                fn=lambda: profiles.misses)
+metrics.counter('profile_cache_evictions_total', 'Profiles dropped from the hot tier', fn=lambda: profiles.evictions)
+metrics.counter('profile_cache_writebacks_total', 'Dirty profiles evicted into the write-back buffer',
+                fn=lambda: profiles.writebacks)
+metrics.gauge('forward_queue_depth', 'Reports waiting to be forwarded',
+              fn=lambda: forwarder.queue.qsize() if forwarder.queue is not None else 0)
+for _key in ('sent', 'rejected', 'retries', 'failed_batches', 'spilled', 'replayed', 'batches'):
+    metrics.counter(f'forward_{_key}_total', f'Forwarder {_key.replace("_", " ")}',
+                    fn=lambda k=_key: forwarder.stats[k])
+reports_folded = metrics.counter('reports_folded_total', 'Suspicious reports counted on an open incident')
+reports_rate_limited = metrics.counter('reports_rate_limited_total',
+                                       'Suspicious reports not forwarded because of the per-user rate limit')
+metrics.gauge('incidents_open', 'Report incidents still absorbing repeats',
+              fn=lambda: len(open_incidents) if open_incidents is not None else 0)
+
+
+async def ingest_events(events: List[LoginEvent]):
+    # streamed events, validated one by one by the intake, go through the same path as /check/batch
+    await check_batch(events)
+
+
+ingest_server = ingest.IngestServer(ingest_events, batch_size=int(os.environ.get('INGEST_BATCH_SIZE', '2000')),
+                                    max_pending=int(os.environ.get('INGEST_MAX_PENDING', '64')),
+                                    validate=LoginEvent.parse_obj)
+metrics.gauge('ingest_connections', 'Open streaming intake connections',
+              fn=lambda: ingest_server.stats['connections'])
+metrics.gauge('ingest_pending_chunks', 'Decoded chunks waiting to be checked', fn=lambda: ingest_server.queue.qsize())
+for _key in ('bytes', 'events', 'parse_errors', 'framing_errors', 'invalid', 'batches', 'handler_errors'):
+    metrics.counter(f'ingest_{_key}_total', f'Streaming intake {_key.replace("_", " ")}',
+                    fn=lambda k=_key: ingest_server.stats[k])
+
+@app.on_event('startup')
+async def _on_startup():
+    await forwarder.start()
+    if REPORTER_INGEST_TCP:
+        host, _, port = REPORTER_INGEST_TCP.rpartition(':')
+        await ingest_server.start_tcp(host or '0.0.0.0', int(port))
+    if REPORTER_INGEST_UNIX:
+        await ingest_server.start_unix(REPORTER_INGEST_UNIX)
+    if REPORTER_INGEST_TAIL:
+        ingest_server.tail(REPORTER_INGEST_TAIL)
 
 @app.on_event('shutdown')
-def _on_shutdown():
-    storage.save_profiles(profiles)
+async def _on_shutdown():
+    await ingest_server.stop()
+    await forwarder.stop()
+    # the final flush writes every dirty profile; keep it off the loop
+    await asyncio.to_thread(profiles.close)
 
 @app.get('/')
 def root():
@@ -42,217 +148,229 @@ async def create_profile(payload: ProfileCreate):
     site = payload.site
     username = payload.username
     events = [e.dict() for e in payload.events]
-    profiles.setdefault(site, {})
     profile = storage.make_profile_from_events(events)
-    profiles[site][username] = profile
-    storage.save_profiles(profiles)
+    async with profile_locks.lock((site, username)):
+        profiles.put(site, username, profile)
     return {"created": True, "site": site, "username": username, "profile": profile}
 
 @app.post('/profiles/{site}/{username}/add_event')
 async def add_profile_event(site: str, username: str, event: LoginEvent):
-    profiles.setdefault(site, {})
-    if username not in profiles[site]:
-        profiles[site][username] = storage.make_profile_from_events([event.dict()])
-    else:
-        storage.update_profile_incremental(profiles[site][username], event.dict())
-    storage.save_profiles(profiles)
-    return {"updated": True, "site": site, "username": username, "profile": profiles[site][username]}
+    async with profile_locks.lock((site, username)):
+        profile = await profiles.get_async(site, username)
+        if profile is None:
+            profile = storage.make_profile_from_events([event.dict()])
+            profiles.put(site, username, profile)
+        else:
+            profiles.apply_event(site, username, event.dict(), profile)
+    return {"updated": True, "site": site, "username": username, "profile": profile}
 
 @app.get('/profiles')
 def list_profiles():
-    return profiles
+    # {site: {username: profile}}, streamed page by page from the stored payloads
+    return StreamingResponse(grouped_object_chunks(profiles.iter_payloads()), media_type='application/json')
 
 @app.get('/profiles/{site}/{username}')
 def get_profile(site: str, username: str):
-    site_map = profiles.get(site)
-    if not site_map or username not in site_map:
+    profile = profiles.get(site, username)
+    if profile is None:
         raise HTTPException(status_code=404, detail='profile not found')
-    return site_map[username]
-
-async def forward_to_ai_backend(event: Dict[str, Any]):
-    # Build payload expected by the AI backend's LoginEvent model
-    from uuid import uuid4
-    import datetime as _dt
-    payload = {
-        'event_id': f'evt-{uuid4().hex[:8]}',
-        'timestamp': _dt.datetime.utcnow().isoformat() + 'Z',
+    return profile
+
+def geo_matches(geo: geoip.Location, locations: List[str]) -> bool:
+    # profile locations may be codes ("DE") or free text ("Berlin, DE"); a substring either way matches
+    country, region = geo
+    for loc in locations:
+        if loc and (country in loc or loc in country or (region and (region in loc or loc in region))):
+            return True
+    return False
+
+def forward_to_ai_backend(report: Dict[str, Any]) -> bool:
+    # Queued for the batching forwarder; False means it was spilled to disk
+    return forwarder.submit(report)
+
+def admit_report(report: Dict[str, Any]) -> bool:
+    """Whether a suspicious report should be forwarded.
+
+    A report that repeats an open incident only updates its count, last-seen
+    time and max score. A new one is forwarded if the site/user still has a
+    token, and then opens an incident of its own.
+    """
+    now = time.time()
+    key = (report['site'], report['username'], tuple(report['risk_factors']))
+    if open_incidents is not None:
+        incident = open_incidents.get(key, now)
+        if incident is not None:
+            incident['count'] += 1
+            incident['last_seen'] = now
+            incident['max_score'] = max(incident['max_score'], report['score'])
+            reports_folded.inc()
+            return False
+    if report_limiter is not None and not report_limiter.allow(key[:2], now):
+        reports_rate_limited.inc()
+        return False
+    if open_incidents is not None:
+        open_incidents.open(key, {'count': 1, 'first_seen': now, 'last_seen': now, 'max_score': report['score']}, now)
+    return True
+
+def build_report(event: Dict[str, Any], similarity: float, reasons: List[str]) -> Dict[str, Any]:
+    return {
         'username': event.get('username'),
-        'device_fingerprint': event.get('device_fingerprint') or '',
-        'location': event.get('location') or '',
-        'typing_speed': event.get('typing_speed') or 0.0,
-        'access_time': event.get('access_time') or _dt.datetime.utcnow().isoformat() + 'Z'
+        'site': event.get('site'),
+        'device_fingerprint': event.get('device_fingerprint'),
+        'typing_speed': event.get('typing_speed'),
+        'location': event.get('location'),
+        'access_time': event.get('access_time'),
+        'user_agent': event.get('user_agent'),
+        'ip_address': event.get('ip_address'),
+        'source': 'automated_reporter',
+        'score': round(1.0 - similarity, 2),
+        'reasons': reasons,
+        'risk_factors': [r.split()[0].lower() for r in reasons]
     }
-    # include any extra fields under 'additional' key (exclude keys we've already set)
-    known = set(payload.keys())
-    payload['additional'] = {k: v for k, v in event.items() if k not in known}
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            resp = await client.post(AI_BACKEND_URL, json=payload)
-            return resp.status_code, resp.text
-        except Exception as e:
-            return None, str(e)
 
 @app.post('/check')
-async def check_event(event: LoginEvent, background_tasks: BackgroundTasks):
+async def check_event(event: LoginEvent):
     site = event.site
     username = event.username
-    site_map = profiles.get(site, {})
-    profile = site_map.get(username)
-    if not profile:
-        # No baseline; respond that profile missing
-        raise HTTPException(status_code=404, detail='no baseline profile for this site/username')
-
-    # Compute similarity heuristics
-    reasons = []
-    score_components = []
-
-    # Typing similarity
-    avg_t = profile.get('avg_typing_speed')
-    std_t = profile.get('std_typing_speed')
-    typing_similarity = 1.0
-    if avg_t is not None and event.typing_speed is not None:
-        diff = abs(event.typing_speed - avg_t)
-        # if std available use it, else normalize by avg
-        denom = std_t if std_t and std_t > 0 else max(1.0, avg_t)
-        typing_similarity = max(0.0, 1.0 - (diff / denom))
-        if typing_similarity < 0.6:
-            reasons.append(f"Typing speed deviates (got {event.typing_speed}, avg {avg_t})")
-    score_components.append(('typing', typing_similarity))
-
-    # Device fingerprint
-    device_list = profile.get('device_fingerprints', [])
-    device_match = 1.0 if (event.device_fingerprint and event.device_fingerprint in device_list) else 0.0
-    if device_match == 0.0:
-        reasons.append('Device fingerprint mismatch')
-    score_components.append(('device', device_match))
-
-    # User-Agent similarity (simple token/jaccard-based fuzzy match)
-    ua_list = profile.get('user_agents', [])
-    ua_match = 1.0
-    if ua_list and event.user_agent:
-        def jaccard(a: str, b: str) -> float:
-            sa = set([t for t in a.lower().split() if len(t) > 2])
-            sb = set([t for t in b.lower().split() if len(t) > 2])
-            if not sa or not sb:
-                return 0.0
-            inter = sa.intersection(sb)
-            union = sa.union(sb)
-            return len(inter) / len(union)
-
-        best = 0.0
-        for ua in ua_list:
-            if not ua:
-                continue
-            best = max(best, jaccard(ua, event.user_agent))
-        # choose threshold for UA similarity
-        ua_match = 1.0 if best >= 0.45 else 0.0
-        if ua_match == 0.0:
-            reasons.append('User-Agent mismatch')
-    score_components.append(('ua', ua_match))
-
-    # Location
-    locs = profile.get('locations', [])
-    loc_match = 1.0 if (event.location and event.location in locs) else 0.0
-    if loc_match == 0.0:
-        reasons.append(f'Unusual login location: {event.location}')
-    score_components.append(('location', loc_match))
-
-    # Time of day
-    typical_hours = profile.get('typical_hours', [])
-    time_match = 1.0
-    if event.access_time and len(event.access_time) >= 13 and typical_hours:
-        try:
-            hour = int(event.access_time[11:13])
-            time_match = 1.0 if hour in typical_hours else 0.0
-            if time_match == 0.0:
-                reasons.append(f'Unusual login hour: {hour}')
-        except Exception:
-            time_match = 0.5
-    score_components.append(('time', time_match))
-
-    # IP address match (exact or prefix)
-    ip_list = profile.get('ip_addresses', [])
-    ip_match = 1.0
-    if ip_list and event.ip_address:
-        ip_match = 0.0
-        for ip in ip_list:
-            if ip and event.ip_address.startswith(ip):
-                ip_match = 1.0
-                break
-        if ip_match == 0.0:
-            reasons.append('IP address mismatch')
-    score_components.append(('ip', ip_match))
-
-    # Optional geo-IP check: attempt to resolve country/region and compare against profile locations
-    if GEOIP_ENABLED and event.ip_address:
-        geo_ok = False
-        try:
-            async with httpx.AsyncClient(timeout=3.0) as client:
-                r = await client.get(f'http://ip-api.com/json/{event.ip_address}?fields=status,country,regionName')
-                if r.status_code == 200:
-                    data = r.json()
-                    if data.get('status') == 'success':
-                        country = data.get('country')
-                        region = data.get('regionName')
-                        # compare country/region to any known locations in profile (simple substring match)
-                        locs = profile.get('locations', [])
-                        for loc in locs:
-                            if loc and ((country and country in loc) or (region and region in loc) or (loc in country or loc in region)):
-                                geo_ok = True
-                                break
-                        if not geo_ok:
-                            reasons.append(f'Geo-IP location {country}/{region} unusual')
-        except Exception:
-            # best-effort only
-            pass
-
-    # Weighted similarity
-    # Updated weights include user-agent and ip checks
-    weights = {'typing': 0.35, 'device': 0.25, 'location': 0.15, 'time': 0.1, 'ua': 0.1, 'ip': 0.05}
-    similarity = 0.0
-    for k, val in score_components:
-        similarity += weights.get(k, 0) * val
-
-    suspicious = similarity < 0.6
-
-    forwarded = False
-    forwarded_status = None
-    if suspicious:
-        # Build report and forward to AI backend
-        report = {
-            'username': event.username,
-            'site': event.site,
-            'device_fingerprint': event.device_fingerprint,
-            'typing_speed': event.typing_speed,
-            'location': event.location,
-            'access_time': event.access_time,
-            'user_agent': event.user_agent,
-            'ip_address': event.ip_address,
-            'source': 'automated_reporter',
-            'score': round(1.0 - similarity, 2),
-            'reasons': reasons,
-            'risk_factors': [r.split()[0].lower() for r in reasons]
-        }
-        # forward in background
-        background_tasks.add_task(forward_to_ai_backend, report)
-        forwarded = True
-
-    # Optionally update profile with this event (if desired)
-    storage.update_profile_incremental(profile, event.dict())
-    storage.save_profiles(profiles)
+    data = event.dict()
+    # The user's lock is held from the (possibly cold, off-loop) profile read
+    # to the update, so a concurrent request for the same user cannot fold its
+    # event into a copy this one is about to replace
+    async with profile_locks.lock((site, username)):
+        t0 = time.perf_counter()
+        profile = await profiles.get_async(site, username)
+        if not profile:
+            checks_no_profile.inc()
+            # No baseline; respond that profile missing
+            raise HTTPException(status_code=404, detail='no baseline profile for this site/username')
+        compiled = profiles.compiled(site, username)
+        t1 = time.perf_counter()
+        stage_lookup.observe(t1 - t0)
+
+        # Compute similarity heuristics
+        site_rules = rules_handle.get().reporter(site)
+        similarity, reasons = scoring.score_event(profile, data, compiled, site_rules)
+        t0 = time.perf_counter()
+        stage_score.observe(t0 - t1)
+
+        # Optional geo-IP check: resolve country/region locally and compare against profile locations
+        if GEOIP_ENABLED and event.ip_address:
+            geo = geo_db.lookup(event.ip_address)
+            if geo is not None and not geo_matches(geo, profile.get('locations', [])):
+                reasons.append(f'Geo-IP location {geo[0]}/{geo[1]} unusual')
+            t1 = time.perf_counter()
+            stage_geoip.observe(t1 - t0)
+            t0 = t1
+
+        suspicious = similarity < site_rules.suspicious_below
+
+        forwarded = False
+        if suspicious:
+            checks_suspicious.inc()
+            # Build report and hand it to the forwarder, unless it repeats an open incident
+            report = build_report(data, similarity, reasons)
+            if admit_report(report):
+                forward_to_ai_backend(report)
+                forwarded = True
+            t1 = time.perf_counter()
+            stage_forward.observe(t1 - t0)
+            t0 = t1
+        else:
+            checks_ok.inc()
+
+        profiles.apply_event(site, username, data, profile)
+        stage_update.observe(time.perf_counter() - t0)
 
     return {"suspicious": suspicious, "similarity": round(similarity, 3), "reasons": reasons, "forwarded": forwarded}
 
+@app.post('/check/batch')
+async def check_batch(events: List[LoginEvent]):
+    # Every event is scored against the profiles as they were before the
+    # batch (vectorised), then folded into the profiles in submission order.
+    results: List[Dict[str, Any]] = [{} for _ in events]
+    # the batch's users stay locked from their (possibly cold, off-loop) reads
+    # to their updates, as in /check
+    async with profile_locks.hold([(event.site, event.username) for event in events]):
+        indices, batch_profiles, batch_events = [], [], []
+        # one copy per user, even if a later read evicts it before the updates
+        loaded: Dict[Any, Optional[Dict[str, Any]]] = {}
+        for i, event in enumerate(events):
+            key = (event.site, event.username)
+            if key not in loaded:
+                loaded[key] = await profiles.get_async(*key)
+            profile = loaded[key]
+            if not profile:
+                results[i] = {"error": "no baseline profile for this site/username"}
+                continue
+            indices.append(i)
+            batch_profiles.append(profile)
+            batch_events.append(event.dict())
+        # compiled after all the reads: a read may evict an earlier profile's index
+        batch_compiled = [profiles.compiled(data['site'], data['username']) for data in batch_events]
+
+        ruleset = rules_handle.get()
+        batch_rules = [ruleset.reporter(data['site']) for data in batch_events]
+        similarities, batch_reasons = scoring.score_batch(batch_profiles, batch_events, batch_compiled, batch_rules)
+        for i, data, similarity, reasons, site_rules in zip(indices, batch_events, similarities.tolist(),
+                                                             batch_reasons, batch_rules):
+            suspicious = similarity < site_rules.suspicious_below
+            forwarded = False
+            if suspicious:
+                report = build_report(data, similarity, reasons)
+                if admit_report(report):
+                    forward_to_ai_backend(report)
+                    forwarded = True
+            results[i] = {"suspicious": suspicious, "similarity": round(similarity, 3), "reasons": reasons, "forwarded": forwarded}
+        for data, profile in zip(batch_events, batch_profiles):
+            profiles.apply_event(data['site'], data['username'], data, profile)
+    return results
+
 # Health endpoint to verify backend connectivity
 @app.get('/health')
 async def health_check():
-    # Try simple connection to AI backend
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        try:
-            r = await client.get('http://localhost:8000/api/alerts')
-            return {"status": "ok", "ai_backend": r.status_code}
-        except Exception as e:
-            return {"status": "ok", "ai_backend": str(e)}
+    # Try simple connection to AI backend over the shared forwarding pool
+    try:
+        r = await forwarder.client.get('http://localhost:8000/api/alerts', params={'limit': 1}, timeout=5.0)
+        return {"status": "ok", "ai_backend": r.status_code}
+    except Exception as e:
+        return {"status": "ok", "ai_backend": str(e)}
+
+@app.get('/rules')
+async def get_rules():
+    return rules_handle.info()
+
+@app.post('/rules/reload')
+async def reload_rules():
+    # normally picked up automatically within RULES_CHECK_INTERVAL seconds
+    rules_handle.reload(force=True)
+    return rules_handle.info()
+
+@app.get('/metrics')
+def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail='metrics are disabled')
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get('/forwarder/metrics')
+def forwarder_metrics():
+    return forwarder.metrics()
+
+@app.get('/incidents')
+def list_incidents():
+    # open report incidents, most recently seen last
+    if open_incidents is None:
+        return []
+    open_incidents.expire(time.time())
+    return [{'site': site, 'username': username, 'risk_factors': list(factors), **incident}
+            for (site, username, factors), incident in open_incidents]
+
+@app.get('/ingest')
+def ingest_stats():
+    return ingest_server.info()
+
+@app.get('/profiles/cache')
+def profile_cache_stats():
+    return profiles.cache_stats()
 
 if __name__ == '__main__':
     import uvicorn
@@ -0,0 +1,146 @@
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional
+
+UA_MIN_TOKEN_LEN = 3
+UA_MEMO_SIZE = 64
+
+
+@lru_cache(maxsize=4096)
+def ua_tokens(ua: str) -> FrozenSet[str]:
+    return frozenset(t for t in ua.lower().split() if len(t) >= UA_MIN_TOKEN_LEN)
+
+
+class PrefixTrie:
+    """Character trie answering "does any stored string prefix this one?"."""
+
+    __slots__ = ('root',)
+    _END = ''
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+
+    def add(self, prefix: str):
+        node = self.root
+        for ch in prefix:
+            node = node.setdefault(ch, {})
+        node[self._END] = True
+
+    def matches_prefix_of(self, value: str) -> bool:
+        node = self.root
+        for ch in value:
+            node = node.get(ch)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+
+class CompiledProfile:
+    """Lookup structures derived from one profile dict.
+
+    Devices and locations become hash sets, user agents are tokenised once
+    (with an inverted token index so only UAs sharing a token are compared),
+    IP prefixes go into a character trie and typical hours into a 24-bit mask.
+    ``sync`` refreshes the index in place after
+    ``storage.update_profile_incremental`` changed the profile.
+    """
+
+    __slots__ = ('devices', 'locations', 'ua_sources', 'ua_token_sets', 'ua_ids', 'ua_by_token', 'has_uas',
+                 'ua_memo', 'ip_sources', 'ip_trie', 'has_ips', 'hours', 'hour_mask')
+
+    def __init__(self, profile: Dict[str, Any]):
+        # None forces the first sync to build every structure
+        self.ua_sources: Optional[List[str]] = None
+        self.ip_sources: Optional[List[str]] = None
+        self.sync(profile)
+
+    def sync(self, profile: Dict[str, Any]):
+        """Bring the index in line with ``profile`` after it was updated.
+
+        Profile lists are bounded top-K sets, so this is O(K); the UA and IP
+        structures are only rebuilt when their lists actually changed.
+        """
+        self.devices = set(profile.get('device_fingerprints', []))
+        self.locations = set(profile.get('locations', []))
+        user_agents = profile.get('user_agents', [])
+        if user_agents != self.ua_sources:
+            self.ua_sources = list(user_agents)
+            self.ua_token_sets: List[FrozenSet[str]] = []
+            self.ua_ids: Dict[FrozenSet[str], int] = {}
+            self.ua_by_token: Dict[str, List[int]] = {}
+            self.has_uas = False
+            # users log in with the same few UAs; remember recent answers
+            self.ua_memo: Dict[str, float] = {}
+            for ua in user_agents:
+                self.add_user_agent(ua)
+        ip_addresses = profile.get('ip_addresses', [])
+        if ip_addresses != self.ip_sources:
+            self.ip_sources = list(ip_addresses)
+            self.ip_trie = PrefixTrie()
+            self.has_ips = False
+            for ip in ip_addresses:
+                self.add_ip(ip)
+        self.hours = set()
+        self.hour_mask = 0
+        for h in profile.get('typical_hours', []):
+            self.add_hour(h)
+
+    def add_user_agent(self, ua: Optional[str]):
+        # the raw list counts as non-empty even if its entries are blank
+        self.has_uas = True
+        if not ua:
+            return
+        tokens = ua_tokens(ua)
+        if tokens in self.ua_ids:
+            return
+        idx = self.ua_ids[tokens] = len(self.ua_token_sets)
+        self.ua_token_sets.append(tokens)
+        self.ua_memo.clear()
+        for t in tokens:
+            self.ua_by_token.setdefault(t, []).append(idx)
+
+    def add_ip(self, ip: Optional[str]):
+        self.has_ips = True
+        if ip:
+            self.ip_trie.add(ip)
+
+    def add_hour(self, h: int):
+        self.hours.add(h)
+        if 0 <= h < 24:
+            self.hour_mask |= 1 << h
+
+    def best_ua_similarity(self, user_agent: str) -> float:
+        best = self.ua_memo.get(user_agent)
+        if best is None:
+            best = self._best_ua_similarity(user_agent)
+            if len(self.ua_memo) >= UA_MEMO_SIZE:
+                self.ua_memo.clear()
+            self.ua_memo[user_agent] = best
+        return best
+
+    def _best_ua_similarity(self, user_agent: str) -> float:
+        tokens = ua_tokens(user_agent)
+        if not tokens:
+            return 0.0
+        candidates = set()
+        for t in tokens:
+            candidates.update(self.ua_by_token.get(t, ()))
+        best = 0.0
+        for idx in candidates:
+            stored = self.ua_token_sets[idx]
+            inter = len(tokens & stored)
+            best = max(best, inter / (len(tokens) + len(stored) - inter))
+        return best
+
+    def ip_matches(self, ip_address: str) -> bool:
+        return self.ip_trie.matches_prefix_of(ip_address)
+
+    def hour_matches(self, hour: int) -> bool:
+        if 0 <= hour < 24:
+            return bool(self.hour_mask >> hour & 1)
+        return hour in self.hours
+
+
+def compile_profile(profile: Dict[str, Any]) -> CompiledProfile:
+    return CompiledProfile(profile)
@@ -0,0 +1,214 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .match_index import CompiledProfile, compile_profile
+from rules import DEFAULT_RULES, REPORTER_COMPONENTS, ReporterRules
+
+# Weighted similarity; components are summed in this order. Weights and
+# cutoffs are per site (rules.ReporterRules).
+COMPONENTS = REPORTER_COMPONENTS
+DEFAULT_REPORTER_RULES = DEFAULT_RULES.default_reporter
+
+
+def _event_hour(access_time: str) -> int:
+    # raises ValueError for malformed timestamps, like the original inline parse
+    return int(access_time[11:13])
+
+
+def ua_match(compiled: CompiledProfile, user_agent: Optional[str],
+             cutoff: float = DEFAULT_REPORTER_RULES.ua_cutoff) -> float:
+    # token-set Jaccard against the best stored UA
+    if not (compiled.has_uas and user_agent):
+        return 1.0
+    return 1.0 if compiled.best_ua_similarity(user_agent) >= cutoff else 0.0
+
+
+def ip_match(compiled: CompiledProfile, ip_address: Optional[str]) -> float:
+    # exact or prefix match against stored addresses
+    if not (compiled.has_ips and ip_address):
+        return 1.0
+    return 1.0 if compiled.ip_matches(ip_address) else 0.0
+
+
+def score_event(profile: Dict[str, Any], event: Dict[str, Any],
+                compiled: Optional[CompiledProfile] = None,
+                rules: Optional[ReporterRules] = None) -> Tuple[float, List[str]]:
+    """Score one login attempt against a baseline profile.
+
+    Returns the weighted similarity (1.0 = identical behaviour) and the list
+    of human-readable reasons for every component that did not match.
+    ``compiled`` is the profile's precompiled match index; it is built on
+    the fly when not supplied. ``rules`` are the site's weights and cutoffs,
+    the defaults when omitted.
+    """
+    if compiled is None:
+        compiled = compile_profile(profile)
+    if rules is None:
+        rules = DEFAULT_REPORTER_RULES
+    reasons = []
+
+    # Typing similarity
+    typing_speed = event.get('typing_speed')
+    avg_t = profile.get('avg_typing_speed')
+    std_t = profile.get('std_typing_speed')
+    typing_similarity = 1.0
+    if avg_t is not None and typing_speed is not None:
+        diff = abs(typing_speed - avg_t)
+        # if std available use it, else normalize by avg
+        denom = std_t if std_t and std_t > 0 else max(1.0, avg_t)
+        typing_similarity = max(0.0, 1.0 - (diff / denom))
+        if typing_similarity < rules.typing_cutoff:
+            reasons.append(f"Typing speed deviates (got {typing_speed}, avg {avg_t})")
+
+    # Device fingerprint
+    device = event.get('device_fingerprint')
+    device_match = 1.0 if (device and device in compiled.devices) else 0.0
+    if device_match == 0.0:
+        reasons.append('Device fingerprint mismatch')
+
+    # User-Agent similarity (simple token/jaccard-based fuzzy match)
+    ua = ua_match(compiled, event.get('user_agent'), rules.ua_cutoff)
+    if ua == 0.0:
+        reasons.append('User-Agent mismatch')
+
+    # Location
+    location = event.get('location')
+    loc_match = 1.0 if (location and location in compiled.locations) else 0.0
+    if loc_match == 0.0:
+        reasons.append(f'Unusual login location: {location}')
+
+    # Time of day
+    access_time = event.get('access_time')
+    time_match = 1.0
+    if access_time and len(access_time) >= 13 and compiled.hours:
+        try:
+            hour = _event_hour(access_time)
+            time_match = 1.0 if compiled.hour_matches(hour) else 0.0
+            if time_match == 0.0:
+                reasons.append(f'Unusual login hour: {hour}')
+        except Exception:
+            time_match = 0.5
+
+    # IP address match (exact or prefix)
+    ip = ip_match(compiled, event.get('ip_address'))
+    if ip == 0.0:
+        reasons.append('IP address mismatch')
+
+    # summed in COMPONENTS order
+    similarity = 0.0
+    for weight, val in zip(rules.weights, (typing_similarity, device_match, ua, loc_match, time_match, ip)):
+        similarity += weight * val
+    return similarity, reasons
+
+
+def score_batch(profiles: List[Dict[str, Any]], events: List[Dict[str, Any]],
+                compiled: Optional[List[CompiledProfile]] = None,
+                rules: Optional[List[ReporterRules]] = None) -> Tuple[np.ndarray, List[List[str]]]:
+    """Vectorised ``score_event`` over ``events[i]`` vs ``profiles[i]``.
+
+    Per-event membership tests (device, location, UA, IP, hour) are encoded
+    into float64 columns; the typing z-score, cutoffs and weighted sum are
+    then computed for the whole batch at once. Every arithmetic step mirrors
+    the scalar path in the same order, so similarities are bit-identical.
+    ``rules[i]`` are the weights and cutoffs for ``events[i]``'s site.
+    """
+    n = len(events)
+    if compiled is None:
+        by_id: Dict[int, CompiledProfile] = {}
+        compiled = [by_id.get(id(p)) or by_id.setdefault(id(p), compile_profile(p)) for p in profiles]
+    if rules is None:
+        rules = [DEFAULT_REPORTER_RULES] * n
+    distinct = {id(r): r for r in rules}
+    if len(distinct) <= 1:
+        # one site (the usual case): scalar weights and cutoffs
+        only = next(iter(distinct.values()), DEFAULT_REPORTER_RULES)
+        weights, typing_cutoff = only.weights, only.typing_cutoff
+    else:
+        table = np.array([r.weights for r in rules])
+        weights = [table[:, k] for k in range(len(COMPONENTS))]
+        typing_cutoff = np.array([r.typing_cutoff for r in rules])
+    typing_speed = np.zeros(n)
+    avg = np.zeros(n)
+    denom = np.ones(n)
+    has_typing = np.zeros(n, dtype=bool)
+    device = np.zeros(n)
+    ua = np.ones(n)
+    location = np.zeros(n)
+    time_match = np.ones(n)
+    checked = np.zeros(n, dtype=bool)
+    in_range = np.zeros(n, dtype=bool)
+    hour_hit = np.zeros(n, dtype=bool)
+    hour_col = np.zeros(n, dtype=np.int64)
+    hour_mask = np.zeros(n, dtype=np.int64)
+    ip = np.ones(n)
+
+    for i, (profile, cp, event, site_rules) in enumerate(zip(profiles, compiled, events, rules)):
+        ts = event.get('typing_speed')
+        avg_t = profile.get('avg_typing_speed')
+        if avg_t is not None and ts is not None:
+            std_t = profile.get('std_typing_speed')
+            has_typing[i] = True
+            typing_speed[i] = ts
+            avg[i] = avg_t
+            denom[i] = std_t if std_t and std_t > 0 else max(1.0, avg_t)
+
+        fp = event.get('device_fingerprint')
+        if fp and fp in cp.devices:
+            device[i] = 1.0
+        loc = event.get('location')
+        if loc and loc in cp.locations:
+            location[i] = 1.0
+        ua[i] = ua_match(cp, event.get('user_agent'), site_rules.ua_cutoff)
+        ip[i] = ip_match(cp, event.get('ip_address'))
+
+        access_time = event.get('access_time')
+        if access_time and len(access_time) >= 13 and cp.hours:
+            try:
+                hour = _event_hour(access_time)
+            except Exception:
+                time_match[i] = 0.5
+                continue
+            checked[i] = True
+            hour_col[i] = hour
+            if 0 <= hour < 24:
+                in_range[i] = True
+                hour_mask[i] = cp.hour_mask
+            else:
+                hour_hit[i] = cp.hour_matches(hour)
+
+    # typing z-score similarity for the whole batch
+    typing = np.ones(n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw = 1.0 - (np.abs(typing_speed - avg) / denom)
+    typing[has_typing] = np.maximum(0.0, raw[has_typing])
+
+    # hour-of-day: bit test against the per-profile typical-hours mask
+    hour_hit[in_range] = ((hour_mask[in_range] >> hour_col[in_range]) & 1).astype(bool)
+    time_match[checked] = np.where(hour_hit[checked], 1.0, 0.0)
+
+    columns = {'typing': typing, 'device': device, 'ua': ua, 'location': location, 'time': time_match, 'ip': ip}
+    similarity = np.zeros(n)
+    for weight, k in zip(weights, COMPONENTS):
+        similarity = similarity + weight * columns[k]
+
+    # reason text only for the components that failed
+    typing_low = has_typing & (typing < typing_cutoff)
+    time_low = checked & ~hour_hit
+    reasons: List[List[str]] = []
+    for i, event in enumerate(events):
+        r = []
+        if typing_low[i]:
+            r.append(f"Typing speed deviates (got {event.get('typing_speed')}, avg {profiles[i].get('avg_typing_speed')})")
+        if device[i] == 0.0:
+            r.append('Device fingerprint mismatch')
+        if ua[i] == 0.0:
+            r.append('User-Agent mismatch')
+        if location[i] == 0.0:
+            r.append(f"Unusual login location: {event.get('location')}")
+        if time_low[i]:
+            r.append(f'Unusual login hour: {int(hour_col[i])}')
+        if ip[i] == 0.0:
+            r.append('IP address mismatch')
+        reasons.append(r)
+    return similarity, reasons
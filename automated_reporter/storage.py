@@ -1,90 +1,473 @@
+import asyncio
 import json
 import os
-from typing import Dict, Any, List
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from serialization import dumps, loads
+
+from .match_index import CompiledProfile, compile_profile
 
 PROFILES_PATH = os.path.join(os.path.dirname(__file__), 'profiles.json')
+PROFILES_DB_PATH = os.environ.get('PROFILES_DB_PATH', os.path.join(os.path.dirname(__file__), 'profiles.db'))
+# hot tier: most recently used profiles kept decoded in memory
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', '100000'))
+# cold tier: bytes of the database file SQLite reads through a memory map
+PROFILES_MMAP_SIZE = int(os.environ.get('PROFILES_MMAP_SIZE', str(1 << 30)))
 
 DEFAULT_PROFILES = {}
 
-def load_profiles() -> Dict[str, Any]:
-    if not os.path.exists(PROFILES_PATH):
-        return DEFAULT_PROFILES.copy()
+class ProfileStore:
+    """Two-tier profile store keyed by (site, username).
+
+    The cold tier is SQLite: every profile, indexed by its primary key and
+    read through a memory map (``mmap_size``), so opening the store costs
+    the same however many profiles exist. The hot tier is an LRU of at most
+    ``max_cached`` decoded profiles (and their match indexes); a profile is
+    read from SQLite on first access and dropped again when it is the least
+    recently used.
+
+    Callers mutate the cached dict in place and call ``mark_dirty``; only
+    dirty profiles are written, in one transaction, either every
+    ``flush_interval`` seconds or as soon as ``max_dirty`` profiles are
+    pending. A dirty profile that is evicted before its flush waits in a
+    write-back buffer, where a later ``get`` finds it again. A legacy
+    ``profiles.json`` is imported once when the database is empty.
+
+    Reads go through their own connection, which WAL lets run while the
+    flusher thread is writing, and the dirty set has its own short lock, so
+    a slow flush never stalls a request handler on the event loop.
+    """
+
+    def __init__(self, db_path: str = PROFILES_DB_PATH, json_path: Optional[str] = PROFILES_PATH,
+                 flush_interval: float = 1.0, max_dirty: int = 500, max_cached: int = PROFILE_CACHE_SIZE,
+                 mmap_size: int = PROFILES_MMAP_SIZE):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_dirty = max_dirty
+        self.max_cached = max(1, max_cached)
+        self._cache: 'OrderedDict[Tuple[str, str], Dict[str, Any]]' = OrderedDict()
+        self._compiled: Dict[Tuple[str, str], CompiledProfile] = {}
+        self._dirty = set()
+        # evicted before their flush, and being written by the current flush
+        self._writeback: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._flushing: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+        # _lock guards the write connection, _read_lock the read connection,
+        # _dirty_lock the dirty set and write-back buffers; _flush_lock keeps
+        # whole flushes in order
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS profiles ('
+            'site TEXT NOT NULL, username TEXT NOT NULL, payload TEXT NOT NULL, '
+            'PRIMARY KEY (site, username))'
+        )
+        self._conn.commit()
+        self._read_conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._read_conn.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+        if json_path and os.path.exists(json_path) and self._empty():
+            self._import_json(json_path)
+        self.flushes = 0
+        # optional callback(seconds, rows) after every flush, e.g. a metrics histogram
+        self.on_flush: Optional[Callable[[float, int], None]] = None
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, name='profile-flusher', daemon=True)
+        self._flusher.start()
+
+    def _empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM profiles LIMIT 1').fetchone() is None
+
+    def _import_json(self, json_path: str):
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return
+        rows = [(site, username, json.dumps(profile))
+                for site, users in data.items() for username, profile in users.items()]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO profiles VALUES (?, ?, ?)', rows)
+
+    def _read(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        with self._read_lock:
+            row = self._read_conn.execute(
+                'SELECT payload FROM profiles WHERE site = ? AND username = ?', key
+            ).fetchone()
+        return loads(row[0]) if row is not None else None
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        profile = self._cache.get(key)
+        if profile is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        return profile
+
+    def _load(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Cold path of ``get``: the write-back buffer, then SQLite."""
+        with self._dirty_lock:
+            # newer than the stored row until its flush commits
+            profile = self._writeback.pop(key, None)
+            if profile is None:
+                profile = self._flushing.get(key)
+        if profile is None:
+            profile = self._read(key)
+        return profile
+
+    def get(self, site: str, username: str) -> Optional[Dict[str, Any]]:
+        key = (site, username)
+        profile = self._cached(key)
+        if profile is None:
+            self.misses += 1
+            profile = self._load(key)
+            if profile is None:
+                return None
+            self._insert(key, profile)
+        return profile
+
+    async def get_async(self, site: str, username: str) -> Optional[Dict[str, Any]]:
+        """``get`` for request handlers: a cold read runs in a worker thread, not on the event loop."""
+        key = (site, username)
+        profile = self._cached(key)
+        if profile is not None:
+            return profile
+        self.misses += 1
+        profile = await asyncio.to_thread(self._load, key)
+        # someone may have loaded (and updated) it while this read was running
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        if profile is not None:
+            self._insert(key, profile)
+        return profile
+
+    def put(self, site: str, username: str, profile: Dict[str, Any]):
+        key = (site, username)
+        with self._dirty_lock:
+            self._writeback.pop(key, None)
+        self._compiled.pop(key, None)
+        self._insert(key, profile)
+        self.mark_dirty(site, username)
+
+    def _insert(self, key: Tuple[str, str], profile: Dict[str, Any]):
+        cache = self._cache
+        cache[key] = profile
+        cache.move_to_end(key)
+        if len(cache) <= self.max_cached:
+            return
+        pending = 0
+        with self._dirty_lock:
+            while len(cache) > self.max_cached:
+                old_key, old = cache.popitem(last=False)
+                self._compiled.pop(old_key, None)
+                self.evictions += 1
+                if old_key in self._dirty:
+                    self._writeback[old_key] = old
+                    self.writebacks += 1
+            pending = len(self._writeback)
+        if pending >= self.max_dirty:
+            self._wake.set()
+
+    def import_profiles(self, rows: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """Write ``(site, username, profile)`` rows straight to SQLite in one transaction.
+
+        For bulk loads (``backend/backfill.py``): the rows replace any stored
+        and cached copies without being held in the cache.
+        """
+        payloads = [(site, username, dumps(profile).decode('utf-8')) for site, username, profile in rows]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO profiles VALUES (?, ?, ?)', payloads)
+        with self._dirty_lock:
+            for site, username, _ in payloads:
+                self._cache.pop((site, username), None)
+                self._compiled.pop((site, username), None)
+                self._writeback.pop((site, username), None)
+                self._dirty.discard((site, username))
+        return len(payloads)
+
+    def compiled(self, site: str, username: str) -> Optional[CompiledProfile]:
+        """Match index for a profile, compiled on first use."""
+        key = (site, username)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            profile = self.get(site, username)
+            if profile is None:
+                return None
+            compiled = self._compiled[key] = compile_profile(profile)
+        return compiled
+
+    def apply_event(self, site: str, username: str, event: Dict[str, Any],
+                    profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Fold an event into a stored profile and its match index.
+
+        ``profile`` is the copy the caller already holds (from ``get_async``);
+        it is put back in the hot tier if it was evicted in the meantime.
+        """
+        key = (site, username)
+        if profile is None:
+            profile = self.get(site, username)
+        elif self._cache.get(key) is not profile:
+            with self._dirty_lock:
+                self._writeback.pop(key, None)
+            self._compiled.pop(key, None)
+            self._insert(key, profile)
+        update_profile_incremental(profile, event)
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            compiled.sync(profile)
+        self.mark_dirty(site, username)
+        return profile
+
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {'cached': len(self._cache), 'max_cached': self.max_cached, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions, 'writebacks': self.writebacks,
+                'writeback_pending': len(self._writeback)}
+
+    def mark_dirty(self, site: str, username: str):
+        with self._dirty_lock:
+            self._dirty.add((site, username))
+            pending = len(self._dirty)
+        if pending >= self.max_dirty:
+            self._wake.set()
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """Every profile as ``{site: {username: profile}}`` (cached copies win)."""
+        with self._lock:
+            rows = self._conn.execute('SELECT site, username, payload FROM profiles').fetchall()
+        with self._dirty_lock:
+            pending = {**self._flushing, **self._writeback, **self._cache}
+        result: Dict[str, Dict[str, Any]] = {}
+        for site, username, payload in rows:
+            profile = pending.get((site, username))
+            result.setdefault(site, {})[username] = profile if profile is not None else json.loads(payload)
+        for (site, username), profile in pending.items():
+            result.setdefault(site, {}).setdefault(username, profile)
+        return result
+
+    def iter_payloads(self, page_size: int = 500) -> Iterator[Tuple[str, str, bytes]]:
+        """Every profile as ``(site, username, json_bytes)`` in key order.
+
+        Rows are read in keyset pages, so memory stays at one page however
+        many profiles there are. Stored payloads are passed through without
+        being decoded; cached profiles (possibly newer) are re-encoded.
+        """
+        self.flush()
+        last = None
+        while True:
+            with self._lock:
+                if last is None:
+                    rows = self._conn.execute(
+                        'SELECT site, username, payload FROM profiles ORDER BY site, username LIMIT ?', (page_size,)
+                    ).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        'SELECT site, username, payload FROM profiles WHERE (site, username) > (?, ?) '
+                        'ORDER BY site, username LIMIT ?', (*last, page_size)
+                    ).fetchall()
+            for site, username, payload in rows:
+                profile = self._cache.get((site, username))
+                yield site, username, dumps(profile) if profile is not None else payload.encode('utf-8')
+            if len(rows) < page_size:
+                return
+            last = rows[-1][:2]
+
+    def flush(self):
+        """Write all dirty profiles in a single transaction."""
+        with self._flush_lock:
+            with self._dirty_lock:
+                if not self._dirty:
+                    return
+                dirty, self._dirty = self._dirty, set()
+                # held here until the write commits, so an eviction in the
+                # meantime cannot make a reader fall back to the old row
+                for key in dirty:
+                    profile = self._cache.get(key)
+                    if profile is None:
+                        profile = self._writeback.get(key)
+                    if profile is not None:
+                        self._flushing[key] = profile
+            started = time.perf_counter()
+            # plain dict/list/str payloads serialise without releasing the GIL,
+            # so this sees each profile in a consistent state
+            rows = [(site, username, dumps(profile).decode('utf-8'))
+                    for (site, username), profile in self._flushing.items()]
+            try:
+                with self._lock, self._conn:
+                    self._conn.executemany('INSERT OR REPLACE INTO profiles VALUES (?, ?, ?)', rows)
+            except BaseException:
+                # still dirty; keep evicted ones reachable for the next flush
+                with self._dirty_lock:
+                    for key, profile in self._flushing.items():
+                        self._dirty.add(key)
+                        if key not in self._cache:
+                            self._writeback.setdefault(key, profile)
+                    self._flushing.clear()
+                raise
+            with self._dirty_lock:
+                for key, profile in self._flushing.items():
+                    if self._writeback.get(key) is profile and key not in self._dirty:
+                        del self._writeback[key]
+                self._flushing.clear()
+            self.flushes += 1
+            if self.on_flush is not None:
+                self.on_flush(time.perf_counter() - started, len(rows))
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
+        self._read_conn.close()
+        self._conn.close()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+def load_profiles(db_path: str = PROFILES_DB_PATH) -> ProfileStore:
+    # Nothing is read up front: profiles come from SQLite on first access and
+    # only the hot set stays decoded, so startup is constant however many exist
+    return ProfileStore(db_path)
+
+def save_profiles(profiles):
+    if isinstance(profiles, ProfileStore):
+        profiles.flush()
+        return
+    # Export a plain dict to profiles.json atomically (temp file + rename)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(PROFILES_PATH), suffix='.tmp')
     try:
-        with open(PROFILES_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp_path, PROFILES_PATH)
     except Exception:
-        return DEFAULT_PROFILES.copy()
+        os.unlink(tmp_path)
+        raise
 
-def save_profiles(profiles: Dict[str, Any]):
-    with open(PROFILES_PATH, 'w', encoding='utf-8') as f:
-        json.dump(profiles, f, indent=2)
+# Streaming baseline parameters. Every observation multiplies older weights
+# by PROFILE_DECAY, so a value seen n logins ago counts PROFILE_DECAY ** n.
+PROFILE_DECAY = 0.98
+HOUR_TYPICAL_SHARE = 0.02
+TOP_K = {'device_fingerprints': 16, 'locations': 8, 'user_agents': 16, 'ip_addresses': 16}
+EVENT_FIELDS = {'device_fingerprints': 'device_fingerprint', 'locations': 'location',
+                'user_agents': 'user_agent', 'ip_addresses': 'ip_address'}
 
 def make_profile_from_events(events: List[Dict[str, Any]]) -> Dict[str, Any]:
-    # Compute simple aggregates: avg typing_speed, unique device fingerprints, locations, typical hours
-    typing_values = [e.get('typing_speed') for e in events if e.get('typing_speed') is not None]
-    device_set = list({e.get('device_fingerprint') for e in events if e.get('device_fingerprint')})
-    loc_set = list({e.get('location') for e in events if e.get('location')})
-    ua_set = list({e.get('user_agent') for e in events if e.get('user_agent')})
-    ip_set = list({e.get('ip_address') for e in events if e.get('ip_address')})
-    hours = [
-        int(e.get('access_time')[11:13])
-        for e in events
-        if e.get('access_time') and len(e.get('access_time')) >= 13
-    ]
-    avg_typing = sum(typing_values) / len(typing_values) if typing_values else None
-    std_typing = (sum((x - avg_typing) ** 2 for x in typing_values) / len(typing_values)) ** 0.5 if typing_values and len(typing_values) > 1 else None
-    hour_counts = {}
-    for h in hours:
-        hour_counts[h] = hour_counts.get(h, 0) + 1
-    # identify typical hour range as hours with occurrences
-    typical_hours = sorted(hour_counts.keys())
-
-    profile = {
-        'avg_typing_speed': avg_typing,
-        'std_typing_speed': std_typing,
-        'device_fingerprints': device_set,
-        'locations': loc_set,
-        'user_agents': ua_set,
-        'ip_addresses': ip_set,
-        'typical_hours': typical_hours,
-        'samples': len(events)
+    # A baseline is the streaming profile after folding in every event, so
+    # profiles built in bulk and profiles grown online follow the same rules
+    profile: Dict[str, Any] = {
+        'avg_typing_speed': None,
+        'std_typing_speed': None,
+        'device_fingerprints': [],
+        'locations': [],
+        'user_agents': [],
+        'ip_addresses': [],
+        'typical_hours': [],
+        'samples': 0
     }
+    for event in events:
+        update_profile_incremental(profile, event)
     return profile
 
+def _update_typing(profile: Dict[str, Any], value: float):
+    """Welford's online mean/variance (population std, as the baseline uses)."""
+    n = profile.get('typing_samples')
+    mean = profile.get('avg_typing_speed')
+    if mean is None:
+        n, mean, m2 = 0, 0.0, 0.0
+    elif n is None:
+        # profile from before streaming stats: seed the accumulator
+        n = profile.get('samples', 0) or 1
+        std = profile.get('std_typing_speed') or 0.0
+        m2 = std * std * n
+    else:
+        m2 = profile.get('typing_m2', 0.0)
+    n += 1
+    delta = value - mean
+    mean += delta / n
+    m2 += delta * (value - mean)
+    profile['typing_samples'] = n
+    profile['typing_m2'] = m2
+    profile['avg_typing_speed'] = mean
+    profile['std_typing_speed'] = (m2 / n) ** 0.5 if n > 1 else None
+
+def _update_top_k(profile: Dict[str, Any], list_key: str, value: Optional[str]):
+    """Decayed Space-Saving counts; the profile list holds the tracked keys.
+
+    Only an event that carries the field decays its counts, so a field most
+    events leave out is not forgotten by the events without it.
+    """
+    if not value:
+        return
+    counts = profile.get(list_key + '_counts')
+    if counts is None:
+        counts = {v: 1.0 for v in profile.get(list_key, []) if v}
+    for k in counts:
+        counts[k] *= PROFILE_DECAY
+    if value in counts:
+        counts[value] += 1.0
+    elif len(counts) < TOP_K[list_key]:
+        counts[value] = 1.0
+    else:
+        # replace the weakest entry and inherit its weight (Space-Saving)
+        weakest = min(counts, key=counts.get)
+        counts[value] = counts.pop(weakest) + 1.0
+    profile[list_key + '_counts'] = counts
+    profile[list_key] = list(counts)
+
+def _update_hours(profile: Dict[str, Any], hour: Optional[int]):
+    # as with the top-K counts, an event without a usable hour leaves the histogram alone
+    if hour is None or not 0 <= hour < 24:
+        return
+    weights = profile.get('hour_weights')
+    if weights is None:
+        weights = [0.0] * 24
+        for h in profile.get('typical_hours', []):
+            if 0 <= h < 24:
+                weights[h] = 1.0
+    weights = [w * PROFILE_DECAY for w in weights]
+    weights[hour] += 1.0
+    total = sum(weights)
+    profile['hour_weights'] = weights
+    profile['typical_hours'] = [h for h, w in enumerate(weights) if total and w >= HOUR_TYPICAL_SHARE * total]
+
 def update_profile_incremental(profile: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
-    # Update averages conservatively
+    """Fold one event into a profile using constant-size estimators.
+
+    Typing speed uses Welford's algorithm, hour of day an exponentially
+    decayed 24-bin histogram, and devices/locations/user agents/IPs decayed
+    top-K counts, so a profile stays the same size however many samples it
+    has seen.
+    """
     samples = profile.get('samples', 0)
     if event.get('typing_speed') is not None:
-        if profile.get('avg_typing_speed') is None:
-            profile['avg_typing_speed'] = event['typing_speed']
-            profile['std_typing_speed'] = None
-        else:
-            # incremental average
-            new_avg = (profile['avg_typing_speed'] * samples + event['typing_speed']) / (samples + 1)
-            # naive std update omitted for simplicity
-            profile['avg_typing_speed'] = new_avg
-    if event.get('device_fingerprint'):
-        if event['device_fingerprint'] not in profile.get('device_fingerprints', []):
-            profile.setdefault('device_fingerprints', []).append(event['device_fingerprint'])
-    if event.get('user_agent'):
-        if event['user_agent'] not in profile.get('user_agents', []):
-            profile.setdefault('user_agents', []).append(event['user_agent'])
-    if event.get('ip_address'):
-        if event['ip_address'] not in profile.get('ip_addresses', []):
-            profile.setdefault('ip_addresses', []).append(event['ip_address'])
-    if event.get('location'):
-        if event['location'] not in profile.get('locations', []):
-            profile.setdefault('locations', []).append(event['location'])
+        _update_typing(profile, event['typing_speed'])
+    for list_key, field in EVENT_FIELDS.items():
+        _update_top_k(profile, list_key, event.get(field))
+    hour = None
     if event.get('access_time') and len(event['access_time']) >= 13:
         try:
-            h = int(event['access_time'][11:13])
-            if 'typical_hours' not in profile:
-                profile['typical_hours'] = [h]
-            elif h not in profile['typical_hours']:
-                profile['typical_hours'].append(h)
-                profile['typical_hours'].sort()
+            hour = int(event['access_time'][11:13])
         except Exception:
             pass
+    _update_hours(profile, hour)
     profile['samples'] = samples + 1
     return profile
-
@@ -0,0 +1,223 @@
+import datetime
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+INF = float("inf")
+
+
+def parse_timestamp(value: str) -> float:
+    """ISO-8601 (optionally ``Z`` suffixed) -> epoch seconds."""
+    dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def created_timestamp(alert) -> float:
+    # compact records carry epoch time already; other objects an ISO string
+    ts = getattr(alert, "created_ts", None)
+    return ts if ts is not None else parse_timestamp(alert.created_at)
+
+
+class _SeqIndex:
+    """Ascending list of alert sequence numbers with O(1) amortised popleft.
+
+    Evicted entries are skipped with a head offset and compacted away once
+    they make up more than half of the list.
+    """
+
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.head = 0
+
+    def __len__(self):
+        return len(self.seqs) - self.head
+
+    def append(self, seq: int):
+        self.seqs.append(seq)
+
+    def first(self) -> int:
+        return self.seqs[self.head]
+
+    def popleft(self) -> int:
+        seq = self.seqs[self.head]
+        self.head += 1
+        if self.head >= 64 and self.head * 2 >= len(self.seqs):
+            self._compact()
+        return seq
+
+    def _compact(self):
+        del self.seqs[:self.head]
+        self.head = 0
+
+    def between(self, lo_seq: float, hi_seq: float, desc: bool) -> Iterator[int]:
+        """Yield sequence numbers strictly between ``lo_seq`` and ``hi_seq``."""
+        seqs = self.seqs
+        lo = bisect_right(seqs, lo_seq, self.head)
+        hi = bisect_left(seqs, hi_seq, self.head)
+        if desc:
+            for i in range(hi - 1, lo - 1, -1):
+                yield seqs[i]
+        else:
+            for i in range(lo, hi):
+                yield seqs[i]
+
+
+class _Timeline(_SeqIndex):
+    """Global insertion-ordered index that also keeps creation times."""
+
+    __slots__ = ("times",)
+
+    def __init__(self):
+        super().__init__()
+        self.times: List[float] = []
+
+    def append_at(self, seq: int, ts: float):
+        # keep times monotonic so they stay bisectable under clock jitter
+        if self.times and ts < self.times[-1]:
+            ts = self.times[-1]
+        self.seqs.append(seq)
+        self.times.append(ts)
+
+    def first_time(self) -> float:
+        return self.times[self.head]
+
+    def _compact(self):
+        del self.times[:self.head]
+        super()._compact()
+
+    def seq_bounds(self, after: Optional[float], before: Optional[float]) -> Tuple[float, float]:
+        """Map a ``[after, before)`` creation-time window to exclusive seq bounds."""
+        lo_seq, hi_seq = -INF, INF
+        n = len(self.seqs)
+        if after is not None:
+            i = bisect_left(self.times, after, self.head)
+            lo_seq = self.seqs[i] - 1 if i < n else INF
+        if before is not None:
+            i = bisect_left(self.times, before, self.head)
+            hi_seq = self.seqs[i] if i < n else INF
+        return lo_seq, hi_seq
+
+
+class AlertStore:
+    """In-memory alert store with secondary indexes and bounded retention.
+
+    Every alert gets a monotonically increasing sequence number, which is also
+    the pagination cursor. Per-username and per-severity indexes hold sequence
+    numbers in insertion (= creation time) order, so a filtered page costs
+    roughly the page size plus any entries skipped by the remaining filters.
+
+    Retention evicts from the oldest end only (by ``max_count`` and/or
+    ``max_age`` seconds), so every index drops its head in O(1).
+    """
+
+    def __init__(self, max_count: int = 0, max_age: float = 0):
+        self.max_count = max_count
+        self.max_age = max_age
+        self.clear()
+
+    def clear(self):
+        self._next_seq = 1
+        self._alerts: Dict[int, Any] = {}
+        self._by_id: Dict[str, int] = {}
+        self._timeline = _Timeline()
+        self._by_user: Dict[str, _SeqIndex] = {}
+        self._by_severity: Dict[str, _SeqIndex] = {}
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def __iter__(self):
+        return iter(list(self._alerts.values()))
+
+    def get(self, alert_id: str):
+        seq = self._by_id.get(alert_id)
+        return self._alerts.get(seq) if seq is not None else None
+
+    def seq_of(self, alert_id: str) -> Optional[int]:
+        return self._by_id.get(alert_id)
+
+    def oldest_seq(self) -> Optional[int]:
+        return self._timeline.first() if self._alerts else None
+
+    def add(self, alert, seq: Optional[int] = None) -> int:
+        # an explicit seq is used when reloading persisted alerts
+        if seq is None:
+            seq = self._next_seq
+        self._next_seq = max(self._next_seq, seq + 1)
+        self._alerts[seq] = alert
+        self._by_id[alert.alert_id] = seq
+        self._timeline.append_at(seq, created_timestamp(alert))
+        self._by_user.setdefault(alert.username, _SeqIndex()).append(seq)
+        self._by_severity.setdefault(alert.severity, _SeqIndex()).append(seq)
+        self.enforce_retention()
+        return seq
+
+    def enforce_retention(self, now: Optional[float] = None):
+        if self.max_count:
+            while len(self._alerts) > self.max_count:
+                self._evict_oldest()
+        if self.max_age:
+            cutoff = (now if now is not None else time.time()) - self.max_age
+            while self._alerts and self._timeline.first_time() < cutoff:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        seq = self._timeline.popleft()
+        alert = self._alerts.pop(seq)
+        self._by_id.pop(alert.alert_id, None)
+        for index_map, key in ((self._by_user, alert.username), (self._by_severity, alert.severity)):
+            index = index_map[key]
+            index.popleft()
+            if not len(index):
+                del index_map[key]
+        self.evicted += 1
+
+    def query(
+        self,
+        limit: int = 100,
+        cursor: Optional[int] = None,
+        severity: Optional[str] = None,
+        username: Optional[str] = None,
+        status: Optional[str] = None,
+        created_after: Optional[float] = None,
+        created_before: Optional[float] = None,
+        desc: bool = True,
+    ) -> Tuple[List[Any], Optional[int]]:
+        """Return one page of matching alerts and the cursor for the next page."""
+        self.enforce_retention()
+        candidates: List[_SeqIndex] = [self._timeline]
+        if username is not None:
+            candidates.append(self._by_user.get(username, _SeqIndex()))
+        if severity is not None:
+            candidates.append(self._by_severity.get(severity, _SeqIndex()))
+        # walk the most selective index, check the rest as predicates
+        index = min(candidates, key=len)
+
+        lo_seq, hi_seq = self._timeline.seq_bounds(created_after, created_before)
+        if cursor is not None:
+            if desc:
+                hi_seq = min(hi_seq, cursor)
+            else:
+                lo_seq = max(lo_seq, cursor)
+
+        page: List[Any] = []
+        last_seq = None
+        for seq in index.between(lo_seq, hi_seq, desc):
+            alert = self._alerts[seq]
+            if username is not None and alert.username != username:
+                continue
+            if severity is not None and alert.severity != severity:
+                continue
+            if status is not None and alert.status != status:
+                continue
+            if len(page) == limit:
+                # one more match exists past this page
+                return page, last_seq
+            page.append(alert)
+            last_seq = seq
+        return page, None
@@ -0,0 +1,477 @@
+"""Replay historical login logs through the detector and reporter in-process.
+
+Rebuilds reporter baselines and re-scores events without going through
+HTTP. Input files are NDJSON, JSON arrays or CSV with a header row, plain
+or gzip-compressed (detected from the file's magic bytes), and are read
+as a stream in chunks of ``--chunk-size`` events.
+
+Each chunk is split by a CRC32 of the username across ``--workers``
+processes. Each worker is a single-process pool, like the detector's
+shards, so one user's events are applied in file order by one process.
+A worker runs the detector's state machine (``advance_session``, with the
+behaviour model's verdicts when an artifact exists). It also runs the
+reporter's profile update: the first event builds the profile with
+``make_profile_from_events``, and later ones are scored like ``/check``
+and then folded in. Sliding-window velocity features need every user's
+traffic, so this process computes them in file order and passes them
+along.
+
+Results go straight into the stores:
+- Alerts are appended to ``--store`` after the alerts already there, as
+  the detector's ``record_alert`` would store them on event time: a repeat
+  within ``INCIDENT_WINDOW`` is counted on its open incident, a new alert
+  past the user's ``ALERT_RATE_PER_MINUTE`` / ``ALERT_BURST`` is dropped,
+  and rows beyond ``ALERT_RETENTION_MAX_COUNT`` / ``ALERT_RETENTION_MAX_AGE``
+  are deleted. ``--raw-alerts`` stores every alert as it was raised
+  (retention still applies).
+- Final sessions go to ``--store``, or to the per-shard stores with
+  ``--shards``.
+- Profiles go to ``--profiles-db``.
+
+Sessions and profiles are rebuilt from the replayed events only, and
+replace any stored ones for the same users. Run it with the services
+stopped, or restart them afterwards; they only read state at startup.
+
+Usage: PYTHONPATH=.. python backfill.py logs/ 2025-01.ndjson.gz [--workers N] [--store URL] [--profiles-db PATH] [--raw-alerts]
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from alert_store import parse_timestamp
+from detection import AccountLockedError, LoginEvent, advance_session, event_time_us, locate_events
+from records import AlertRecord, SessionRecord
+from sharding import shard_for, shard_store_url
+from state_store import open_state_store
+from windows import DEFAULT_LIMITS, VelocityTracker
+from automated_reporter import scoring, storage
+from automated_reporter.match_index import compile_profile
+from ml_models import ModelHandle
+import geoip
+import incidents
+import rules
+from serialization import loads
+
+LOG_SUFFIXES = (".ndjson", ".jsonl", ".json", ".csv")
+DEFAULT_STORE = os.getenv("DETECTOR_STORE", "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "detector.db"))
+DEFAULT_GEOIP_PATH = os.getenv("GEOIP_DB_PATH", geoip.DEFAULT_PATH)
+DEFAULT_RULES_PATH = os.getenv("RULES_PATH", rules.DEFAULT_PATH)
+DEFAULT_MODEL_PATH = os.getenv("DETECTOR_MODEL_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml_models", "artifacts", "behavior.npz"))
+# the detector's alert settings (main.py), so backfilled alerts are stored the way live ones are
+ALERT_RETENTION_MAX_COUNT = int(os.getenv("ALERT_RETENTION_MAX_COUNT", "100000"))
+ALERT_RETENTION_MAX_AGE = float(os.getenv("ALERT_RETENTION_MAX_AGE", "0"))
+INCIDENT_WINDOW = float(os.getenv("INCIDENT_WINDOW", "300"))
+ALERT_RATE_PER_MINUTE = float(os.getenv("ALERT_RATE_PER_MINUTE", "6"))
+ALERT_BURST = int(os.getenv("ALERT_BURST", "3"))
+
+
+# --- reading logs ---
+def iter_log_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name[:-3].endswith(LOG_SUFFIXES) if name.endswith(".gz") else name.endswith(LOG_SUFFIXES):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def open_log(path: str) -> io.TextIOBase:
+    """Text stream over a log file, decompressing it if it is gzip."""
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    event: Dict[str, Any] = {k: v for k, v in row.items() if k and v not in (None, "")}
+    if "typing_speed" in event:
+        try:
+            event["typing_speed"] = float(event["typing_speed"])
+        except ValueError:
+            pass
+    return event
+
+
+def read_log(path: str) -> Iterator[Dict[str, Any]]:
+    """Events from one NDJSON, JSON array or CSV file, in file order."""
+    name = path[:-3] if path.endswith(".gz") else path
+    with open_log(path) as f:
+        if name.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield _csv_row(row)
+            return
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            # legacy JSON array files are small enough to load whole
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def read_logs(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for path in iter_log_files(paths):
+        yield from read_log(path)
+
+
+def reporter_event(event: Dict[str, Any], site: str) -> Dict[str, Any]:
+    # the reporter reads the hour from an ISO access_time
+    return {**event, "site": event.get("site") or site, "access_time": event.get("timestamp") or event.get("access_time")}
+
+
+# --- worker process state ---
+# Each worker owns the sessions and profiles of every username hashing to
+# it, like a detector shard; they are returned to the parent at the end.
+_sessions: Dict[str, SessionRecord] = {}
+_profiles: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_compiled: Dict[Tuple[str, str], Any] = {}
+_options: Dict[str, Any] = {}
+_model = None
+_geo = None
+_rules = rules.DEFAULT_RULES
+
+
+def _init_worker(options: Dict[str, Any]):
+    global _model, _geo, _rules
+    _sessions.clear()
+    _profiles.clear()
+    _compiled.clear()
+    _options.clear()
+    _options.update(options)
+    _model = ModelHandle(options["model_path"]).model if options["detect"] and options["model_path"] else None
+    _geo = geoip.open_database(options["geoip_path"]) if options["detect"] else None
+    _rules = rules.load_rules(options["rules_path"]) if options["rules_path"] else rules.DEFAULT_RULES
+
+
+def _detect(events: List[Dict[str, Any]], signals: Optional[List[Dict[str, Any]]],
+            stats: Dict[str, int]) -> List[Dict[str, Any]]:
+    valid: List[Tuple[int, LoginEvent]] = []
+    for i, data in enumerate(events):
+        try:
+            valid.append((i, LoginEvent(**data)))
+        except ValueError:  # pydantic ValidationError included
+            stats["invalid"] += 1
+    if _geo is not None:
+        # as the detector does: locate by IP first, then hand the country on with the window signals
+        signals = list(signals) if signals else [{} for _ in events]
+        for (i, _), country in zip(valid, locate_events([e for _, e in valid], _geo)):
+            if country:
+                signals[i] = {**(signals[i] or {}), "ip_country": country}
+    verdicts = _model.verdicts([e.dict() for _, e in valid]) if _model is not None and valid else None
+    alerts = []
+    for n, (i, event) in enumerate(valid):
+        session = _sessions.get(event.username) or SessionRecord(event.username)
+        try:
+            alert = advance_session(session, event, verdicts[n] if verdicts else None,
+                                    signals[i] if signals else None,
+                                    _rules.detector(event.site or _options["site"]))
+        except AccountLockedError:
+            stats["locked"] += 1
+            continue
+        except ValueError:
+            # one event the detector cannot evaluate must not abort the whole backfill
+            stats["invalid"] += 1
+            continue
+        _sessions[event.username] = session
+        if alert:
+            # stamp historical alerts with the event's own time, not the replay's
+            ts = event_time_us(event)
+            if ts is not None:
+                alert.created_us = ts
+            alerts.append(alert.dict())
+    stats["alerts"] += len(alerts)
+    return alerts
+
+
+def _update_profiles(events: List[Dict[str, Any]], stats: Dict[str, int]):
+    # the same steps as the reporter's /check followed by its profile update
+    for raw in events:
+        if not raw.get("username"):
+            continue
+        data = reporter_event(raw, _options["site"])
+        key = (data["site"], data["username"])
+        profile = _profiles.get(key)
+        if profile is None:
+            _profiles[key] = storage.make_profile_from_events([data])
+            continue
+        compiled = _compiled.get(key)
+        if compiled is None:
+            compiled = _compiled[key] = compile_profile(profile)
+        site_rules = _rules.reporter(data["site"])
+        similarity, _ = scoring.score_event(profile, data, compiled, site_rules)
+        if similarity < site_rules.suspicious_below:
+            stats["suspicious"] += 1
+        storage.update_profile_incremental(profile, data)
+        compiled.sync(profile)
+
+
+def _process_chunk(events: List[Dict[str, Any]],
+                   signals: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Apply one partition of a chunk, in order; returns (alert dicts, counters)."""
+    stats = {"events": len(events), "alerts": 0, "locked": 0, "invalid": 0, "suspicious": 0}
+    alerts = _detect(events, signals, stats) if _options["detect"] else []
+    if _options["profiles"]:
+        _update_profiles(events, stats)
+    return alerts, stats
+
+
+def _drain(limit: int) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str, Dict[str, Any]]]]:
+    """Hand over (and forget) up to ``limit`` finished sessions and profiles."""
+    sessions = []
+    while _sessions and len(sessions) < limit:
+        sessions.append(_sessions.popitem()[1].dict())
+    profiles = []
+    while _profiles and len(profiles) < limit:
+        (site, username), profile = _profiles.popitem()
+        _compiled.pop((site, username), None)
+        profiles.append((site, username, profile))
+    return sessions, profiles
+
+
+# --- driver ---
+class AlertWriter:
+    """Append alerts to a state store the way the detector's ``record_alert`` does, on event time.
+
+    A repeat of an open incident is counted on it, and the incident is
+    written again (under its own seq) when it closes. A new alert that finds
+    the user's token bucket empty is dropped, except an account lock. Only
+    the newest ``max_count`` seqs are kept, as in the detector's AlertStore.
+    With ``raw`` every alert is written as it was raised.
+    """
+
+    def __init__(self, store, seq: int = 0, max_count: int = ALERT_RETENTION_MAX_COUNT,
+                 incident_window: float = INCIDENT_WINDOW, rate_per_minute: float = ALERT_RATE_PER_MINUTE,
+                 burst: int = ALERT_BURST, raw: bool = False):
+        self.store = store
+        self.seq = seq
+        self.max_count = max_count
+        self.open_incidents = (incidents.IncidentWindow(incident_window, on_close=self._write_incident)
+                               if incident_window > 0 and not raw else None)
+        self.limiter = incidents.TokenBucket(rate_per_minute / 60, burst) if rate_per_minute > 0 and not raw else None
+        # alert_id -> seq of the open incidents, and those updated since they were written
+        self._seqs: Dict[str, int] = {}
+        self._updated = set()
+
+    def _keep_from(self) -> Optional[int]:
+        return self.seq - self.max_count + 1 if self.max_count > 0 else None
+
+    def add(self, alert: AlertRecord) -> str:
+        """Store or count ``alert``; returns "alerts", "folded" or "rate_limited"."""
+        now = alert.created_ts
+        key = alert.signature
+        incident = self.open_incidents.get(key, now) if self.open_incidents is not None else None
+        if incident is not None and incident.status != "resolved":
+            incident.absorb(alert)
+            self._updated.add(incident.alert_id)
+            return "folded"
+        if self.limiter is not None and alert.action != "lock_account" and not self.limiter.allow(alert.username, now):
+            return "rate_limited"
+        self.seq += 1
+        if self.open_incidents is not None:
+            self._seqs[alert.alert_id] = self.seq
+            self.open_incidents.open(key, alert, now)
+        self.store.append_alert(self.seq, alert, keep_from=self._keep_from())
+        return "alerts"
+
+    def _write_incident(self, incident: AlertRecord):
+        seq = self._seqs.pop(incident.alert_id, None)
+        if incident.alert_id not in self._updated:
+            return
+        self._updated.discard(incident.alert_id)
+        keep_from = self._keep_from()
+        if seq is not None and (keep_from is None or seq >= keep_from):
+            self.store.append_alert(seq, incident, keep_from=keep_from)
+
+    def close(self):
+        """Write the incidents still open."""
+        if self.open_incidents is not None:
+            self.open_incidents.close_all()
+
+
+def _partition(chunk: List[Dict[str, Any]], signals: Optional[List[Dict[str, Any]]],
+               workers: int) -> Dict[int, Tuple[List[Dict[str, Any]], Optional[List[Dict[str, Any]]]]]:
+    parts: Dict[int, Tuple[List[Dict[str, Any]], Optional[List[Dict[str, Any]]]]] = {}
+    for i, event in enumerate(chunk):
+        p = shard_for(str(event.get("username") or ""), workers)
+        events, sigs = parts.setdefault(p, ([], [] if signals is not None else None))
+        events.append(event)
+        if sigs is not None:
+            sigs.append(signals[i])
+    return parts
+
+
+def _observe(velocity: VelocityTracker, chunk: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    out = []
+    for event in chunk:
+        if not event.get("username") or not event.get("device_fingerprint"):
+            # fails validation in the worker anyway
+            out.append(None)
+            continue
+        try:
+            ts = parse_timestamp(event["timestamp"])
+        except (KeyError, TypeError, AttributeError, ValueError):
+            ts = None
+        out.append(velocity.observe(str(event["username"]), str(event["device_fingerprint"]), ts))
+    return out
+
+
+def _chunks(events: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for event in events:
+        chunk.append(event)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def backfill(paths: List[str], workers: int = 0, store_url: str = DEFAULT_STORE, shards: int = 0,
+             profiles_db: Optional[str] = None, detect: bool = True, profiles: bool = True,
+             model_path: Optional[str] = DEFAULT_MODEL_PATH, geoip_path: Optional[str] = DEFAULT_GEOIP_PATH,
+             rules_path: Optional[str] = DEFAULT_RULES_PATH, site: str = "example.com",
+             velocity_window: float = 600.0, velocity_limits: Optional[Dict[str, int]] = None,
+             chunk_size: int = 5000, raw_alerts: bool = False,
+             progress_every: float = 2.0, out=sys.stderr) -> Dict[str, Any]:
+    """Replay ``paths`` and write the results into the stores; returns the totals."""
+    workers = workers or os.cpu_count() or 1
+    if rules_path and os.path.exists(rules_path):
+        rules.load_rules(rules_path)  # fail here on a bad file rather than in every worker
+    else:
+        rules_path = None
+    options = {"detect": detect, "profiles": profiles, "model_path": model_path, "geoip_path": geoip_path,
+               "rules_path": rules_path, "site": site}
+    velocity = VelocityTracker(velocity_window, limits=velocity_limits) if detect and velocity_window > 0 else None
+    state_store = open_state_store(store_url, max_age=ALERT_RETENTION_MAX_AGE) if detect else None
+    profile_store = None
+    if profiles:
+        profile_store = storage.ProfileStore(profiles_db or storage.PROFILES_DB_PATH, json_path=None, flush_interval=60)
+
+    writer = None
+    if state_store is not None:
+        last = state_store.load_alerts(limit=1)
+        writer = AlertWriter(state_store, last[0][0] if last else 0, max_count=ALERT_RETENTION_MAX_COUNT,
+                             incident_window=INCIDENT_WINDOW, rate_per_minute=ALERT_RATE_PER_MINUTE,
+                             burst=ALERT_BURST, raw=raw_alerts)
+    totals = {"events": 0, "alerts": 0, "folded": 0, "rate_limited": 0, "locked": 0, "invalid": 0,
+              "suspicious": 0, "sessions": 0, "profiles": 0}
+    started = time.perf_counter()
+    last_report = started
+
+    def report(final: bool = False):
+        elapsed = time.perf_counter() - started
+        rate = totals["events"] / elapsed if elapsed > 0 else 0.0
+        fields = " ".join(f"{k}={v}" for k, v in totals.items() if final or k not in ("sessions", "profiles"))
+        print(f"{'done' if final else 'progress'} {fields} rate={rate:.0f}/s elapsed={elapsed:.1f}s", file=out, flush=True)
+
+    def collect(futures):
+        alerts = []
+        for future in futures:
+            chunk_alerts, stats = future.result()
+            alerts.extend(AlertRecord.from_dict(data) for data in chunk_alerts)
+            for k, v in stats.items():
+                if k != "alerts":  # counted below, by what became of them
+                    totals[k] += v
+        # partitions return separately; keep each chunk's alerts in event time order
+        for alert in sorted(alerts, key=lambda a: a.created_us):
+            totals[writer.add(alert)] += 1
+
+    # spawn, so workers never inherit this process's store threads
+    ctx = multiprocessing.get_context("spawn")
+    pools = [ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_init_worker, initargs=(options,))
+             for _ in range(workers)]
+    try:
+        in_flight: Deque[list] = deque()
+        for chunk in _chunks(read_logs(paths), chunk_size):
+            signals = _observe(velocity, chunk) if velocity is not None else None
+            parts = _partition(chunk, signals, workers)
+            in_flight.append([pools[p].submit(_process_chunk, events, sigs) for p, (events, sigs) in parts.items()])
+            # bounded read-ahead: keeps every worker busy without buffering the whole file
+            while len(in_flight) > 2 * workers:
+                collect(in_flight.popleft())
+            now = time.perf_counter()
+            if progress_every and now - last_report >= progress_every:
+                last_report = now
+                report()
+        while in_flight:
+            collect(in_flight.popleft())
+        if writer is not None:
+            writer.close()
+
+        session_stores = [open_state_store(shard_store_url(store_url, i)) for i in range(shards)] if detect and shards else []
+        try:
+            for pool in pools:
+                while True:
+                    sessions, rows = pool.submit(_drain, 10000).result()
+                    if not sessions and not rows:
+                        break
+                    for data in sessions:
+                        record = SessionRecord.from_dict(data)
+                        target = session_stores[shard_for(record.username, shards)] if session_stores else state_store
+                        target.put_session(record)
+                    totals["sessions"] += len(sessions)
+                    if rows:
+                        totals["profiles"] += profile_store.import_profiles(rows)
+        finally:
+            for store in session_stores:
+                store.close()
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True)
+        if state_store is not None:
+            state_store.close()
+        if profile_store is not None:
+            profile_store.close()
+    report(final=True)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="log files (.ndjson/.jsonl/.json/.csv, optionally .gz) or directories")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: one per core)")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="detector store URL for alerts and sessions")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("DETECTOR_SHARDS", "0")),
+                        help="write sessions to the per-shard stores of a detector run with DETECTOR_SHARDS=N")
+    parser.add_argument("--profiles-db", default=None, help="reporter profile database (default: PROFILES_DB_PATH)")
+    parser.add_argument("--site", default="example.com", help="reporter site for events without one")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="behaviour model artifact (used if it exists)")
+    parser.add_argument("--geoip", default=DEFAULT_GEOIP_PATH, help="geo-IP database (used if it exists)")
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH, help="per-site rules file (used if it exists)")
+    parser.add_argument("--velocity-window", type=float, default=float(os.getenv("VELOCITY_WINDOW", "600")))
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--no-detect", action="store_true", help="skip the detector (alerts and sessions)")
+    parser.add_argument("--no-profiles", action="store_true", help="skip the reporter profiles")
+    parser.add_argument("--raw-alerts", action="store_true",
+                        help="store every alert, without incident folding or the per-user rate limit")
+    args = parser.parse_args()
+
+    limits = {
+        "account_events": int(os.getenv("VELOCITY_MAX_ACCOUNT_EVENTS", str(DEFAULT_LIMITS["account_events"]))),
+        "device_accounts": int(os.getenv("VELOCITY_MAX_DEVICE_ACCOUNTS", str(DEFAULT_LIMITS["device_accounts"]))),
+    }
+    backfill(args.inputs, workers=args.workers, store_url=args.store, shards=args.shards,
+             profiles_db=args.profiles_db, detect=not args.no_detect, profiles=not args.no_profiles,
+             model_path=args.model, geoip_path=args.geoip, rules_path=args.rules, site=args.site,
+             velocity_window=args.velocity_window, velocity_limits=limits, chunk_size=args.chunk_size,
+             raw_alerts=args.raw_alerts)
+
+
+if __name__ == "__main__":
+    main()
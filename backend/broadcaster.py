@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional, Set, Tuple
+
+
+class Subscriber:
+    """One connected alert stream with its own bounded outbound queue."""
+
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+
+    async def get(self) -> Optional[str]:
+        # None means the broadcaster closed this subscriber
+        return await self.queue.get()
+
+
+class AlertBroadcaster:
+    """Fan out newly created alerts to every connected websocket exactly once.
+
+    Alerts are serialised once by the publisher and the same text frame is
+    queued for each subscriber. Each subscriber queue is bounded: when it is
+    full the oldest pending frame is dropped, and a client that keeps falling
+    behind (more than ``max_drops`` drops) is disconnected so it can reconnect
+    and resume from its last seen ``stream_seq``.
+
+    Every frame is stamped with its own ``stream_seq``, increasing by one per
+    frame. Incident updates reuse their alert's ``alert_id``, so the sequence,
+    not the alert id, is the resume cursor. It starts from the wall clock in
+    microseconds, so cursors handed out before a restart stay below the new
+    ones. A small ring buffer of recent frames backs the resume.
+    """
+
+    def __init__(self, max_queue: int = 256, max_drops: int = 1024, history: int = 1000,
+                 start_seq: Optional[int] = None):
+        self.max_queue = max_queue
+        self.max_drops = max_drops
+        self.subscribers: Set[Subscriber] = set()
+        self.history: Deque[Tuple[int, str]] = deque(maxlen=history)
+        # sequence of the last frame published
+        self.seq = time.time_ns() // 1000 if start_seq is None else start_seq
+        self.published = 0
+        self.disconnected_slow = 0
+
+    def subscribe(self, after_seq: Optional[int] = None) -> Subscriber:
+        subscriber = Subscriber(self.max_queue)
+        for frame in self.replay_after(after_seq):
+            self._offer(subscriber, frame)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def replay_after(self, after_seq: Optional[int]):
+        """Return buffered frames with a ``stream_seq`` above ``after_seq``.
+
+        Without a cursor nothing is replayed. If the frames right after the
+        cursor have already fallen out of the buffer, or the cursor is not
+        one this broadcaster handed out, the whole buffer is replayed.
+        """
+        if after_seq is None:
+            return []
+        history = self.history
+        if not history or after_seq == self.seq:
+            return []
+        first = history[0][0]
+        if after_seq < first - 1 or after_seq > self.seq:
+            return [frame for _, frame in history]
+        return [frame for _, frame in list(history)[after_seq - first + 1:]]
+
+    def publish(self, payload: str) -> int:
+        """Stamp a serialised JSON object with the next ``stream_seq`` and queue it for all subscribers.
+
+        Never blocks the caller; returns the frame's sequence.
+        """
+        self.seq += 1
+        seq = self.seq
+        frame = f'{payload[:-1]},"stream_seq":{seq}}}'
+        self.history.append((seq, frame))
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            self._offer(subscriber, frame)
+        return seq
+
+    def _offer(self, subscriber: Subscriber, payload: str):
+        if subscriber.closed:
+            return
+        queue = subscriber.queue
+        if queue.full():
+            # drop-oldest policy for slow consumers
+            queue.get_nowait()
+            subscriber.dropped += 1
+            if subscriber.dropped > self.max_drops:
+                self.close(subscriber, slow=True)
+                return
+        queue.put_nowait(payload)
+
+    def close(self, subscriber: Subscriber, slow: bool = False):
+        """Detach a subscriber and wake its reader with a ``None`` sentinel."""
+        if subscriber.closed:
+            return
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+        if slow:
+            self.disconnected_slow += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def stats(self):
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "seq": self.seq,
+            "disconnected_slow": self.disconnected_slow,
+            "queued": sum(s.queue.qsize() for s in self.subscribers),
+        }
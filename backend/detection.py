@@ -0,0 +1,242 @@
+from pydantic import BaseModel, validator
+from typing import Any, Dict, List, Optional, Union
+import uuid
+import datetime
+import sys
+
+from records import AlertRecord, SessionRecord, EPOCH, ONE_US, epoch_us
+from travel import is_impossible_travel
+from rules import DEFAULT_RULES, DetectorRules
+
+# "HH:MM" -> hour; there are only 1440 of them
+_HOURS: Dict[str, int] = {}
+
+def normalize_access_time(value: str) -> str:
+    """``HH:MM`` from an ``HH:MM[:SS]`` time or an ISO-8601 datetime; ValueError for anything else."""
+    if value in _HOURS:
+        return value
+    text = value.strip()
+    if "T" in text:
+        # same reading as ml_models.behavior.event_hour: the datetime's own clock time
+        text = text.split("T", 1)[1]
+    hour, sep, rest = text.partition(":")
+    minute = rest[:2]
+    if (not sep or not hour.isdigit() or len(hour) > 2 or len(minute) != 2 or not minute.isdigit()
+            or int(hour) > 23 or int(minute) > 59):
+        raise ValueError(f"access_time must be HH:MM or an ISO-8601 datetime, not {value!r}")
+    return f"{int(hour):02d}:{minute}"
+
+# --- Models ---
+# These are the API shapes. Internally the detector keeps SessionRecord and
+# AlertRecord (records.py) and only builds these at the HTTP boundary.
+class LoginEvent(BaseModel):
+    event_id: str
+    timestamp: str
+    username: str
+    # selects the site's detection rules; the default rules when absent
+    site: Optional[str] = None
+    device_fingerprint: str
+    location: str
+    typing_speed: float
+    access_time: str
+    ip_address: Optional[str] = None
+
+    _access_time = validator("access_time", allow_reuse=True)(normalize_access_time)
+
+class AnomalyAlert(BaseModel):
+    alert_id: str
+    created_at: str
+    severity: str
+    score: float
+    username: str
+    reasons: List[str]
+    risk_factors: List[str]
+    status: str
+    action: Optional[str] = None
+    # an alert is also an incident: repeats within INCIDENT_WINDOW are counted
+    # here instead of being stored again; created_at is the first sighting
+    count: int = 1
+    last_seen: Optional[str] = None
+
+class UserSession(BaseModel):
+    username: str
+    locked: bool = False
+    last_location: Optional[str] = None
+    last_device_fingerprint: Optional[str] = None
+    last_access_time: Optional[str] = None
+    last_seen: Optional[str] = None
+
+# The detector has always used "UK" for GB
+COUNTRY_ALIASES = {"GB": "UK"}
+
+def locate_events(events: List[LoginEvent], geo) -> List[Optional[str]]:
+    """Country of each event's IP address in the geo-IP database (None if unknown).
+
+    Events that arrive without a location get the IP's country as their
+    location, so the location and travel rules still apply to them.
+    """
+    countries = []
+    for event in events:
+        hit = geo.lookup(event.ip_address) if event.ip_address else None
+        country = COUNTRY_ALIASES.get(hit[0], hit[0]) if hit else None
+        if country and not event.location:
+            event.location = country
+        countries.append(country)
+    return countries
+
+def event_time_us(event: LoginEvent) -> Optional[int]:
+    """The event's own timestamp as epoch microseconds, None if it does not parse."""
+    try:
+        return epoch_us(event.timestamp)
+    except ValueError:
+        return None
+
+# --- Enhanced anomaly detection logic ---
+# A rule that fires records its (risk factor, reason); the reason text is
+# only rendered, from (event, last location, IP country), once the event
+# turns out to alert
+_TYPING_MODEL = ("typing_speed", lambda e, last, ip: "Typing speed unusual for this user")
+_TYPING_SPEED = ("typing_speed", lambda e, last, ip: "Unusually high typing speed")
+_LOCATION = ("location", lambda e, last, ip: f"Unusual login location: {e.location}")
+_DEVICE = ("device_fingerprint", lambda e, last, ip: "Device fingerprint changed")
+_IMPOSSIBLE_TRAVEL = ("impossible_travel", lambda e, last, ip: f"Impossible travel from {last} to {e.location}")
+_LOCATION_SHIFT = ("location_shift", lambda e, last, ip: f"Sudden location shift from {last} to {e.location}")
+_VELOCITY = ("login_velocity", lambda e, last, ip: "Burst of logins on this account")
+_SHARED_DEVICE = ("shared_device", lambda e, last, ip: "Device used by many accounts recently")
+_IP_LOCATION = ("ip_location", lambda e, last, ip: f"IP address located in {ip}, not {e.location}")
+_ACCESS_TIME = ("access_time", lambda e, last, ip: f"Unusual access time: {e.access_time}")
+
+def access_hour(access_time: str) -> int:
+    # LoginEvent has already normalised access_time to HH:MM
+    hour = int(access_time.split(":")[0])
+    if len(_HOURS) < 4096:
+        _HOURS[access_time] = hour
+    return hour
+
+def detect_anomaly(event: LoginEvent, session: Union[SessionRecord, UserSession],
+                   verdict: Optional[Dict[str, Any]] = None,
+                   signals: Optional[Dict[str, Any]] = None,
+                   rules: Optional[DetectorRules] = None) -> Optional[AlertRecord]:
+    """Score one event against the user's session.
+
+    ``rules`` are the compiled rules for the event's site (see
+    ``rules.RuleSet.detector``); the built-in defaults when omitted.
+    ``verdict`` is the behaviour model's output for this event (see
+    ``ml_models.UserBehaviorModel.verdict``). When present, its per-user
+    typing, location and hour flags replace the fixed thresholds.
+    ``signals`` are the sliding-window features for this event
+    (``windows.VelocityTracker.observe``) plus, with a geo-IP database, the
+    country of its IP address (``ip_country``, see ``locate_events``).
+    """
+    if rules is None:
+        rules = DEFAULT_RULES.default_detector
+    fired = []
+    score = 0.0
+
+    # Typing speed anomaly
+    if verdict is not None:
+        if verdict["typing"]:
+            fired.append(_TYPING_MODEL)
+            score += rules.typing_speed
+    elif event.typing_speed > rules.max_typing_speed:
+        fired.append(_TYPING_SPEED)
+        score += rules.typing_speed
+
+    # Location anomaly
+    if (verdict["location"] if verdict is not None else event.location not in rules.usual_locations):
+        fired.append(_LOCATION)
+        score += rules.location
+
+    # Device fingerprint change
+    if session.last_device_fingerprint and session.last_device_fingerprint != event.device_fingerprint:
+        fired.append(_DEVICE)
+        score += rules.device_fingerprint
+
+    # Location shift: when both logins have timestamps, only a move faster
+    # than a plane counts; otherwise any change is suspicious
+    if session.last_location and session.last_location != event.location:
+        # Pydantic UserSessions carry no epoch time
+        last_seen = getattr(session, "last_seen_us", None)
+        now = event_time_us(event) if last_seen is not None else None
+        impossible = (is_impossible_travel(session.last_location, event.location, (now - last_seen) / 1e6)
+                      if now is not None else None)
+        if impossible:
+            fired.append(_IMPOSSIBLE_TRAVEL)
+            score += rules.impossible_travel
+        elif impossible is None:
+            fired.append(_LOCATION_SHIFT)
+            score += rules.location_shift
+
+    # Velocity: a burst on this account, or one device across many accounts
+    ip_country = None
+    if signals is not None:
+        if signals.get("account_burst"):
+            fired.append(_VELOCITY)
+            score += rules.login_velocity
+        if signals.get("shared_device"):
+            fired.append(_SHARED_DEVICE)
+            score += rules.shared_device
+        # Geo-IP: the address resolves to another country than the one reported
+        ip_country = signals.get("ip_country")
+        if ip_country and event.location and ip_country != COUNTRY_ALIASES.get(event.location, event.location):
+            fired.append(_IP_LOCATION)
+            score += rules.ip_location
+
+    # Unusual access time (e.g., late night): outside the usual-hours bitmask
+    if verdict is not None:
+        unusual_hour = verdict["hour"]
+    else:
+        hour = _HOURS.get(event.access_time)
+        if hour is None:
+            hour = access_hour(event.access_time)
+        unusual_hour = hour < 0 or not rules.hour_mask >> hour & 1
+    if unusual_hour:
+        fired.append(_ACCESS_TIME)
+        score += rules.access_time
+
+    if score >= rules.alert_at:
+        severity = "high" if score > rules.high_above else "medium"
+        action = "lock_account" if severity == "high" else "re_authenticate"
+        if rules.disabled:
+            # weight 0 rules added nothing to the score; leave them out of the alert too
+            fired = [rule for rule in fired if rule[0] not in rules.disabled]
+        last_location = session.last_location
+        now = datetime.datetime.utcnow()
+        alert = AlertRecord(
+            alert_id=f"A-{now.year:04d}{now.month:02d}{now.day:02d}-{uuid.uuid4().hex[:6]}",
+            created_us=(now - EPOCH) // ONE_US,
+            severity=severity,
+            score=score,
+            username=event.username,
+            reasons=[render(event, last_location, ip_country) for _, render in fired],
+            risk_factors=[factor for factor, _ in fired],
+            status="new",
+            action=action
+        )
+        return alert
+    return None
+
+class AccountLockedError(Exception):
+    """Raised when an event arrives for an account that is currently locked."""
+
+def advance_session(session: SessionRecord, event: LoginEvent,
+                    verdict: Optional[Dict[str, Any]] = None,
+                    signals: Optional[Dict[str, Any]] = None,
+                    rules: Optional[DetectorRules] = None) -> Optional[AlertRecord]:
+    """Run detection for one event and apply the resulting session transition.
+
+    This is the whole per-user state machine; whoever owns ``session`` (the
+    single-process app or a shard worker) calls it in event order.
+    """
+    if session.locked:
+        raise AccountLockedError(event.username)
+    alert = detect_anomaly(event, session, verdict, signals, rules)
+    if alert and alert.action == "lock_account":
+        session.locked = True
+    # Update session with last values (with or without an alert)
+    # locations and HH:MM times repeat across users; keep one copy of each
+    session.last_location = sys.intern(event.location)
+    session.last_device_fingerprint = event.device_fingerprint
+    session.last_access_time = sys.intern(event.access_time)
+    session.last_seen_us = event_time_us(event)
+    return alert
@@ -1,22 +1,67 @@
+import argparse
+import asyncio
 import json
 import httpx
+import os
+import zlib
 
+BACKEND_URL = 'http://localhost:8000'
 
-import json
-import httpx
-import os
+def load_events():
+    # Always resolve path relative to project root
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    events_path = os.path.join(root, 'synthetic_events.json')
+    if not os.path.exists(events_path):
+        # fallback: try current working directory
+        events_path = os.path.abspath('synthetic_events.json')
+    with open(events_path) as f:
+        return json.load(f)
+
+def replay_serial(events, base_url=BACKEND_URL):
+    for event in events:
+        r = httpx.post(f'{base_url}/api/login_event', json=event)
+        print(f"Sent event {event['event_id']}: status {r.status_code}")
+        if r.status_code == 200 and 'alert_id' in r.text:
+            print('  Alert:', r.text)
+
+def partition_by_username(events, lanes):
+    # Stable hash so all events of a user land in the same lane, in order
+    buckets = [[] for _ in range(lanes)]
+    for event in events:
+        buckets[zlib.crc32(event['username'].encode('utf-8')) % lanes].append(event)
+    return [b for b in buckets if b]
+
+async def _send_lane(client, base_url, lane, batch_size):
+    # Batches of one lane are sent one after another to keep per-user ordering
+    for start in range(0, len(lane), batch_size):
+        chunk = lane[start:start + batch_size]
+        body = '\n'.join(json.dumps(e) for e in chunk)
+        r = await client.post(f'{base_url}/api/login_events/batch', content=body,
+                              headers={'Content-Type': 'application/x-ndjson'})
+        r.raise_for_status()
+        data = r.json()
+        print(f"Sent batch of {data['processed']}: {data['summary']}")
+        for item in data['results']:
+            if 'alert' in item:
+                print('  Alert:', json.dumps(item['alert']))
+
+async def replay_batched(events, base_url=BACKEND_URL, batch_size=500, concurrency=4):
+    lanes = partition_by_username(events, concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+        await asyncio.gather(*(_send_lane(client, base_url, lane, batch_size) for lane in lanes))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay synthetic login events against the backend')
+    parser.add_argument('--url', default=BACKEND_URL)
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help='send events through the batch endpoint in chunks of this size (0 = one request per event)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='number of concurrent lanes in batched mode; events are partitioned by username')
+    args = parser.parse_args()
 
-# Always resolve path relative to project root
-root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-events_path = os.path.join(root, 'synthetic_events.json')
-if not os.path.exists(events_path):
-    # fallback: try current working directory
-    events_path = os.path.abspath('synthetic_events.json')
-with open(events_path) as f:
-    events = json.load(f)
-
-for event in events:
-    r = httpx.post('http://localhost:8000/api/login_event', json=event)
-    print(f"Sent event {event['event_id']}: status {r.status_code}")
-    if r.status_code == 200 and 'alert_id' in r.text:
-        print('  Alert:', r.text)
+    events = load_events()
+    if args.batch_size > 0:
+        asyncio.run(replay_batched(events, args.url, args.batch_size, args.concurrency))
+    else:
+        replay_serial(events, args.url)
@@ -0,0 +1,201 @@
+"""Replay an NDJSON event stream against the detector and/or reporter at a target rate.
+
+Events come from ``synthetic_data.py --events N`` (ground truth in
+``is_attack``). Requests are scheduled open-loop at ``--rps``; latency is
+measured from each request's scheduled send time, so a backed-up server
+shows up in the percentiles instead of silently lowering the offered load.
+
+Usage: python load_driver.py events.ndjson --rps 2000 [--target backend|reporter|both] [--warmup N]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+import numpy as np
+
+BACKEND_URL = 'http://localhost:8000'
+REPORTER_URL = 'http://localhost:8001'
+
+
+def read_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def reporter_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    # the reporter reads the hour from an ISO access_time
+    return {**event, 'access_time': event['timestamp']}
+
+
+class TargetStats:
+    """Latency samples, status counts and the detection confusion matrix for one target."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies_ms: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+        self.tp = self.fp = self.fn = self.tn = 0
+        self.unscored = 0
+
+    def record(self, latency_ms: float, status: str, predicted: Optional[bool], actual: bool):
+        self.latencies_ms.append(latency_ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if predicted is None:
+            self.unscored += 1
+        elif predicted:
+            if actual:
+                self.tp += 1
+            else:
+                self.fp += 1
+        elif actual:
+            self.fn += 1
+        else:
+            self.tn += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        lat = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99]).tolist()
+        return {
+            'target': self.name,
+            'requests': len(self.latencies_ms),
+            'errors': self.errors,
+            'throughput_rps': len(self.latencies_ms) / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': {'p50': p50, 'p95': p95, 'p99': p99, 'max': float(lat.max())},
+            'statuses': dict(sorted(self.statuses.items())),
+            'precision': self.tp / (self.tp + self.fp) if self.tp + self.fp else None,
+            'recall': self.tp / (self.tp + self.fn) if self.tp + self.fn else None,
+            'confusion': {'tp': self.tp, 'fp': self.fp, 'fn': self.fn, 'tn': self.tn, 'unscored': self.unscored},
+        }
+
+
+async def _send_backend(client: httpx.AsyncClient, url: str, event: Dict[str, Any]):
+    r = await client.post(f'{url}/api/login_event', json=event)
+    if r.status_code == 403:
+        # already locked by an earlier alert: the login is blocked
+        return str(r.status_code), True
+    if r.status_code != 200:
+        return str(r.status_code), None
+    return '200', 'alert_id' in r.json()
+
+
+async def _send_reporter(client: httpx.AsyncClient, url: str, event: Dict[str, Any]):
+    r = await client.post(f'{url}/check', json=reporter_event(event))
+    if r.status_code != 200:
+        # 404 = no baseline for this user yet; not a detection decision
+        return str(r.status_code), None
+    return '200', bool(r.json().get('suspicious'))
+
+
+async def _warm_up(client, targets, events, concurrency):
+    # build baselines from normal traffic only; not measured
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(event):
+        async with sem:
+            if 'backend' in targets:
+                await client.post(f"{targets['backend']}/api/login_event", json=event)
+            if 'reporter' in targets:
+                body = reporter_event(event)
+                await client.post(f"{targets['reporter']}/profiles/{body['site']}/{body['username']}/add_event",
+                                  json=body)
+
+    await asyncio.gather(*(one(e) for e in events if not e.get('is_attack')))
+
+
+async def run_load(events: Iterable[Dict[str, Any]], rps: float, targets: Dict[str, str], warmup: int = 0,
+                   max_in_flight: int = 1000, transport: Optional[httpx.AsyncBaseTransport] = None,
+                   timeout: float = 30.0) -> List[Dict[str, Any]]:
+    """Drive ``targets`` ({'backend': url, 'reporter': url}) and return one summary per target."""
+    events = iter(events)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    stats = {name: TargetStats(name) for name in targets}
+    senders = {'backend': _send_backend, 'reporter': _send_reporter}
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, transport=transport) as client:
+        if warmup:
+            await _warm_up(client, targets, list(itertools.islice(events, warmup)), min(max_in_flight, 64))
+
+        sem = asyncio.Semaphore(max_in_flight)
+        pending = set()
+
+        async def fire(name, event, scheduled):
+            try:
+                status, predicted = await senders[name](client, targets[name], event)
+            except httpx.HTTPError:
+                stats[name].errors += 1
+                status, predicted = 'error', None
+            finally:
+                sem.release()
+            stats[name].record((time.perf_counter() - scheduled) * 1000.0, status, predicted,
+                               bool(event.get('is_attack')))
+
+        started = time.perf_counter()
+        for i, event in enumerate(events):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            for name in targets:
+                await sem.acquire()
+                task = asyncio.create_task(fire(name, event, scheduled))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+        elapsed = time.perf_counter() - started
+    return [s.summary(elapsed) for s in stats.values()]
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lat = summary['latency_ms']
+
+    def pct(v):
+        return f'{v:.3f}' if v is not None else 'n/a'
+
+    return (
+        f"{summary['target']:<9} requests={summary['requests']} errors={summary['errors']} "
+        f"throughput={summary['throughput_rps']:.0f}/s "
+        f"p50={lat['p50']:.1f}ms p95={lat['p95']:.1f}ms p99={lat['p99']:.1f}ms "
+        f"precision={pct(summary['precision'])} recall={pct(summary['recall'])} statuses={summary['statuses']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('events', help="NDJSON file from synthetic_data.py, '-' for stdin")
+    parser.add_argument('--rps', type=float, default=500.0, help='target request rate per target')
+    parser.add_argument('--target', choices=['backend', 'reporter', 'both'], default='backend')
+    parser.add_argument('--backend-url', default=BACKEND_URL)
+    parser.add_argument('--reporter-url', default=REPORTER_URL)
+    parser.add_argument('--limit', type=int, default=0, help='stop after this many measured events')
+    parser.add_argument('--warmup', type=int, default=0, help='leading events used only to build baselines')
+    parser.add_argument('--max-in-flight', type=int, default=1000)
+    parser.add_argument('--json', action='store_true', help='print summaries as JSON')
+    args = parser.parse_args()
+
+    targets = {}
+    if args.target in ('backend', 'both'):
+        targets['backend'] = args.backend_url
+    if args.target in ('reporter', 'both'):
+        targets['reporter'] = args.reporter_url
+    events = read_ndjson(args.events)
+    if args.limit:
+        events = itertools.islice(events, args.limit + args.warmup)
+    summaries = asyncio.run(run_load(events, args.rps, targets, args.warmup, args.max_in_flight))
+    for s in summaries:
+        print(json.dumps(s) if args.json else format_summary(s))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,125 +1,377 @@
-from fastapi import FastAPI, WebSocket, Request, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional, Dict
-import uuid
-import datetime
-
-app = FastAPI()
-
-# --- Models ---
-class LoginEvent(BaseModel):
-    event_id: str
-    timestamp: str
-    username: str
-    device_fingerprint: str
-    location: str
-    typing_speed: float
-    access_time: str
-
-class AnomalyAlert(BaseModel):
-    alert_id: str
-    created_at: str
-    severity: str
-    score: float
-    username: str
-    reasons: List[str]
-    risk_factors: List[str]
-    status: str
-    action: Optional[str] = None
-
-class UserSession(BaseModel):
-    username: str
-    locked: bool = False
-    last_location: Optional[str] = None
-    last_device_fingerprint: Optional[str] = None
-    last_access_time: Optional[str] = None
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
+from pydantic import ValidationError
+from typing import List, Optional, Dict, Any, Literal, Tuple
+import json
+import asyncio
+import time
+import os
+
+from alert_store import AlertStore, parse_timestamp
+from detection import LoginEvent, AccountLockedError, advance_session, locate_events
+from records import AlertRecord, SessionRecord
+from broadcaster import AlertBroadcaster
+from state_store import open_state_store
+from sharding import ShardRouter
+from windows import VelocityTracker
+from ml_models import ModelHandle
+import geoip
+import incidents
+import ingest
+import rules
+from telemetry import CONTENT_TYPE, MetricsMiddleware, Registry, metrics_enabled
+from serialization import JSONBytesResponse, json_array_response
+
+app = FastAPI(default_response_class=JSONBytesResponse)
 
 # --- In-memory store for demo ---
-alerts: List[AnomalyAlert] = []
-user_sessions: Dict[str, UserSession] = {}
-
-# --- Enhanced anomaly detection logic ---
-def detect_anomaly(event: LoginEvent, session: UserSession) -> Optional[AnomalyAlert]:
-    reasons = []
-    risk_factors = []
-    score = 0.0
-
-    # Typing speed anomaly
-    if event.typing_speed > 200:
-        reasons.append("Unusually high typing speed")
-        risk_factors.append("typing_speed")
-        score += 0.3
-
-    # Location anomaly
-    if event.location not in ["IN", "US", "UK"]:
-        reasons.append(f"Unusual login location: {event.location}")
-        risk_factors.append("location")
-        score += 0.4
-
-    # Device fingerprint change
-    if session.last_device_fingerprint and session.last_device_fingerprint != event.device_fingerprint:
-        reasons.append("Device fingerprint changed")
-        risk_factors.append("device_fingerprint")
-        score += 0.3
-
-    # Location shift (sudden change)
-    if session.last_location and session.last_location != event.location:
-        reasons.append(f"Sudden location shift from {session.last_location} to {event.location}")
-        risk_factors.append("location_shift")
-        score += 0.4
-
-    # Unusual access time (e.g., late night)
-    hour = int(event.access_time.split(":")[0])
-    if hour < 6 or hour > 22:
-        reasons.append(f"Unusual access time: {event.access_time}")
-        risk_factors.append("access_time")
-        score += 0.2
-
-    if score >= 0.5:
-        severity = "high" if score > 0.8 else "medium"
-        action = "lock_account" if severity == "high" else "re_authenticate"
-        alert = AnomalyAlert(
-            alert_id=f"A-{datetime.datetime.utcnow().strftime('%Y%m%d')}-{str(uuid.uuid4())[:6]}",
-            created_at=datetime.datetime.utcnow().isoformat() + "Z",
-            severity=severity,
-            score=score,
-            username=event.username,
-            reasons=reasons,
-            risk_factors=risk_factors,
-            status="new",
-            action=action
-        )
+# Retention: keep at most N alerts and/or drop alerts older than N seconds (0 disables)
+ALERT_RETENTION_MAX_COUNT = int(os.getenv("ALERT_RETENTION_MAX_COUNT", "100000"))
+ALERT_RETENTION_MAX_AGE = float(os.getenv("ALERT_RETENTION_MAX_AGE", "0"))
+
+# Persistence: "memory" or "sqlite:///path/to/detector.db"
+DETECTOR_STORE = os.getenv("DETECTOR_STORE", "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "detector.db"))
+
+# Sharding: N > 0 moves session state into N worker processes partitioned by username
+DETECTOR_SHARDS = int(os.getenv("DETECTOR_SHARDS", "0"))
+
+# Behaviour model artifact (ml_models.train); hot-reloaded when the file changes
+DETECTOR_MODEL_PATH = os.getenv("DETECTOR_MODEL_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml_models", "artifacts", "behavior.npz"))
+MODEL_CHECK_INTERVAL = float(os.getenv("MODEL_CHECK_INTERVAL", "1.0"))
+
+# Per-site detection rules (rules/); hot-reloaded when the file changes, built-in defaults while it is missing
+RULES_PATH = os.getenv("RULES_PATH", rules.DEFAULT_PATH)
+RULES_CHECK_INTERVAL = float(os.getenv("RULES_CHECK_INTERVAL", "1.0"))
+
+# Sliding-window velocity features over event time (seconds; 0 disables)
+VELOCITY_WINDOW = float(os.getenv("VELOCITY_WINDOW", "600"))
+VELOCITY_LIMITS = {
+    "account_events": int(os.getenv("VELOCITY_MAX_ACCOUNT_EVENTS", "20")),
+    "device_accounts": int(os.getenv("VELOCITY_MAX_DEVICE_ACCOUNTS", "3")),
+}
+
+# Local geo-IP database (python -m geoip.build); enrichment is off while the file is missing
+GEOIP_DB_PATH = os.getenv("GEOIP_DB_PATH", geoip.DEFAULT_PATH)
+
+# Incidents (incidents/): repeats of an alert (same user, severity and risk factors) within INCIDENT_WINDOW
+# seconds of its last sighting are counted on it instead of stored again (0 disables)
+INCIDENT_WINDOW = float(os.getenv("INCIDENT_WINDOW", "300"))
+# Per-user token bucket in front of new alerts and incident updates (0 disables)
+ALERT_RATE_PER_MINUTE = float(os.getenv("ALERT_RATE_PER_MINUTE", "6"))
+ALERT_BURST = int(os.getenv("ALERT_BURST", "3"))
+
+# Streaming intake (ingest/): NDJSON or length-prefixed events over TCP ("host:port") or a Unix socket,
+# and/or an NDJSON log file to tail; each is off while unset
+DETECTOR_INGEST_TCP = os.getenv("DETECTOR_INGEST_TCP", "")
+DETECTOR_INGEST_UNIX = os.getenv("DETECTOR_INGEST_UNIX", "")
+DETECTOR_INGEST_TAIL = os.getenv("DETECTOR_INGEST_TAIL", "")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "2000"))
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "64"))
+
+alerts = AlertStore(max_count=ALERT_RETENTION_MAX_COUNT, max_age=ALERT_RETENTION_MAX_AGE)
+user_sessions: Dict[str, SessionRecord] = {}
+alert_broadcaster = AlertBroadcaster()
+state_store = open_state_store(DETECTOR_STORE, max_age=ALERT_RETENTION_MAX_AGE)
+shard_router = (ShardRouter(DETECTOR_SHARDS, DETECTOR_STORE, RULES_PATH, RULES_CHECK_INTERVAL)
+                if DETECTOR_SHARDS > 0 else None)
+model_handle = ModelHandle(DETECTOR_MODEL_PATH, check_interval=MODEL_CHECK_INTERVAL)
+rules_handle = rules.RulesHandle(RULES_PATH, check_interval=RULES_CHECK_INTERVAL)
+velocity = VelocityTracker(VELOCITY_WINDOW, limits=VELOCITY_LIMITS) if VELOCITY_WINDOW > 0 else None
+open_incidents = incidents.IncidentWindow(INCIDENT_WINDOW) if INCIDENT_WINDOW > 0 else None
+alert_limiter = incidents.TokenBucket(ALERT_RATE_PER_MINUTE / 60, ALERT_BURST) if ALERT_RATE_PER_MINUTE > 0 else None
+# incidents updated since they were last persisted and published (held back by the rate limit)
+unpublished_incidents: Dict[str, AlertRecord] = {}
+geo_db = geoip.open_database(GEOIP_DB_PATH)
+
+# --- Metrics (METRICS_ENABLED=0 turns recording and /metrics off) ---
+metrics = Registry(prefix="detector_", enabled=metrics_enabled())
+app.add_middleware(MetricsMiddleware, registry=metrics)
+STAGE_HELP = "Time spent in each detection stage"
+stage_geoip = metrics.histogram("stage_duration_seconds", STAGE_HELP, {"stage": "geoip"})
+stage_model = metrics.histogram("stage_duration_seconds", STAGE_HELP, {"stage": "model"})
+stage_velocity = metrics.histogram("stage_duration_seconds", STAGE_HELP, {"stage": "velocity"})
+stage_detect = metrics.histogram("stage_duration_seconds", STAGE_HELP, {"stage": "detect"})
+stage_record = metrics.histogram("stage_duration_seconds", STAGE_HELP, {"stage": "record_alert"})
+stage_persist = metrics.histogram("stage_duration_seconds", STAGE_HELP, {"stage": "persist_session"})
+stage_shards = metrics.histogram("stage_duration_seconds", STAGE_HELP, {"stage": "shards"})
+events_by_result = {
+    result: metrics.counter("events_total", "Login events processed by outcome", {"result": result})
+    for result in ("ok", "alert", "locked", "invalid")
+}
+metrics.gauge("alerts_stored", "Alerts held in the in-memory store", fn=lambda: len(alerts))
+metrics.counter("alerts_evicted_total", "Alerts dropped by retention", fn=lambda: alerts.evicted)
+metrics.gauge("sessions", "User sessions held by this process", fn=lambda: len(user_sessions))
+metrics.gauge("ws_subscribers", "Connected alert stream clients", fn=lambda: len(alert_broadcaster.subscribers))
+metrics.counter("ws_published_total", "Alerts published to the stream", fn=lambda: alert_broadcaster.published)
+metrics.gauge("store_pending_ops", "State store writes not yet committed", fn=lambda: state_store.pending())
+metrics.counter("store_failed_commits_total", "State store batches that failed to commit",
+                fn=lambda: getattr(state_store, "failed_batches", 0))
+metrics.gauge("model_loaded", "1 if a behaviour model is active", fn=lambda: int(model_handle.model is not None))
+metrics.gauge("velocity_keys", "Accounts and devices tracked in the velocity window",
+              fn=lambda: len(velocity) if velocity is not None else 0)
+metrics.counter("velocity_overflow_total", "Logins whose keys were not tracked because the window was full",
+                fn=lambda: velocity.overflow if velocity is not None else 0)
+alerts_folded = metrics.counter("alerts_folded_total", "Alerts counted on an open incident instead of stored")
+alerts_rate_limited = metrics.counter("alerts_rate_limited_total", "Alerts dropped by the per-user rate limit")
+metrics.gauge("incidents_open", "Incidents still absorbing repeats",
+              fn=lambda: len(open_incidents) if open_incidents is not None else 0)
+metrics.gauge("incidents_unpublished", "Incident updates held back by the rate limit",
+              fn=lambda: len(unpublished_incidents))
+
+def load_state():
+    """Rebuild the in-memory indexes from the persistent store."""
+    alerts.clear()
+    for seq, data in state_store.load_alerts(limit=ALERT_RETENTION_MAX_COUNT):
+        alerts.add(AlertRecord.from_dict(data), seq=seq)
+    user_sessions.clear()
+    for username, data in state_store.load_sessions().items():
+        user_sessions[username] = SessionRecord.from_dict(data)
+    if open_incidents is not None:
+        # recent incidents keep absorbing repeats across a restart
+        open_incidents.close_all()
+        for alert in alerts:
+            open_incidents.open(alert.signature, alert, alert.last_us / 1e6)
+        open_incidents.expire(time.time())
+
+load_state()
+
+async def ingest_events(events: List[LoginEvent]):
+    """Run a batch of streamed events, in order (the intake has validated each one already)."""
+    await process_login_events(events)
+
+ingest_server = ingest.IngestServer(ingest_events, batch_size=INGEST_BATCH_SIZE, max_pending=INGEST_MAX_PENDING,
+                                    validate=LoginEvent.parse_obj)
+metrics.gauge("ingest_connections", "Open streaming intake connections",
+              fn=lambda: ingest_server.stats["connections"])
+metrics.gauge("ingest_pending_chunks", "Decoded chunks waiting for the detector",
+              fn=lambda: ingest_server.queue.qsize())
+for name in ("bytes", "events", "parse_errors", "framing_errors", "invalid", "batches", "handler_errors"):
+    metrics.counter(f"ingest_{name}_total", f"Streaming intake {name.replace('_', ' ')}",
+                    fn=lambda name=name: ingest_server.stats[name])
+
+@app.on_event("startup")
+async def _on_startup():
+    if DETECTOR_INGEST_TCP:
+        host, _, port = DETECTOR_INGEST_TCP.rpartition(":")
+        await ingest_server.start_tcp(host or "0.0.0.0", int(port))
+    if DETECTOR_INGEST_UNIX:
+        await ingest_server.start_unix(DETECTOR_INGEST_UNIX)
+    if DETECTOR_INGEST_TAIL:
+        ingest_server.tail(DETECTOR_INGEST_TAIL)
+
+@app.on_event("shutdown")
+async def _on_shutdown():
+    await ingest_server.stop()
+    for incident in list(unpublished_incidents.values()):
+        publish_incident(incident)
+    if shard_router is not None:
+        shard_router.close()
+    state_store.close()
+
+def publish_incident(alert: AlertRecord):
+    """Persist and broadcast an alert's current state (the stream sees updates under the same alert_id, each with its own stream_seq)."""
+    unpublished_incidents.pop(alert.alert_id, None)
+    seq = alerts.seq_of(alert.alert_id)
+    if seq is None:
+        return  # already dropped by retention
+    state_store.append_alert(seq, alert, keep_from=alerts.oldest_seq())
+    alert_broadcaster.publish(alert.json())
+
+def _on_incident_closed(alert: AlertRecord):
+    if alert.alert_id in unpublished_incidents:
+        publish_incident(alert)
+
+if open_incidents is not None:
+    open_incidents.on_close = _on_incident_closed
+
+def record_alert(alert: AlertRecord) -> Optional[AlertRecord]:
+    """Store, persist and broadcast a new alert, or count it on its open incident.
+
+    Returns the stored alert the event ended up in, or None when the user's
+    rate limit dropped it. Each new alert and each published incident update
+    takes a token from the user's bucket. An update that finds the bucket
+    empty is still counted in memory and published with the next one that
+    gets through, or when the incident closes. A high-severity alert locks
+    the account, so it is never rate-limited: every lock has its alert.
+    """
+    started = time.perf_counter()
+    try:
+        now = alert.created_ts
+        key = alert.signature
+        limited = alert_limiter is not None and alert.action != "lock_account"
+        incident = open_incidents.get(key, now) if open_incidents is not None else None
+        if incident is not None and incident.status != "resolved" and alerts.get(incident.alert_id) is incident:
+            incident.absorb(alert)
+            alerts_folded.inc()
+            if not limited or alert_limiter.allow(alert.username, now):
+                publish_incident(incident)
+            else:
+                unpublished_incidents[incident.alert_id] = incident
+            return incident
+        if limited and not alert_limiter.allow(alert.username, now):
+            alerts_rate_limited.inc()
+            return None
+        seq = alerts.add(alert)
+        if open_incidents is not None:
+            open_incidents.open(key, alert, now)
+        state_store.append_alert(seq, alert, keep_from=alerts.oldest_seq())
+        alert_broadcaster.publish(alert.json())
         return alert
-    return None
+    finally:
+        stage_record.observe(time.perf_counter() - started)
+
+def process_login_event(event: LoginEvent, verdict: Optional[Dict[str, Any]] = None,
+                        signals: Optional[Dict[str, Any]] = None,
+                        ruleset: Optional[rules.RuleSet] = None) -> Optional[AlertRecord]:
+    """Run detection for one event against the in-process session table.
+
+    Shared by the single-event and batch endpoints so both go through the
+    exact same lock/unlock state machine. A repeat alert comes back as the
+    incident it was counted on.
+    """
+    session = user_sessions.get(event.username) or SessionRecord(event.username)
+    site_rules = (ruleset or rules_handle.get()).detector(event.site)
+    started = time.perf_counter()
+    try:
+        alert = advance_session(session, event, verdict, signals, site_rules)
+    finally:
+        stage_detect.observe(time.perf_counter() - started)
+    if alert:
+        alert = record_alert(alert) or alert
+    started = time.perf_counter()
+    user_sessions[event.username] = session
+    state_store.put_session(session)
+    stage_persist.observe(time.perf_counter() - started)
+    return alert
+
+async def process_login_events(events: List[LoginEvent]) -> List[Tuple[str, Optional[AlertRecord]]]:
+    """Run events in order; each result is ("ok"|"alert"|"locked"|"invalid", alert).
+
+    An event the detector cannot evaluate is "invalid" and changes nothing;
+    the rest of the list still runs.
+
+    In sharded mode the owning shard workers advance the sessions and this
+    process only records the alerts they return. With a behaviour model
+    loaded, the whole list is scored in one vectorised call first.
+    Velocity windows are updated here too, since only this process sees
+    every account and device. With a geo-IP database, events are located
+    by IP address first (missing locations filled in). The whole list is
+    judged by one snapshot of the rules.
+    """
+    countries = None
+    if geo_db is not None:
+        started = time.perf_counter()
+        countries = locate_events(events, geo_db)
+        stage_geoip.observe(time.perf_counter() - started)
+    model = model_handle.get()
+    verdicts = None
+    if model is not None:
+        started = time.perf_counter()
+        verdicts = model.verdicts([e.dict() for e in events])
+        stage_model.observe(time.perf_counter() - started)
+    signals = None
+    if velocity is not None:
+        started = time.perf_counter()
+        signals = velocity.observe_events(events)
+        stage_velocity.observe(time.perf_counter() - started)
+    if countries is not None:
+        signals = signals or [{} for _ in events]
+        for signal, country in zip(signals, countries):
+            if country:
+                signal["ip_country"] = country
+    results = []
+    if shard_router is not None:
+        started = time.perf_counter()
+        outcomes = await shard_router.process(events, verdicts, signals)
+        stage_shards.observe(time.perf_counter() - started)
+        for status, data in outcomes:
+            alert = AlertRecord.from_dict(data) if data else None
+            if alert:
+                alert = record_alert(alert) or alert
+            results.append((status, alert))
+    else:
+        ruleset = rules_handle.get()
+        for i, event in enumerate(events):
+            try:
+                alert = process_login_event(event, verdicts[i] if verdicts else None,
+                                            signals[i] if signals else None, ruleset)
+            except AccountLockedError:
+                results.append(("locked", None))
+                continue
+            except ValueError:
+                results.append(("invalid", None))
+                continue
+            results.append(("alert" if alert else "ok", alert))
+    for status, _ in results:
+        events_by_result[status].inc()
+    return results
 
 @app.post("/api/login_event")
 async def login_event(event: LoginEvent):
-    session = user_sessions.get(event.username, UserSession(username=event.username))
-    if session.locked:
+    [(status, alert)] = await process_login_events([event])
+    if status == "locked":
         raise HTTPException(status_code=403, detail="Account is locked due to suspicious activity")
-    alert = detect_anomaly(event, session)
+    if status == "invalid":
+        raise HTTPException(status_code=422, detail="Event could not be evaluated")
     if alert:
-        alerts.append(alert)
-        if alert.action == "lock_account":
-            session.locked = True
-        # Update session with last values
-        session.last_location = event.location
-        session.last_device_fingerprint = event.device_fingerprint
-        session.last_access_time = event.access_time
-        user_sessions[event.username] = session
-        return JSONResponse(alert.dict())
-    # Update session even if no alert
-    session.last_location = event.location
-    session.last_device_fingerprint = event.device_fingerprint
-    session.last_access_time = event.access_time
-    user_sessions[event.username] = session
+        return Response(alert.payload(), media_type="application/json")
     return {"result": "ok"}
 
+def parse_event_batch(body: bytes, content_type: str = "") -> List[Any]:
+    """Decode a batch body as either a JSON array or NDJSON (one object per line)."""
+    text = body.decode("utf-8").strip()
+    if not text:
+        return []
+    if "ndjson" in content_type or "jsonl" in content_type or not text.startswith("["):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    items = json.loads(text)
+    if not isinstance(items, list):
+        raise ValueError("batch body must be a JSON array")
+    return items
+
+@app.post("/api/login_events/batch")
+async def login_events_batch(request: Request):
+    try:
+        items = parse_event_batch(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+
+    # Events are processed in submission order, so each username sees its
+    # events in the same order as it would through /api/login_event.
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    counts = {"ok": 0, "alert": 0, "locked": 0, "invalid": 0}
+    valid: List[Tuple[int, LoginEvent]] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, LoginEvent.parse_obj(item)))
+        except ValidationError as e:
+            counts["invalid"] += 1
+            results[index] = {"index": index, "status": 422, "error": str(e)}
+
+    outcomes = await process_login_events([event for _, event in valid])
+    for (index, event), (status, alert) in zip(valid, outcomes):
+        counts[status] += 1
+        if status == "locked":
+            results[index] = {"index": index, "event_id": event.event_id, "status": 403,
+                              "error": "Account is locked due to suspicious activity"}
+        elif status == "invalid":
+            results[index] = {"index": index, "event_id": event.event_id, "status": 422,
+                              "error": "Event could not be evaluated"}
+        elif alert:
+            results[index] = {"index": index, "event_id": event.event_id, "status": 200, "alert": alert.dict()}
+        else:
+            results[index] = {"index": index, "event_id": event.event_id, "status": 200, "result": "ok"}
+    return {"processed": len(items), "summary": counts, "results": results}
+
 @app.post("/api/unlock_account")
 async def unlock_account(username: str):
+    if shard_router is not None:
+        if await shard_router.unlock(username):
+            return {"result": "Account unlocked"}
+        raise HTTPException(status_code=404, detail="User not found")
     if username in user_sessions:
         user_sessions[username].locked = False
+        state_store.put_session(user_sessions[username])
         return {"result": "Account unlocked"}
     raise HTTPException(status_code=404, detail="User not found")
 
@@ -130,17 +382,96 @@ async def re_authenticate(username: str):
 
 @app.get("/api/sessions")
 async def get_sessions():
+    if shard_router is not None:
+        return await shard_router.sessions()
     return {k: v.dict() for k, v in user_sessions.items()}
 
+@app.get("/api/model")
+async def get_model():
+    return model_handle.info()
+
+@app.post("/api/model/reload")
+async def reload_model():
+    # normally picked up automatically within MODEL_CHECK_INTERVAL seconds
+    model_handle.reload(force=True)
+    return model_handle.info()
+
+@app.get("/api/rules")
+async def get_rules():
+    return rules_handle.info()
+
+@app.post("/api/rules/reload")
+async def reload_rules():
+    # normally picked up automatically within RULES_CHECK_INTERVAL seconds
+    # (by this process and, separately, by each shard worker)
+    rules_handle.reload(force=True)
+    return rules_handle.info()
+
+@app.get("/api/ingest")
+async def get_ingest():
+    return ingest_server.info()
+
+@app.get("/metrics")
+async def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
 @app.get("/api/alerts")
-async def get_alerts():
-    return [a.dict() for a in alerts]
+async def get_alerts(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = None,
+    severity: Optional[str] = None,
+    username: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    order: Literal["asc", "desc"] = "desc",
+):
+    # Body stays a plain list; the cursor for the next page is returned in X-Next-Cursor, and the
+    # stream position the page reflects in X-Stream-Seq (pass it to /ws/alerts?after_seq= to follow on)
+    stream_seq = alert_broadcaster.seq
+    try:
+        after = parse_timestamp(created_after) if created_after else None
+        before = parse_timestamp(created_before) if created_before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="created_after/created_before must be ISO-8601 timestamps")
+    page, next_cursor = alerts.query(
+        limit=limit, cursor=cursor, severity=severity, username=username, status=status,
+        created_after=after, created_before=before, desc=order == "desc",
+    )
+    headers = {"X-Stream-Seq": str(stream_seq)}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    # each alert is encoded once (AlertRecord.payload) and spliced in as-is
+    return json_array_response([a.payload() for a in page], headers=headers)
+
+async def _watch_disconnect(websocket: WebSocket, subscriber):
+    # Incoming messages are ignored; this only notices idle clients going away
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        alert_broadcaster.close(subscriber)
 
 @app.websocket("/ws/alerts")
-async def ws_alerts(websocket: WebSocket):
+async def ws_alerts(websocket: WebSocket, after_seq: Optional[int] = None):
+    # Push-only stream: each new alert and incident update is sent once, stamped
+    # with stream_seq; pass the last one seen as ?after_seq= to resume after a reconnect.
     await websocket.accept()
-    while True:
-        # Send new alerts in real-time (for demo, just existing ones)
-        for alert in alerts:
-            await websocket.send_json(alert.dict())
-        await websocket.receive_text()  # Keep connection open
+    subscriber = alert_broadcaster.subscribe(after_seq)
+    watcher = asyncio.create_task(_watch_disconnect(websocket, subscriber))
+    try:
+        while True:
+            payload = await subscriber.get()
+            if payload is None:
+                break
+            await websocket.send_text(payload)
+        if not watcher.done():
+            # fell too far behind; client should reconnect with its cursor
+            await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        alert_broadcaster.close(subscriber)
@@ -0,0 +1,270 @@
+import datetime
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from serialization import dumps
+
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_US = datetime.timedelta(microseconds=1)
+
+
+class Codebook:
+    """Interns a small vocabulary of strings as ints 1..N (0 means "none").
+
+    Codes are per-process; anything that crosses a process or disk boundary
+    goes through ``dict()`` and back. The book stops growing at ``capacity``
+    so free-text input (e.g. arbitrary locations in reasons) cannot grow it
+    without bound; callers fall back to plain strings when ``code`` returns 0.
+    """
+
+    __slots__ = ("capacity", "_codes", "_strings")
+
+    def __init__(self, seed: Sequence[str] = (), capacity: int = 4095):
+        self.capacity = capacity
+        self._codes: Dict[str, int] = {}
+        self._strings: List[Optional[str]] = [None]
+        for s in seed:
+            self.code(s)
+
+    def __len__(self):
+        return len(self._strings) - 1
+
+    def code(self, s: Optional[str]) -> int:
+        if s is None:
+            return 0
+        c = self._codes.get(s)
+        if c is None:
+            if len(self._strings) > self.capacity:
+                return 0
+            c = self._codes[s] = len(self._strings)
+            self._strings.append(sys.intern(s))
+        return c
+
+    def string(self, c: int) -> Optional[str]:
+        return self._strings[c]
+
+
+CODE_BITS = 12
+CODE_MASK = (1 << CODE_BITS) - 1
+
+
+def pack(book: Codebook, strings: Sequence[str]) -> Union[int, Tuple[str, ...]]:
+    """Pack a short string list into one int of ``CODE_BITS``-wide codes.
+
+    Order is preserved. If any string has no code (book full) the list is
+    kept as a tuple instead.
+    """
+    packed = 0
+    for i, s in enumerate(strings):
+        c = book.code(s)
+        if not c:
+            return tuple(strings)
+        packed |= c << (CODE_BITS * i)
+    return packed
+
+
+def unpack(book: Codebook, packed: Union[int, Tuple[str, ...]]) -> List[str]:
+    if not isinstance(packed, int):
+        return list(packed)
+    out = []
+    while packed:
+        out.append(book.string(packed & CODE_MASK))
+        packed >>= CODE_BITS
+    return out
+
+
+# Seeded in detection order so the common phrases get the lowest codes
+REASONS = Codebook(["Unusually high typing speed", "Typing speed unusual for this user", "Device fingerprint changed",
+                    "Burst of logins on this account", "Device used by many accounts recently"])
+RISK_FACTORS = Codebook(["typing_speed", "location", "device_fingerprint", "location_shift", "impossible_travel",
+                         "access_time", "login_velocity", "shared_device", "ip_location"])
+SEVERITIES = Codebook(["low", "medium", "high"], capacity=255)
+STATUSES = Codebook(["new", "acknowledged", "resolved"], capacity=255)
+ACTIONS = Codebook(["lock_account", "re_authenticate"], capacity=255)
+
+
+def _intern(s: Optional[str]) -> Optional[str]:
+    return sys.intern(s) if s is not None else None
+
+
+def epoch_us(value: str) -> int:
+    """ISO-8601 (optionally ``Z`` suffixed) -> integer epoch microseconds, exactly."""
+    dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (dt - EPOCH) // ONE_US
+
+
+def format_epoch_us(us: int) -> str:
+    return (EPOCH + datetime.timedelta(microseconds=us)).isoformat() + "Z"
+
+
+class SessionRecord:
+    """Compact per-user session kept in the detector's session table.
+
+    Same fields as ``UserSession`` without the per-instance ``__dict__`` and
+    validation state; the repeating location and access time strings are
+    interned so every session shares one copy.
+    """
+
+    __slots__ = ("username", "locked", "last_location", "last_device_fingerprint", "last_access_time",
+                 "last_seen_us")
+
+    def __init__(self, username: str, locked: bool = False, last_location: Optional[str] = None,
+                 last_device_fingerprint: Optional[str] = None, last_access_time: Optional[str] = None,
+                 last_seen_us: Optional[int] = None):
+        self.username = username
+        self.locked = locked
+        self.last_location = _intern(last_location)
+        self.last_device_fingerprint = last_device_fingerprint
+        self.last_access_time = _intern(last_access_time)
+        # event time of the last login (epoch microseconds), for travel checks
+        self.last_seen_us = last_seen_us
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionRecord":
+        last_seen = data.get("last_seen")
+        return cls(data["username"], bool(data.get("locked", False)), data.get("last_location"),
+                   data.get("last_device_fingerprint"), data.get("last_access_time"),
+                   epoch_us(last_seen) if last_seen else None)
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "username": self.username,
+            "locked": self.locked,
+            "last_location": self.last_location,
+            "last_device_fingerprint": self.last_device_fingerprint,
+            "last_access_time": self.last_access_time,
+            "last_seen": format_epoch_us(self.last_seen_us) if self.last_seen_us is not None else None,
+        }
+
+    def to_model(self) -> "UserSession":
+        from detection import UserSession
+        return UserSession(**self.dict())
+
+
+class AlertRecord:
+    """Compact stored alert: codes, packed reason lists and an epoch timestamp.
+
+    Reasons and risk factors are packed code lists (``pack``), severity,
+    status and action are single codes, and ``created_us`` is integer epoch
+    microseconds. The ``AnomalyAlert`` field names are exposed as
+    properties, and ``dict()``/``json()`` produce the same payload as the
+    Pydantic model, so the alert store, persistence and API code can take
+    either; the model itself is only built on request (``to_model``).
+
+    The serialised payload is cached on first use (``payload``), so an alert
+    is encoded once for the stream, the state store and every API page.
+
+    A stored alert is also an incident: repeats of it (``absorb``) raise
+    ``count``, move ``last_seen`` and keep the highest ``score``, while
+    ``created_at`` stays the time it was first seen.
+    """
+
+    __slots__ = ("alert_id", "created_us", "last_us", "count", "score", "username", "_reasons", "_risk_factors",
+                 "_severity", "_status", "_action", "_payload")
+
+    def __init__(self, alert_id: str, created_us: int, severity: str, score: float, username: str,
+                 reasons: Sequence[str], risk_factors: Sequence[str], status: str = "new",
+                 action: Optional[str] = None, count: int = 1, last_us: Optional[int] = None):
+        self.alert_id = alert_id
+        self.created_us = created_us
+        self.last_us = last_us if last_us is not None else created_us
+        self.count = count
+        self.score = score
+        self.username = username
+        self._reasons = pack(REASONS, reasons)
+        self._risk_factors = pack(RISK_FACTORS, risk_factors)
+        self._severity = SEVERITIES.code(severity) or severity
+        self._status = STATUSES.code(status) or status
+        self._action = ACTIONS.code(action) or action
+        self._payload: Optional[bytes] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AlertRecord":
+        last_seen = data.get("last_seen")
+        return cls(data["alert_id"], epoch_us(data["created_at"]), data["severity"], float(data["score"]),
+                   data["username"], data["reasons"], data["risk_factors"], data["status"], data.get("action"),
+                   int(data.get("count", 1)), epoch_us(last_seen) if last_seen else None)
+
+    @property
+    def created_at(self) -> str:
+        return format_epoch_us(self.created_us)
+
+    @property
+    def created_ts(self) -> float:
+        return self.created_us / 1e6
+
+    @property
+    def last_seen(self) -> str:
+        return format_epoch_us(self.last_us)
+
+    @property
+    def signature(self) -> tuple:
+        """Equal for alerts on the same user with the same severity and risk factors."""
+        return (self.username, self._severity, self._risk_factors)
+
+    @property
+    def severity(self) -> str:
+        s = self._severity
+        return SEVERITIES.string(s) if isinstance(s, int) else s
+
+    @property
+    def status(self) -> str:
+        s = self._status
+        return STATUSES.string(s) if isinstance(s, int) else s
+
+    @status.setter
+    def status(self, value: str):
+        self._status = STATUSES.code(value) or value
+        self._payload = None
+
+    @property
+    def action(self) -> Optional[str]:
+        a = self._action
+        return ACTIONS.string(a) if isinstance(a, int) else a
+
+    def absorb(self, alert: "AlertRecord"):
+        """Fold a repeat (same ``signature``) into this incident."""
+        self.count += 1
+        if alert.last_us > self.last_us:
+            self.last_us = alert.last_us
+        if alert.score > self.score:
+            self.score = alert.score
+        self._payload = None
+
+    @property
+    def reasons(self) -> List[str]:
+        return unpack(REASONS, self._reasons)
+
+    @property
+    def risk_factors(self) -> List[str]:
+        return unpack(RISK_FACTORS, self._risk_factors)
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "alert_id": self.alert_id,
+            "created_at": self.created_at,
+            "severity": self.severity,
+            "score": self.score,
+            "username": self.username,
+            "reasons": self.reasons,
+            "risk_factors": self.risk_factors,
+            "status": self.status,
+            "action": self.action,
+            "count": self.count,
+            "last_seen": self.last_seen,
+        }
+
+    def payload(self) -> bytes:
+        p = self._payload
+        if p is None:
+            p = self._payload = dumps(self.dict())
+        return p
+
+    def json(self) -> str:
+        return self.payload().decode("utf-8")
+
+    def to_model(self) -> "AnomalyAlert":
+        from detection import AnomalyAlert
+        return AnomalyAlert(**self.dict())
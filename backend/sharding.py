@@ -0,0 +1,167 @@
+import asyncio
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from detection import LoginEvent, AccountLockedError, advance_session
+from records import SessionRecord
+from rules import RulesHandle
+from state_store import StateStore, open_state_store
+
+
+def shard_for(username: str, shards: int) -> int:
+    """Stable username -> shard mapping (same on every process and restart)."""
+    return zlib.crc32(username.encode("utf-8")) % shards
+
+
+def shard_store_url(url: str, shard: int) -> str:
+    """Per-shard store URL: ``sqlite:///x/detector.db`` -> ``sqlite:///x/detector.shard0.db``."""
+    if not url or url == "memory":
+        return "memory"
+    root, dot, ext = url.rpartition(".")
+    if not dot or "/" in ext:
+        return f"{url}.shard{shard}"
+    return f"{root}.shard{shard}.{ext}"
+
+
+# --- worker process state ---
+# Each shard worker is a single process that owns the sessions of every
+# username hashing to it; nothing else ever touches them.
+_sessions: Dict[str, SessionRecord] = {}
+_store: Optional[StateStore] = None
+_rules: Optional[RulesHandle] = None
+
+
+def _init_worker(store_url: str, rules_path: Optional[str] = None, rules_check_interval: float = 1.0):
+    global _store, _rules
+    _store = open_state_store(store_url)
+    # each worker watches the rules file itself; a batch uses one snapshot
+    _rules = RulesHandle(rules_path, check_interval=rules_check_interval)
+    _sessions.clear()
+    for username, data in _store.load_sessions().items():
+        _sessions[username] = SessionRecord.from_dict(data)
+
+
+def _process_batch(events: List[Dict[str, Any]],
+                   verdicts: Optional[List[Optional[Dict[str, Any]]]] = None,
+                   signals: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Advance the shard's sessions for already-validated events, in order.
+
+    An event that still fails to evaluate is reported as ``("invalid", None)``
+    without touching its session; the rest of the batch goes on.
+    """
+    results = []
+    ruleset = _rules.get()
+    for i, data in enumerate(events):
+        try:
+            event = LoginEvent(**data)
+            session = _sessions.get(event.username) or SessionRecord(event.username)
+            alert = advance_session(session, event, verdicts[i] if verdicts else None,
+                                    signals[i] if signals else None, ruleset.detector(event.site))
+        except AccountLockedError:
+            results.append(("locked", None))
+            continue
+        except ValueError:
+            # pydantic's ValidationError is a ValueError too
+            results.append(("invalid", None))
+            continue
+        _sessions[event.username] = session
+        _store.put_session(session)
+        results.append(("alert", alert.dict()) if alert else ("ok", None))
+    return results
+
+
+def _unlock(username: str) -> bool:
+    session = _sessions.get(username)
+    if session is None:
+        return False
+    session.locked = False
+    _store.put_session(session)
+    return True
+
+
+def _snapshot_sessions() -> Dict[str, Dict[str, Any]]:
+    return {k: v.dict() for k, v in _sessions.items()}
+
+
+def _close_worker():
+    _store.close()
+
+
+class ShardRouter:
+    """Hash-partition detector work by username across worker processes.
+
+    Every shard is a ``ProcessPoolExecutor`` with exactly one worker, so a
+    shard runs its calls strictly in submission order. Since a username
+    always maps to the same shard, all events for one user are applied
+    sequentially by one process and lock decisions stay consistent no
+    matter how many requests are in flight. Different shards run in
+    parallel on separate cores.
+
+    Shard workers persist their own sessions (``shard_store_url``); alerts
+    are returned to the caller, which keeps the single alert store and
+    broadcaster.
+    """
+
+    def __init__(self, shards: int, store_url: str = "memory", rules_path: Optional[str] = None,
+                 rules_check_interval: float = 1.0):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self.shards = shards
+        # spawn, so workers never inherit the router's threads or sockets
+        ctx = multiprocessing.get_context("spawn")
+        self._pools = [
+            ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_init_worker,
+                                initargs=(shard_store_url(store_url, i), rules_path, rules_check_interval))
+            for i in range(shards)
+        ]
+
+    def shard_for(self, username: str) -> int:
+        return shard_for(username, self.shards)
+
+    async def _call(self, shard: int, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pools[shard], fn, *args)
+
+    async def process(self, events: List[LoginEvent],
+                      verdicts: Optional[List[Dict[str, Any]]] = None,
+                      signals: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Run ``events`` through their shards; results come back in input order.
+
+        Each result is ``("ok", None)``, ``("alert", alert_dict)``,
+        ``("locked", None)`` or ``("invalid", None)``. ``verdicts`` (behaviour model) and ``signals``
+        (sliding windows) are per-event inputs computed once by the caller,
+        which sees every user's and device's traffic.
+        """
+        parts: Dict[int, List[int]] = {}
+        for i, event in enumerate(events):
+            parts.setdefault(self.shard_for(event.username), []).append(i)
+        shard_ids = list(parts)
+        outputs = await asyncio.gather(*(
+            self._call(s, _process_batch, [events[i].dict() for i in parts[s]],
+                       [verdicts[i] for i in parts[s]] if verdicts else None,
+                       [signals[i] for i in parts[s]] if signals else None)
+            for s in shard_ids
+        ))
+        results: List[Any] = [None] * len(events)
+        for s, out in zip(shard_ids, outputs):
+            for i, result in zip(parts[s], out):
+                results[i] = result
+        return results
+
+    async def unlock(self, username: str) -> bool:
+        return await self._call(self.shard_for(username), _unlock, username)
+
+    async def sessions(self) -> Dict[str, Dict[str, Any]]:
+        merged: Dict[str, Dict[str, Any]] = {}
+        for part in await asyncio.gather(*(self._call(s, _snapshot_sessions) for s in range(self.shards))):
+            merged.update(part)
+        return merged
+
+    def close(self):
+        for pool in self._pools:
+            try:
+                pool.submit(_close_worker).result()
+            finally:
+                pool.shutdown(wait=True)
@@ -0,0 +1,243 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from alert_store import created_timestamp
+from serialization import dumps, loads
+
+log = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Persistence interface for detector state (alerts and user sessions).
+
+    Writes are fire-and-forget from the request path; implementations decide
+    how and when they reach disk. ``load_*`` is only called at startup.
+    """
+
+    def load_alerts(self, limit: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        return []
+
+    def load_sessions(self) -> Dict[str, Dict[str, Any]]:
+        return {}
+
+    def append_alert(self, seq: int, alert, keep_from: Optional[int] = None):
+        pass
+
+    def put_session(self, session):
+        pass
+
+    def pending(self) -> int:
+        """Operations accepted but not yet committed."""
+        return 0
+
+    def flush(self):
+        """Block until everything enqueued so far is committed; raises if a commit failed."""
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """No persistence: state lives only as long as the process."""
+
+
+class SQLiteStateStore(StateStore):
+    """Embedded SQLite store in WAL mode with group commit.
+
+    Request handlers only enqueue operations. A single writer thread drains
+    the queue and commits everything that arrived within ``commit_interval``
+    (or up to ``max_batch`` operations) in one transaction. Session writes
+    are coalesced per username inside a batch, and alert retention is applied
+    with one ranged delete per batch: by sequence (what the in-memory store
+    still holds) and, with ``max_age``, by creation time.
+
+    A batch that fails to commit is logged and dropped, and the writer moves
+    on. ``flush`` and ``close`` raise the first error since the last call, so
+    callers that wait for durability find out.
+
+    On startup the database file plus its WAL are the snapshot and log tail;
+    SQLite replays the tail on open, and ``load_alerts`` only reads back the
+    newest ``limit`` alerts that retention would keep anyway.
+    """
+
+    def __init__(self, path: str, commit_interval: float = 0.05, max_batch: int = 5000, max_age: float = 0):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self._queue: "queue.Queue" = queue.Queue()
+        conn = self._connect()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS alerts (
+                seq INTEGER PRIMARY KEY,
+                alert_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_us INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS sessions (
+                username TEXT PRIMARY KEY,
+                payload TEXT NOT NULL
+            );
+            """
+        )
+        if "created_us" not in [row[1] for row in conn.execute("PRAGMA table_info(alerts)")]:
+            # databases written before age retention; their rows are only trimmed by sequence
+            conn.execute("ALTER TABLE alerts ADD COLUMN created_us INTEGER")
+        conn.execute("CREATE INDEX IF NOT EXISTS alerts_created_us ON alerts (created_us)")
+        conn.commit()
+        conn.close()
+        self.commits = 0
+        self.failed_batches = 0
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._run, name="state-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- startup ---
+    def load_alerts(self, limit: int = 0, chunk_size: int = 1000) -> List[Tuple[int, Dict[str, Any]]]:
+        if limit:
+            query = ("SELECT seq, payload FROM (SELECT seq, payload FROM alerts ORDER BY seq DESC LIMIT ?) "
+                     "ORDER BY seq")
+            params: Tuple[int, ...] = (limit,)
+        else:
+            query, params = "SELECT seq, payload FROM alerts ORDER BY seq", ()
+        alerts: List[Tuple[int, Dict[str, Any]]] = []
+        conn = self._connect()
+        try:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                # one bulk decode per chunk is much cheaper than a loads per row,
+                # and only one chunk of payload text is held at a time
+                payloads = loads("[" + ",".join(payload for _, payload in rows) + "]")
+                alerts.extend((row[0], payload) for row, payload in zip(rows, payloads))
+        finally:
+            conn.close()
+        return alerts
+
+    def load_sessions(self) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT username, payload FROM sessions").fetchall()
+        finally:
+            conn.close()
+        return {username: loads(payload) for username, payload in rows}
+
+    # --- request path (non-blocking) ---
+    def append_alert(self, seq: int, alert, keep_from: Optional[int] = None):
+        # AlertRecord.json() reuses the payload already encoded for the stream
+        created_us = int(created_timestamp(alert) * 1e6)
+        self._queue.put(("alert", seq, alert.alert_id, alert.json(), created_us, keep_from))
+
+    def put_session(self, session):
+        self._queue.put(("session", session.username, dumps(session.dict()).decode("utf-8")))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until everything enqueued so far is committed."""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait()
+        self._raise_error()
+
+    def close(self):
+        self._queue.put(("stop",))
+        self._writer.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    # --- writer thread ---
+    def _run(self):
+        conn = self._connect()
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.commit_interval
+            while batch[-1][0] not in ("flush", "stop") and len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            stop = self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[tuple]) -> bool:
+        alert_rows = []
+        sessions: Dict[str, str] = {}
+        keep_from = None
+        waiters = []
+        stop = False
+        for op in batch:
+            kind = op[0]
+            if kind == "alert":
+                alert_rows.append(op[1:5])
+                if op[5] is not None:
+                    keep_from = op[5] if keep_from is None else max(keep_from, op[5])
+            elif kind == "session":
+                sessions[op[1]] = op[2]
+            elif kind == "flush":
+                waiters.append(op[1])
+            elif kind == "stop":
+                stop = True
+        try:
+            if alert_rows or sessions:
+                with conn:
+                    if alert_rows:
+                        conn.executemany("INSERT OR REPLACE INTO alerts (seq, alert_id, payload, created_us) "
+                                         "VALUES (?, ?, ?, ?)", alert_rows)
+                    if keep_from is not None:
+                        conn.execute("DELETE FROM alerts WHERE seq < ?", (keep_from,))
+                    if self.max_age:
+                        cutoff = int((time.time() - self.max_age) * 1e6)
+                        conn.execute("DELETE FROM alerts WHERE created_us < ?", (cutoff,))
+                    if sessions:
+                        conn.executemany("INSERT OR REPLACE INTO sessions (username, payload) VALUES (?, ?)", list(sessions.items()))
+                self.commits += 1
+        except Exception as e:
+            # the batch is lost, but the writer keeps going; the next flush()/close() raises
+            log.exception("state store: commit of %d operations failed", len(batch))
+            self.failed_batches += 1
+            if self._error is None:
+                self._error = e
+        finally:
+            for done in waiters:
+                done.set()
+        return stop
+
+
+def open_state_store(url: str, max_age: float = 0) -> StateStore:
+    """Build a store from a URL: ``memory`` or ``sqlite:///path/to/file.db``.
+
+    ``max_age`` (seconds, 0 = off) drops persisted alerts older than that.
+    """
+    if not url or url == "memory":
+        return MemoryStateStore()
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteStateStore(path, max_age=max_age)
+    raise ValueError(f"Unsupported DETECTOR_STORE: {url}")
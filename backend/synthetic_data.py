@@ -1,4 +1,7 @@
 import random, uuid, datetime, json
+import argparse
+import itertools
+import sys
 
 locations = ["IN", "US", "UK", "RU", "CN", "BR"]
 users = ["alice", "bob", "carol", "eve"]
@@ -26,8 +29,161 @@ def generate_attack():
         "access_time": f"{random.randint(0,23):02d}:{random.randint(0,59):02d}"
     }
 
+# --- High-volume streaming generator ---
+HOME_LOCATIONS = ["IN", "US", "UK", "DE", "FR", "BR", "JP", "AU", "CA", "SG"]
+ATTACK_LOCATIONS = ["RU", "CN", "KP", "IR", "NG", "RO"]
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_4) AppleWebKit/605.1.15 Version/16.5 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/118.0",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 Chrome/120.0 Mobile Safari/537.36",
+]
+ATTACK_USER_AGENTS = ["python-requests/2.31.0", "curl/8.4.0", "Mozilla/5.0 (X11; Linux x86_64) HeadlessChrome/119.0"]
+
+DEVICE_CHURN = 0.005      # chance a normal login comes from a brand-new device the user keeps
+TRAVEL_START = 0.002      # chance a login starts a trip abroad
+CAMPAIGN_START = 0.25     # share of attack slots that open a new campaign rather than continue one
+
+
+def _hex_id(rng, bits=64):
+    return "%0*x" % (bits // 4, rng.getrandbits(bits))
+
+
+def make_user(index, rng):
+    """Habits for one synthetic user: home, devices, typing rhythm and active hours."""
+    start = rng.choice([6, 7, 8, 9, 10, 12, 14, 18])
+    return {
+        "username": f"user{index:06d}",
+        "home": rng.choice(HOME_LOCATIONS),
+        "devices": [f"dev-{_hex_id(rng, 32)}" for _ in range(rng.randint(1, 3))],
+        "user_agents": rng.sample(USER_AGENTS, rng.randint(1, 2)),
+        "ip_prefix": f"{rng.randint(11, 199)}.{rng.randint(0, 255)}.",
+        "typing_mean": rng.uniform(90, 190),
+        "typing_std": rng.uniform(4, 15),
+        "hours": [h % 24 for h in range(start, start + rng.randint(6, 12))],
+        "activity": rng.paretovariate(1.5),
+        "trip": None,
+    }
+
+
+def _new_campaign(rng, users, number):
+    # credential stuffing from a small attacker pool against many accounts
+    return {
+        "id": f"campaign-{number}",
+        "location": rng.choice(ATTACK_LOCATIONS),
+        "devices": [f"dev-{_hex_id(rng, 32)}" for _ in range(rng.randint(1, 4))],
+        "user_agent": rng.choice(ATTACK_USER_AGENTS),
+        "ip_prefix": f"{rng.randint(200, 223)}.{rng.randint(0, 255)}.",
+        "targets": rng.sample(users, min(len(users), rng.randint(5, 200))),
+        "typing": rng.uniform(230, 320),
+    }
+
+
+def stream_events(n_events, n_users=1000, seed=0, attack_rate=0.02, start=None, site="example.com"):
+    """Yield ``n_events`` realistic login events, reproducible for a given ``seed``.
+
+    Each user has a home location, a few devices and user agents, a typing
+    speed distribution and a window of active hours; normal logins follow
+    those habits with occasional device churn and trips abroad. About
+    ``attack_rate`` of the events belong to attack campaigns that hit many
+    accounts from a small pool of attacker devices and locations.
+
+    Events carry both detector fields (``access_time`` is ``HH:MM``) and
+    reporter fields (``site``, ``user_agent``, ``ip_address``), plus the
+    ground truth in ``is_attack`` and ``campaign``.
+    """
+    rng = random.Random(seed)
+    population = [make_user(i, rng) for i in range(n_users)]
+    # cumulative weights once, so each pick is a bisect instead of O(users)
+    cum_weights = list(itertools.accumulate(u["activity"] for u in population))
+    clock = start or datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    campaigns = []
+    # roughly 50 logins per user per day
+    step = 86400.0 / max(1, n_users * 50)
+    for _ in range(n_events):
+        clock += datetime.timedelta(seconds=rng.expovariate(1.0 / step))
+        if rng.random() < attack_rate:
+            if not campaigns or rng.random() < CAMPAIGN_START:
+                campaigns.append(_new_campaign(rng, population, len(campaigns)))
+                campaigns = campaigns[-8:]
+            camp = rng.choice(campaigns)
+            user = rng.choice(camp["targets"])
+            event = {
+                "username": user["username"],
+                "device_fingerprint": rng.choice(camp["devices"]),
+                "location": camp["location"],
+                "typing_speed": round(rng.gauss(camp["typing"], 8), 1),
+                "hour": rng.randrange(24),
+                "user_agent": camp["user_agent"],
+                "ip_address": camp["ip_prefix"] + f"{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                "is_attack": True,
+                "campaign": camp["id"],
+            }
+        else:
+            user = rng.choices(population, cum_weights=cum_weights)[0]
+            if user["trip"] and user["trip"][1] <= 0:
+                user["trip"] = None
+            if user["trip"] is None and rng.random() < TRAVEL_START:
+                user["trip"] = [rng.choice([h for h in HOME_LOCATIONS if h != user["home"]]), rng.randint(2, 20)]
+            if user["trip"]:
+                user["trip"][1] -= 1
+            if rng.random() < DEVICE_CHURN:
+                user["devices"].append(f"dev-{_hex_id(rng, 32)}")
+                user["devices"] = user["devices"][-4:]
+            event = {
+                "username": user["username"],
+                "device_fingerprint": user["devices"][-1] if rng.random() < 0.7 else rng.choice(user["devices"]),
+                "location": user["trip"][0] if user["trip"] else user["home"],
+                "typing_speed": round(rng.gauss(user["typing_mean"], user["typing_std"]), 1),
+                "hour": rng.choice(user["hours"]),
+                "user_agent": rng.choice(user["user_agents"]),
+                "ip_address": user["ip_prefix"] + f"{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                "is_attack": False,
+                "campaign": None,
+            }
+        hour = event.pop("hour")
+        minute = rng.randrange(60)
+        yield {
+            "event_id": f"evt-{_hex_id(rng)}",
+            "timestamp": clock.strftime("%Y-%m-%dT%H:%M:%S.%f") + "Z",
+            "site": site,
+            "access_time": f"{hour:02d}:{minute:02d}",
+            **event,
+        }
+
+
+def write_ndjson(events, out):
+    # one write per chunk keeps millions of events cheap
+    chunk = []
+    for event in events:
+        chunk.append(json.dumps(event))
+        if len(chunk) >= 10000:
+            out.write("\n".join(chunk) + "\n")
+            chunk = []
+    if chunk:
+        out.write("\n".join(chunk) + "\n")
+
+
 if __name__ == "__main__":
-    normal = [generate_event() for _ in range(10)]
-    attacks = [generate_attack() for _ in range(3)]
-    with open("synthetic_events.json", "w") as f:
-        json.dump(normal + attacks, f, indent=2)
+    parser = argparse.ArgumentParser(description="Generate synthetic login events")
+    parser.add_argument("--events", type=int, default=0,
+                        help="stream this many events as NDJSON (0 = write the small synthetic_events.json sample)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--attack-rate", type=float, default=0.02)
+    parser.add_argument("--out", default="-", help="output file, '-' for stdout")
+    args = parser.parse_args()
+
+    if args.events <= 0:
+        normal = [generate_event() for _ in range(10)]
+        attacks = [generate_attack() for _ in range(3)]
+        with open("synthetic_events.json", "w") as f:
+            json.dump(normal + attacks, f, indent=2)
+    else:
+        stream = stream_events(args.events, args.users, args.seed, args.attack_rate)
+        if args.out == "-":
+            write_ndjson(stream, sys.stdout)
+        else:
+            with open(args.out, "w", encoding="utf-8") as f:
+                write_ndjson(stream, f)
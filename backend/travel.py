@@ -0,0 +1,55 @@
+import math
+from typing import Optional
+
+# Approximate country centroids (lat, lon) for ISO-3166 alpha-2 codes, plus
+# "UK" which the detector has always used for GB.
+COUNTRY_CENTROIDS = {
+    "US": (39.8, -98.6), "CA": (56.1, -106.3), "MX": (23.6, -102.6), "BR": (-14.2, -51.9),
+    "AR": (-38.4, -63.6), "CL": (-35.7, -71.5), "CO": (4.6, -74.3), "PE": (-9.2, -75.0),
+    "VE": (6.4, -66.6), "UK": (55.4, -3.4), "GB": (55.4, -3.4), "IE": (53.4, -8.2),
+    "FR": (46.2, 2.2), "DE": (51.2, 10.5), "ES": (40.5, -3.7), "PT": (39.4, -8.2),
+    "IT": (41.9, 12.6), "NL": (52.1, 5.3), "BE": (50.5, 4.5), "CH": (46.8, 8.2),
+    "AT": (47.5, 14.6), "SE": (60.1, 18.6), "NO": (60.5, 8.5), "DK": (56.3, 9.5),
+    "FI": (61.9, 25.7), "PL": (51.9, 19.1), "CZ": (49.8, 15.5), "HU": (47.2, 19.5),
+    "RO": (45.9, 25.0), "GR": (39.1, 21.8), "UA": (48.4, 31.2), "RU": (61.5, 105.3),
+    "TR": (39.0, 35.2), "IL": (31.0, 34.9), "IR": (32.4, 53.7), "AE": (23.4, 53.8),
+    "SA": (23.9, 45.1), "EG": (26.8, 30.8), "MA": (31.8, -7.1), "NG": (9.1, 8.7),
+    "KE": (0.0, 37.9), "ZA": (-30.6, 22.9), "IN": (20.6, 79.0), "PK": (30.4, 69.3),
+    "BD": (23.7, 90.4), "CN": (35.9, 104.2), "HK": (22.3, 114.2), "TW": (23.7, 121.0),
+    "JP": (36.2, 138.3), "KR": (35.9, 127.8), "KP": (40.3, 127.5), "SG": (1.35, 103.8),
+    "MY": (4.2, 102.0), "ID": (-0.8, 113.9), "TH": (15.9, 101.0), "VN": (14.1, 108.3),
+    "PH": (12.9, 121.8), "AU": (-25.3, 133.8), "NZ": (-40.9, 174.9),
+}
+
+EARTH_RADIUS_KM = 6371.0
+# Faster than this between two logins is treated as impossible travel
+MAX_TRAVEL_KMH = 1000.0
+# Centroids are only approximate; distances under this are always plausible
+DISTANCE_SLACK_KM = 500.0
+
+
+def distance_km(a: str, b: str) -> Optional[float]:
+    """Great-circle distance between two country centroids, None if either is unknown."""
+    pa = COUNTRY_CENTROIDS.get(a)
+    pb = COUNTRY_CENTROIDS.get(b)
+    if pa is None or pb is None:
+        return None
+    lat1, lon1 = math.radians(pa[0]), math.radians(pa[1])
+    lat2, lon2 = math.radians(pb[0]), math.radians(pb[1])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def is_impossible_travel(a: str, b: str, seconds: float) -> Optional[bool]:
+    """Whether going from ``a`` to ``b`` in ``seconds`` beats ``MAX_TRAVEL_KMH``.
+
+    None when either location has no known coordinates.
+    """
+    km = distance_km(a, b)
+    if km is None:
+        return None
+    km -= DISTANCE_SLACK_KM
+    if km <= 0:
+        return False
+    # anything under a minute counts as simultaneous
+    return km / (max(abs(seconds), 60.0) / 3600.0) > MAX_TRAVEL_KMH
@@ -0,0 +1,203 @@
+import math
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import numpy as np
+
+from alert_store import parse_timestamp
+
+MASK64 = (1 << 64) - 1
+
+
+class HyperLogLog:
+    """Distinct-count sketch that stays exact while small.
+
+    Starts as a set of 64-bit hashes and switches to ``2**p`` one-byte
+    registers once it holds more than ``2**p / 16`` of them, so a device
+    used by a couple of accounts costs a tiny set and one hammered by an
+    attack costs at most ``2**p`` bytes (~1.6% error at p=12, 3.3% at p=10).
+    """
+
+    __slots__ = ("p", "hashes", "registers")
+
+    def __init__(self, p: int = 10):
+        self.p = p
+        self.hashes: Optional[Set[int]] = set()
+        self.registers: Optional[np.ndarray] = None
+
+    def add(self, h: int):
+        if self.registers is None:
+            self.hashes.add(h)
+            if len(self.hashes) > (1 << self.p) >> 4:
+                self.registers = np.zeros(1 << self.p, dtype=np.uint8)
+                for x in self.hashes:
+                    self._set(x)
+                self.hashes = None
+        else:
+            self._set(h)
+
+    def _set(self, h: int):
+        width = 64 - self.p
+        idx = h >> width
+        rank = width - (h & ((1 << width) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+
+def estimate_union(sketches: List[HyperLogLog]) -> int:
+    """Distinct count over the union of ``sketches`` (all with the same ``p``)."""
+    if all(s.registers is None for s in sketches):
+        if len(sketches) == 1:
+            return len(sketches[0].hashes)
+        return len(set().union(*(s.hashes for s in sketches)))
+    merged = HyperLogLog(sketches[0].p)
+    merged.hashes = None
+    merged.registers = np.zeros(1 << merged.p, dtype=np.uint8)
+    for s in sketches:
+        if s.registers is not None:
+            np.maximum(merged.registers, s.registers, out=merged.registers)
+        else:
+            for h in s.hashes:
+                merged._set(h)
+    m = float(1 << merged.p)
+    regs = merged.registers
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / float(np.ldexp(1.0, -regs.astype(np.int32)).sum())
+    zeros = int(np.count_nonzero(regs == 0))
+    if estimate <= 2.5 * m and zeros:
+        # linear counting is more accurate at low cardinality
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+class _Slice:
+    __slots__ = ("epoch", "users", "devices", "device_users")
+
+    def __init__(self, epoch: int):
+        self.epoch = epoch
+        self.users: Dict[str, int] = {}
+        self.devices: Dict[str, int] = {}
+        self.device_users: Dict[str, HyperLogLog] = {}
+
+
+DEFAULT_LIMITS = {
+    # logins for one account within the window
+    "account_events": 20,
+    # distinct accounts seen on one device fingerprint within the window
+    "device_accounts": 3,
+}
+
+
+class VelocityTracker:
+    """Sliding-window login rates per account and per device.
+
+    The window is a ring of ``buckets`` time slices of ``window / buckets``
+    seconds each, keyed by event time. Each slice counts logins per username
+    and per device and keeps a ``HyperLogLog`` of usernames per device;
+    running totals make a rate lookup O(1). When time moves past a slice it
+    is dropped whole and its counts subtracted, so state only covers keys
+    active within the window. ``max_keys`` caps the number of tracked keys
+    under a flood of unique values: beyond it new keys are not tracked
+    (counted in ``overflow``).
+
+    Events older than the window are ignored; late events inside it are
+    attributed to the newest slice.
+    """
+
+    def __init__(self, window: float = 600.0, buckets: int = 10, max_keys: int = 1_000_000,
+                 limits: Optional[Dict[str, int]] = None, p: int = 10):
+        if window <= 0 or buckets < 1:
+            raise ValueError("window and buckets must be positive")
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self.max_keys = max_keys
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.p = p
+        self._slices: Deque[_Slice] = deque()
+        self._user_totals: Dict[str, int] = {}
+        self._device_totals: Dict[str, int] = {}
+        self.overflow = 0
+        self.latest: Optional[float] = None
+
+    def __len__(self):
+        return len(self._user_totals) + len(self._device_totals)
+
+    def _slice_for(self, ts: float) -> Optional[_Slice]:
+        epoch = int(ts // self.width)
+        slices = self._slices
+        if slices and epoch <= slices[-1].epoch:
+            return slices[-1] if epoch > slices[-1].epoch - self.buckets else None
+        while slices and slices[0].epoch <= epoch - self.buckets:
+            self._expire(slices.popleft())
+        current = _Slice(epoch)
+        slices.append(current)
+        return current
+
+    def _expire(self, old: _Slice):
+        for totals, counts in ((self._user_totals, old.users), (self._device_totals, old.devices)):
+            for key, n in counts.items():
+                left = totals[key] - n
+                if left:
+                    totals[key] = left
+                else:
+                    del totals[key]
+
+    def _bump(self, totals: Dict[str, int], counts: Dict[str, int], key: str) -> int:
+        total = totals.get(key)
+        if total is None:
+            if len(self) >= self.max_keys:
+                self.overflow += 1
+                return 1
+            total = 0
+        totals[key] = total + 1
+        counts[key] = counts.get(key, 0) + 1
+        return total + 1
+
+    def observe(self, username: str, device: str, ts: Optional[float] = None) -> Dict[str, Any]:
+        """Count one login and return its window features and limit flags.
+
+        ``ts`` is the event time in epoch seconds; without it the latest
+        event time seen so far is used.
+        """
+        if ts is None:
+            ts = self.latest if self.latest is not None else 0.0
+        elif self.latest is None or ts > self.latest:
+            self.latest = ts
+        current = self._slice_for(ts)
+        if current is None:
+            account_events = self._user_totals.get(username, 0)
+            device_events = self._device_totals.get(device, 0)
+            device_accounts = self._distinct(device)
+        else:
+            account_events = self._bump(self._user_totals, current.users, username)
+            device_events = self._bump(self._device_totals, current.devices, device)
+            if device in self._device_totals:
+                sketch = current.device_users.get(device)
+                if sketch is None:
+                    sketch = current.device_users[device] = HyperLogLog(self.p)
+                # str hashes are salted per process, which is fine for in-process state
+                sketch.add(hash(username) & MASK64)
+            device_accounts = self._distinct(device)
+        limits = self.limits
+        return {
+            "account_events": account_events,
+            "device_events": device_events,
+            "device_accounts": device_accounts,
+            "account_burst": account_events > limits["account_events"],
+            "shared_device": device_accounts > limits["device_accounts"],
+        }
+
+    def _distinct(self, device: str) -> int:
+        sketches = [s.device_users[device] for s in self._slices if device in s.device_users]
+        return estimate_union(sketches) if sketches else 0
+
+    def observe_events(self, events: List[Any]) -> List[Dict[str, Any]]:
+        """``observe`` for a list of ``LoginEvent``s, in order."""
+        out = []
+        for event in events:
+            try:
+                ts = parse_timestamp(event.timestamp)
+            except ValueError:
+                ts = None
+            out.append(self.observe(event.username, event.device_fingerprint, ts))
+        return out
@@ -0,0 +1,76 @@
+"""Compare the scalar /check scorer with the vectorised batch scorer.
+
+Usage: python -m benchmarks.bench_batch_scoring [--events N] [--profiles N]
+"""
+import argparse
+import random
+import time
+
+from automated_reporter import scoring
+from automated_reporter.match_index import compile_profile
+
+UAS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 13_4) AppleWebKit/605.1.15 Version/16.5 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/118.0',
+]
+
+
+def make_dataset(n_events, n_profiles, seed=1):
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(n_profiles):
+        profiles.append({
+            'avg_typing_speed': rng.uniform(100, 220),
+            'std_typing_speed': rng.uniform(5, 30),
+            'device_fingerprints': [f'dev-{rng.randint(0, 50)}' for _ in range(rng.randint(1, 5))],
+            'locations': rng.sample(['US', 'IN', 'UK', 'DE', 'BR'], rng.randint(1, 3)),
+            'user_agents': rng.sample(UAS, rng.randint(1, 3)),
+            'ip_addresses': [f'10.{rng.randint(0, 255)}.' for _ in range(rng.randint(1, 3))],
+            'typical_hours': sorted(rng.sample(range(24), rng.randint(3, 10))),
+            'samples': 20,
+        })
+    pairs = []
+    for _ in range(n_events):
+        profile = rng.choice(profiles)
+        pairs.append((profile, {
+            'typing_speed': rng.gauss(profile['avg_typing_speed'], 40),
+            'device_fingerprint': f'dev-{rng.randint(0, 50)}',
+            'location': rng.choice(['US', 'IN', 'UK', 'RU', 'CN']),
+            'user_agent': rng.choice(UAS),
+            'ip_address': f'10.{rng.randint(0, 255)}.1.1',
+            'access_time': f'2025-11-28T{rng.randint(0, 23):02d}:00:00Z',
+        }))
+    return [p for p, _ in pairs], [e for _, e in pairs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--profiles', type=int, default=5000)
+    args = parser.parse_args()
+    profiles, events = make_dataset(args.events, args.profiles)
+
+    # profiles are compiled once when loaded, as the server's ProfileStore does
+    tc = time.perf_counter()
+    by_id = {id(p): compile_profile(p) for p in profiles}
+    compiled = [by_id[id(p)] for p in profiles]
+    t0 = time.perf_counter()
+    scalar = [scoring.score_event(p, e, c) for p, e, c in zip(profiles, events, compiled)]
+    t1 = time.perf_counter()
+    similarities, reasons = scoring.score_batch(profiles, events, compiled)
+    t2 = time.perf_counter()
+
+    identical = similarities.tolist() == [s for s, _ in scalar] and reasons == [r for _, r in scalar]
+    print(f'events:      {args.events}')
+    print(f'compile:     {t0 - tc:.3f}s  ({len(by_id)} profiles)')
+    print(f'scalar:      {t1 - t0:.3f}s  ({args.events / (t1 - t0):,.0f} events/s)')
+    print(f'batch:       {t2 - t1:.3f}s  ({args.events / (t2 - t1):,.0f} events/s)')
+    print(f'speedup:     {(t1 - t0) / (t2 - t1):.2f}x')
+    print(f'identical:   {identical}')
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Reporter /check latency with cold profile reads, per-user locks and a busy flusher.
+
+Seeds a profile store with ``--users`` profiles, drops them from the cache
+and (``--drop-page-cache``, the default) from the OS page cache, so most
+requests read their profile from disk. Requests arrive open-loop at
+``--rate`` per second over an in-process ASGI transport and each latency is
+measured from the request's scheduled arrival, so time spent queued behind
+a blocked event loop is counted. ``--hot`` of the requests go to ten users,
+which is where requests for the same user overlap. A small ``max_dirty``
+keeps the flusher thread writing the whole time.
+
+Three configurations run ``--repeat`` times each on a fresh store, and the
+median of each percentile is printed:
+
+* reads on loop: cold reads run on the event loop (``ProfileStore.get``),
+  as the handlers did before ``get_async``;
+* per-user locks: cold reads run in a worker thread while the user's lock
+  is held, as the handlers do now;
+* no locks: cold reads in a worker thread with the per-user locks replaced
+  by no-ops; the lost updates it reports are what the locks prevent.
+
+Usage: python -m benchmarks.bench_concurrency [--requests N] [--rate N] [--users N] [--hot F] [--repeat N]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('PROFILES_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='bench-concurrency-'), 'profiles.db'))
+
+import httpx  # noqa: E402
+
+from automated_reporter import main as reporter, storage  # noqa: E402
+
+
+def make_event(rng, username):
+    return {
+        'site': 'example.com', 'username': username, 'typing_speed': rng.uniform(80, 240),
+        'location': rng.choice(['IN', 'US', 'UK', 'DE']), 'device_fingerprint': f'dev-{rng.randint(0, 3)}',
+        'access_time': f'2025-11-28T{rng.randint(0, 23):02d}:00:00Z',
+    }
+
+
+def seed_store(path, n_users, max_dirty, drop_page_cache):
+    rng = random.Random(1)
+    store = storage.ProfileStore(path, json_path=None, flush_interval=0.05, max_dirty=max_dirty)
+    for u in range(n_users):
+        events = [make_event(rng, f'user{u}') for _ in range(5)]
+        store.put('example.com', f'user{u}', storage.make_profile_from_events(events))
+    store.flush()
+    store._cache.clear()
+    store._compiled.clear()
+    if drop_page_cache and hasattr(os, 'posix_fadvise'):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return store
+
+
+def _reads_on_loop(store):
+    # the handlers before get_async: a cold read blocks the event loop
+    async def get_async(site, username):
+        return store.get(site, username)
+    store.get_async = get_async
+
+
+async def drive(n_requests, rate, n_users, hot):
+    rng = random.Random(2)
+    bodies = [make_event(rng, f'user{rng.randrange(10) if rng.random() < hot else rng.randrange(n_users)}')
+              for _ in range(n_requests)]
+    latencies = []
+    transport = httpx.ASGITransport(app=reporter.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://reporter') as client:
+        async def send(due, body):
+            r = await client.post('/check', json=body)
+            latencies.append(time.perf_counter() - due)
+            assert r.status_code == 200, r.text
+
+        started = time.perf_counter()
+        tasks = []
+        for i, body in enumerate(bodies):
+            due = started + i / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(send(due, body)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    return sorted(latencies), elapsed, bodies
+
+
+class _NoLocks:
+    # stands in for KeyedLocks: every lock is free
+    def lock(self, key):
+        return self
+
+    def hold(self, keys):
+        return self
+
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def run_once(args, tmp, locks, on_loop=False):
+    store = seed_store(os.path.join(tmp, f'profiles-{random.random()}.db'), args.users, args.max_dirty,
+                       args.drop_page_cache)
+    if on_loop:
+        _reads_on_loop(store)
+    reporter.profiles = store
+    reporter.profile_locks = locks
+    lat, elapsed, bodies = asyncio.run(drive(args.requests, args.rate, args.users, args.hot))
+    flushes = store.flushes
+    # every profile starts with 5 samples; each /check folds in one more
+    expected = {}
+    for body in bodies:
+        expected[body['username']] = expected.get(body['username'], 5) + 1
+    lost = sum(n - store.get('example.com', u)['samples'] for u, n in expected.items())
+    store.close()
+
+    def pct(p):
+        return lat[min(len(lat) - 1, int(p * len(lat)))] * 1000.0
+
+    return {'throughput': len(lat) / elapsed, 'flushes': flushes, 'lost': lost,
+            'p50': pct(0.50), 'p99': pct(0.99), 'p99.9': pct(0.999), 'max': lat[-1] * 1000.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=500.0, help='request arrivals per second')
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--hot', type=float, default=0.2, help='fraction of requests for ten hot users')
+    parser.add_argument('--max-dirty', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep-page-cache', dest='drop_page_cache', action='store_false',
+                        help='leave the seeded database in the OS page cache')
+    args = parser.parse_args()
+
+    reporter.forward_to_ai_backend = lambda report: True
+    keyed = reporter.profile_locks
+    print(f'requests={args.requests} rate={args.rate:.0f}/s users={args.users} hot={args.hot} '
+          f'drop_page_cache={args.drop_page_cache} repeat={args.repeat}')
+    configs = (('reads on loop', keyed, True), ('per-user locks', keyed, False), ('no locks', _NoLocks(), False))
+    runs = {name: [] for name, _, _ in configs}
+    with tempfile.TemporaryDirectory() as tmp:
+        run_once(args, tmp, keyed)  # warm-up
+        # rotate the order so drift in the machine hits every configuration alike
+        for i in range(args.repeat):
+            for name, locks, on_loop in configs[i % 3:] + configs[:i % 3]:
+                runs[name].append(run_once(args, tmp, locks, on_loop))
+        for name, _, _ in configs:
+            med = {k: statistics.median(r[k] for r in runs[name]) for k in runs[name][0]}
+            print(f'{name:15s} throughput={med["throughput"]:.0f}/s flushes={med["flushes"]:.0f}  '
+                  f'p50={med["p50"]:.2f} ms  p99={med["p99"]:.2f} ms  p99.9={med["p99.9"]:.2f} ms  '
+                  f'max={med["max"]:.2f} ms  lost_updates={med["lost"]:.0f}')
+    reporter.profile_locks = keyed
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Alert volume under attack with and without incident aggregation and rate limiting.
+
+Replays a seeded ``synthetic_data.stream_events`` stream (``--attack-rate``
+of its events are attacks) plus ``--hammer`` logins from a few attacked
+accounts. The replay runs through the detector's ``process_login_events``
+twice: once with aggregation and the limiter off, once with the defaults
+(``INCIDENT_WINDOW``, ``ALERT_RATE_PER_MINUTE``, ``ALERT_BURST``). Prints
+the alerts held, state-store writes, stream frames, retained alert memory
+(tracemalloc, measured on a separate replay) and the time per event for
+each run.
+
+Usage: python -m benchmarks.bench_incidents [--events N] [--users N] [--hammer N] [--accounts N]
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+os.environ.setdefault('DETECTOR_STORE', 'memory')
+
+import incidents  # noqa: E402
+from detection import LoginEvent  # noqa: E402
+from synthetic_data import stream_events  # noqa: E402
+
+
+def _events(args):
+    rng = random.Random(3)
+    events = [LoginEvent(**data) for data in stream_events(args.events, n_users=args.users, seed=9,
+                                                            attack_rate=args.attack_rate)]
+    # a slow attack: one login a minute per account stays under the velocity limit, and an unusual country at
+    # night scores medium (re-authenticate, never lock), so every attempt alerts again
+    start = datetime.datetime(2025, 11, 28, 3, 0)
+    for i in range(args.hammer):
+        ts = start + datetime.timedelta(minutes=i // args.accounts)
+        events.insert(rng.randrange(len(events) + 1), LoginEvent(
+            event_id=f'hammer-{i}', timestamp=ts.isoformat() + 'Z', username=f'victim{i % args.accounts}',
+            device_fingerprint=f'attacker-dev-{i % args.accounts}', location='RU', typing_speed=120.0, access_time='03:00'))
+    return events
+
+
+def _run(backend, events, batch, aggregate, trace=False):
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+    backend.unpublished_incidents.clear()
+    backend.open_incidents, backend.alert_limiter = None, None
+    if aggregate:
+        backend.open_incidents = incidents.IncidentWindow(backend.INCIDENT_WINDOW,
+                                                          on_close=backend._on_incident_closed)
+        backend.alert_limiter = incidents.TokenBucket(backend.ALERT_RATE_PER_MINUTE / 60, backend.ALERT_BURST)
+    writes = [0]
+    append = backend.state_store.append_alert
+    backend.state_store.append_alert = lambda *a, **kw: (writes.__setitem__(0, writes[0] + 1), append(*a, **kw))
+    published = backend.alert_broadcaster.published
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    for i in range(0, len(events), batch):
+        asyncio.run(backend.process_login_events(events[i:i + batch]))
+    elapsed = time.perf_counter() - started
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    backend.state_store.append_alert = append
+    return {'alerts': len(backend.alerts), 'writes': writes[0],
+            'frames': backend.alert_broadcaster.published - published,
+            'memory': held, 'us_per_event': elapsed / len(events) * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--attack-rate', type=float, default=0.05)
+    parser.add_argument('--hammer', type=int, default=20000)
+    parser.add_argument('--accounts', type=int, default=5)
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    import main as backend
+    events = _events(args)
+    results = {}
+    _run(backend, events, args.batch, False)  # warm-up
+    for name, aggregate in (('one alert per event', False), ('incidents + limiter', True)):
+        # timed without tracemalloc, then replayed again for the memory figure
+        results[name] = _run(backend, events, args.batch, aggregate)
+        results[name]['memory'] = _run(backend, events, args.batch, aggregate, trace=True)['memory']
+
+    print(f'events={len(events)} (hammer={args.hammer} on {args.accounts} accounts)')
+    print(f'{"":22s} {"alerts held":>12s} {"store writes":>13s} {"stream frames":>14s} '
+          f'{"memory":>9s} {"us/event":>9s}')
+    for name, r in results.items():
+        print(f'{name:22s} {r["alerts"]:12d} {r["writes"]:13d} {r["frames"]:14d} '
+              f'{r["memory"] / 2 ** 20:8.1f}M {r["us_per_event"]:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
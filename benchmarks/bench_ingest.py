@@ -0,0 +1,80 @@
+"""Throughput of the streaming intake (``ingest``) over a Unix socket.
+
+Sends ``--events`` synthetic login events over ``--connections`` concurrent
+connections, first into a handler that only counts events (framing, parsing
+and queueing alone), then into the detector's ``ingest_events`` (validation
+and detection in-process). Both framings are measured.
+
+Usage: python -m benchmarks.bench_ingest [--events N] [--connections N] [--users N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+os.environ.setdefault('DETECTOR_STORE', 'memory')
+
+import ingest  # noqa: E402
+from synthetic_data import stream_events  # noqa: E402
+
+
+async def _run(handler, payloads, path, validate=None):
+    server = ingest.IngestServer(handler, validate=validate)
+    await server.start_unix(path)
+    total = sum(count for _, count in payloads)
+
+    async def send(data):
+        _, writer = await asyncio.open_unix_connection(path)
+        writer.write(data)
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(data) for data, _ in payloads))
+    while server.stats['connections'] or server.stats['events'] < total:
+        await asyncio.sleep(0.001)
+    await server.drain()
+    elapsed = time.perf_counter() - started
+    info = server.info()
+    await server.stop()
+    return elapsed, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--users', type=int, default=5000)
+    args = parser.parse_args()
+
+    events = list(stream_events(args.events, n_users=args.users, seed=7, attack_rate=0.02))
+    per = -(-len(events) // args.connections)
+    parts = [events[i:i + per] for i in range(0, len(events), per)]
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-ingest-'), 'ingest.sock')
+
+    seen = [0]
+
+    async def count(batch):
+        seen[0] += len(batch)
+
+    import main as backend
+    for framing, encode in (('ndjson', ingest.encode_ndjson), ('length-prefixed', ingest.encode_frames)):
+        payloads = [(encode(part), len(part)) for part in parts]
+        size = sum(len(data) for data, _ in payloads)
+        for name, handler, validate in (('no-op', count, None),
+                                        ('detector', backend.ingest_events, backend.ingest_server.validate)):
+            backend.alerts.clear()
+            backend.user_sessions.clear()
+            elapsed, info = asyncio.run(_run(handler, payloads, path, validate))
+            print(f'{framing:16s} {name:9s} {info["events"] / elapsed:>10,.0f} events/s  '
+                  f'{size / elapsed / 2 ** 20:6.1f} MiB/s  batches {info["batches"]}  '
+                  f'errors {info["parse_errors"] + info["invalid"] + info["handler_errors"]}')
+
+
+if __name__ == '__main__':
+    main()
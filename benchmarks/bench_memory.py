@@ -0,0 +1,80 @@
+"""Bytes per stored session and alert: Pydantic models vs the compact records.
+
+Replays a seeded ``synthetic_data.stream_events`` stream through the
+detector to get realistic sessions and alerts, then measures (tracemalloc)
+the cost of holding each of them both ways. Every object is rebuilt from
+its JSON form, so its strings are private copies the way they are when
+they come off the wire or out of the state store.
+
+Usage: python -m benchmarks.bench_memory [--events N] [--users N]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from detection import AccountLockedError, AnomalyAlert, LoginEvent, UserSession, advance_session  # noqa: E402
+from records import AlertRecord, SessionRecord  # noqa: E402
+from synthetic_data import stream_events  # noqa: E402
+
+
+def replay(n_events, n_users, seed=7):
+    """JSON payloads of the final sessions and of every alert raised."""
+    sessions = {}
+    alerts = []
+    for data in stream_events(n_events, n_users=n_users, seed=seed, attack_rate=0.05):
+        event = LoginEvent(**data)
+        session = sessions.get(event.username) or SessionRecord(event.username)
+        try:
+            alert = advance_session(session, event)
+        except AccountLockedError:
+            # unlock right away so the stream keeps producing alerts
+            session.locked = False
+            continue
+        sessions[event.username] = session
+        if alert:
+            alerts.append(alert.json())
+    return [json.dumps(s.dict()) for s in sessions.values()], alerts
+
+
+def bytes_per_object(payloads, build):
+    """Retained bytes per object for keeping ``build(payload)`` for every payload."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        kept = [build(p) for p in payloads]
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # the list itself is the same for both layouts
+    return (current - base - sys.getsizeof(kept)) / len(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=20000)
+    args = parser.parse_args()
+
+    sessions, alerts = replay(args.events, args.users)
+    print(f'events={args.events} sessions={len(sessions)} alerts={len(alerts)}')
+    rows = [
+        ('session', sessions,
+         lambda p: UserSession(**json.loads(p)), lambda p: SessionRecord.from_dict(json.loads(p))),
+        ('alert', alerts,
+         lambda p: AnomalyAlert(**json.loads(p)), lambda p: AlertRecord.from_dict(json.loads(p))),
+    ]
+    for name, payloads, before, after in rows:
+        b = bytes_per_object(payloads, before)
+        a = bytes_per_object(payloads, after)
+        print(f'{name:<8} pydantic={b:8.0f} B  compact={a:8.0f} B  saved={1 - a / b:6.1%}')
+
+
+if __name__ == '__main__':
+    main()
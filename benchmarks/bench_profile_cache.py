@@ -0,0 +1,87 @@
+"""Startup time and hot-tier behaviour of the tiered profile store.
+
+Fills a scratch database with ``--profiles`` baselines, then times opening
+the store (constant, nothing is read up front) and replays a skewed login
+stream through ``get`` + ``apply_event`` with a hot tier of ``--cache``
+profiles. Prints the open time, throughput, hit rate, evictions and
+write-backs, and the memory a full hot tier holds (tracemalloc).
+
+Usage: python -m benchmarks.bench_profile_cache [--profiles N] [--cache N] [--events N] [--skew S]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from automated_reporter import storage
+
+SITES = ('example.com', 'shop.example', 'bank.example')
+
+
+def _fill(path, n, seed=1):
+    rng = random.Random(seed)
+    store = storage.ProfileStore(path, json_path=None, flush_interval=3600)
+    batch = []
+    for i in range(n):
+        events = [{'typing_speed': rng.gauss(150, 20), 'device_fingerprint': f'dev-{i}-{rng.randint(0, 2)}',
+                   'location': rng.choice(['US', 'IN', 'UK']), 'user_agent': 'Mozilla/5.0 Chrome/120.0',
+                   'ip_address': f'10.{i % 250}.{rng.randint(0, 9)}.1',
+                   'access_time': f'2025-11-28T{rng.randint(7, 20):02d}:00:00Z'} for _ in range(3)]
+        batch.append((SITES[i % len(SITES)], f'user{i}', storage.make_profile_from_events(events)))
+        if len(batch) == 5000:
+            store.import_profiles(batch)
+            batch = []
+    store.import_profiles(batch)
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=200000)
+    parser.add_argument('--cache', type=int, default=20000)
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of user popularity')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-profiles-'), 'profiles.db')
+    started = time.perf_counter()
+    _fill(path, args.profiles)
+    print(f'filled {args.profiles} profiles in {time.perf_counter() - started:.1f}s '
+          f'({os.path.getsize(path) / 2 ** 20:.0f} MiB)')
+
+    started = time.perf_counter()
+    store = storage.ProfileStore(path, json_path=None, flush_interval=0.5, max_cached=args.cache)
+    print(f'open: {(time.perf_counter() - started) * 1e3:.2f} ms')
+
+    rng = random.Random(2)
+    weights = [1.0 / (rank + 1) ** args.skew for rank in range(args.profiles)]
+    users = rng.choices(range(args.profiles), weights=weights, k=args.events)
+    started = time.perf_counter()
+    for i in users:
+        site, username = SITES[i % len(SITES)], f'user{i}'
+        if store.get(site, username) is not None:
+            store.apply_event(site, username, {'typing_speed': 150.0, 'device_fingerprint': f'dev-{i}-0',
+                                               'location': 'US', 'access_time': '2025-11-29T10:00:00Z'})
+    elapsed = time.perf_counter() - started
+    stats = store.cache_stats()
+    lookups = stats['hits'] + stats['misses']
+    print(f'replay: {args.events / elapsed:,.0f} events/s  hit rate {stats["hits"] / max(1, lookups):.1%}  '
+          f'evictions {stats["evictions"]}  write-backs {stats["writebacks"]}')
+    store.close()
+
+    # memory of a full hot tier, profiles plus match indexes
+    store = storage.ProfileStore(path, json_path=None, flush_interval=3600, max_cached=args.cache)
+    tracemalloc.start()
+    for i in range(min(args.cache, args.profiles)):
+        store.compiled(SITES[i % len(SITES)], f'user{i}')
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'hot tier: {store.cache_size()} profiles, {held / 2 ** 20:.1f} MiB '
+          f'({held / max(1, store.cache_size()) / 1024:.1f} KiB each)')
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Per-event cost of the detector rules and the reporter's weighted scoring.
+
+Replays a seeded ``synthetic_data.stream_events`` stream, then times
+``detect_anomaly`` separately over the events that alert and those that do
+not (only alerting events pay for reason text), and ``score_event``
+against baselines built from the same stream. With ``--rules``, every
+event is evaluated with its site's rules from that file.
+
+Usage: python -m benchmarks.bench_rules [--events N] [--users N] [--repeat N] [--rules PATH]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from detection import LoginEvent, detect_anomaly  # noqa: E402
+from records import SessionRecord  # noqa: E402
+from synthetic_data import stream_events  # noqa: E402
+from automated_reporter import scoring, storage  # noqa: E402
+from automated_reporter.match_index import compile_profile  # noqa: E402
+
+
+def _best(fn, items, repeat):
+    # best of ``repeat`` passes, in ns per item
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for item in items:
+            fn(*item)
+        best = min(best, time.perf_counter_ns() - started)
+    return best / max(1, len(items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rules', help='rules file to evaluate with (default: the built-in rules)')
+    args = parser.parse_args()
+
+    ruleset = None
+    if args.rules:
+        import rules
+        ruleset = rules.load_rules(args.rules)
+
+    events = list(stream_events(args.events, n_users=args.users, seed=5, attack_rate=0.05))
+    last = {}
+    quiet, alerting = [], []
+    for data in events:
+        event = LoginEvent(**data)
+        session = last.get(event.username) or SessionRecord(event.username)
+        item = (event, session) if ruleset is None else (event, session, None, None, ruleset.detector(event.site))
+        (alerting if detect_anomaly(*item) else quiet).append(item)
+        last[event.username] = SessionRecord(event.username, last_location=event.location,
+                                             last_device_fingerprint=event.device_fingerprint,
+                                             last_access_time=event.access_time)
+
+    half = len(events) // 2
+    by_user = {}
+    for data in events[:half]:
+        by_user.setdefault(data['username'], []).append({**data, 'access_time': data['timestamp']})
+    profiles = {u: storage.make_profile_from_events(evts) for u, evts in by_user.items()}
+    compiled = {u: compile_profile(p) for u, p in profiles.items()}
+    scored = []
+    for data in events[half:]:
+        u = data['username']
+        if u in profiles:
+            item = (profiles[u], {**data, 'access_time': data['timestamp']}, compiled[u])
+            scored.append(item if ruleset is None else item + (ruleset.reporter(data.get('site')),))
+
+    print(f'events={len(events)} quiet={len(quiet)} alerting={len(alerting)} scored={len(scored)}')
+    print(f'detect_anomaly quiet     {_best(detect_anomaly, quiet, args.repeat):8.0f} ns/event')
+    print(f'detect_anomaly alerting  {_best(detect_anomaly, alerting, args.repeat):8.0f} ns/event')
+    print(f'score_event              {_best(scoring.score_event, scored, args.repeat):8.0f} ns/event')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Load test for the sharded detector: events/s with 1, 2, 4, ... shard workers.
+
+Drives ``sharding.ShardRouter`` directly (no HTTP) with batches spread over
+many usernames, the way ``/api/login_events/batch`` calls it. Throughput
+only scales while there are free cores, so compare against ``os.cpu_count()``.
+
+Usage: python -m benchmarks.bench_sharding [--events N] [--users N] [--batch N] [--workers 1,2,4]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from detection import LoginEvent  # noqa: E402
+from sharding import ShardRouter  # noqa: E402
+
+
+def make_events(n_events, n_users, seed=1):
+    rng = random.Random(seed)
+    events = []
+    for i in range(n_events):
+        events.append(LoginEvent(
+            event_id=f'evt-{i}',
+            timestamp='2025-11-28T10:00:00Z',
+            username=f'user{rng.randrange(n_users)}',
+            device_fingerprint=f'dev-{rng.randint(0, 3)}',
+            location=rng.choice(['IN', 'US', 'UK', 'IN', 'US', 'RU']),
+            typing_speed=rng.uniform(80, 240),
+            access_time=f'{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}',
+        ))
+    return events
+
+
+async def _drive(router, events, batch, in_flight):
+    # several batches in flight, like concurrent batch requests
+    sem = asyncio.Semaphore(in_flight)
+
+    async def one(chunk):
+        async with sem:
+            await router.process(chunk)
+
+    await asyncio.gather(*(one(events[i:i + batch]) for i in range(0, len(events), batch)))
+
+
+def run(workers, events, batch, in_flight):
+    router = ShardRouter(workers)
+    try:
+        # warm-up spawns the workers outside the timed region
+        asyncio.run(router.sessions())
+        started = time.perf_counter()
+        asyncio.run(_drive(router, events, batch, in_flight))
+        return len(events) / (time.perf_counter() - started)
+    finally:
+        router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--batch', type=int, default=2000)
+    parser.add_argument('--in-flight', type=int, default=8)
+    parser.add_argument('--workers', default='1,2,4')
+    args = parser.parse_args()
+
+    events = make_events(args.events, args.users)
+    print(f'cpu_count={os.cpu_count()} events={args.events} users={args.users} batch={args.batch}')
+    base = None
+    for workers in (int(w) for w in args.workers.split(',')):
+        rate = run(workers, events, args.batch, args.in_flight)
+        base = base or rate
+        print(f'workers={workers:<3d} {rate:12.0f} events/s  speedup x{rate / base:.2f}')
+
+
+if __name__ == '__main__':
+    main()
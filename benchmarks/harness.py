@@ -0,0 +1,138 @@
+"""Tiny benchmark harness: timed runs, tracemalloc pass, JSON results, baseline comparison."""
+import asyncio
+import gc
+import inspect
+import json
+import platform
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# A case's setup returns (op, n_ops); op(i) performs operation i of a fixed dataset
+Setup = Callable[[], Any]
+
+
+class Case:
+    __slots__ = ('name', 'setup', 'warmup')
+
+    def __init__(self, name: str, setup: Setup, warmup: int = 50):
+        self.name = name
+        self.setup = setup
+        self.warmup = warmup
+
+
+def _run_sync(op, indices: List[int]) -> np.ndarray:
+    samples = np.empty(len(indices), dtype=np.int64)
+    clock = time.perf_counter_ns
+    for k, i in enumerate(indices):
+        t = clock()
+        op(i)
+        samples[k] = clock() - t
+    return samples
+
+
+async def _run_async(op, indices: List[int]) -> np.ndarray:
+    samples = np.empty(len(indices), dtype=np.int64)
+    clock = time.perf_counter_ns
+    for k, i in enumerate(indices):
+        t = clock()
+        await op(i)
+        samples[k] = clock() - t
+    return samples
+
+
+def _run(op, indices: List[int]) -> np.ndarray:
+    if inspect.iscoroutinefunction(op):
+        return asyncio.run(_run_async(op, indices))
+    return _run_sync(op, indices)
+
+
+def run_case(case: Case, alloc_ops: int = 200) -> Dict[str, Any]:
+    """Time every op of a fresh setup, then re-run a slice under tracemalloc.
+
+    Timing and allocation tracking are separate passes because tracemalloc
+    slows allocation-heavy code several times over.
+    """
+    op, n = case.setup()
+    # always leave at least one measured op
+    warm = min(case.warmup, n - 1)
+    _run(op, list(range(warm)))
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        samples = _run(op, list(range(warm, n)))
+        elapsed = time.perf_counter() - started
+    finally:
+        gc.enable()
+
+    op, n = case.setup()
+    _run(op, list(range(warm)))
+    indices = list(range(warm, min(warm + alloc_ops, n)))
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        _run(op, indices)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    us = samples / 1000.0
+    p50, p95, p99 = np.percentile(us, [50, 95, 99]).tolist()
+    return {
+        'ops': int(len(samples)),
+        'ops_per_sec': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'latency_us': {'mean': float(us.mean()), 'p50': p50, 'p95': p95, 'p99': p99, 'max': float(us.max())},
+        'alloc': {
+            'peak_bytes': peak - base,
+            'retained_bytes_per_op': (current - base) / max(1, len(indices)),
+        },
+    }
+
+
+def run_suite(cases: List[Case], only: Optional[str] = None, log=print) -> Dict[str, Any]:
+    results = {}
+    for case in cases:
+        if only and only not in case.name:
+            continue
+        results[case.name] = r = run_case(case)
+        lat = r['latency_us']
+        log(f"{case.name:<32} {r['ops_per_sec']:>12,.0f} ops/s  p50={lat['p50']:>9.1f}us  "
+            f"p99={lat['p99']:>9.1f}us  peak={r['alloc']['peak_bytes'] / 1024:>8.1f}KiB")
+    return {
+        'meta': {'python': platform.python_version(), 'machine': platform.machine(),
+                 'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())},
+        'results': results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.15) -> List[str]:
+    """Return one message per regression beyond ``threshold`` (relative)."""
+    regressions = []
+    for name, base in baseline['results'].items():
+        cur = current['results'].get(name)
+        if cur is None:
+            continue
+        if cur['ops_per_sec'] < base['ops_per_sec'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['ops_per_sec']:,.0f} -> {cur['ops_per_sec']:,.0f} ops/s")
+        if cur['latency_us']['p99'] > base['latency_us']['p99'] * (1 + threshold):
+            regressions.append(f"{name}: p99 {base['latency_us']['p99']:.1f} -> {cur['latency_us']['p99']:.1f} us")
+        # small absolute growth (< 4 KiB) is noise from interning and caches
+        if cur['alloc']['peak_bytes'] > base['alloc']['peak_bytes'] * (1 + threshold) + 4096:
+            regressions.append(f"{name}: peak alloc {base['alloc']['peak_bytes']} -> {cur['alloc']['peak_bytes']} bytes")
+    return regressions
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def dump(results: Dict[str, Any], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
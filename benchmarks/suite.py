@@ -0,0 +1,222 @@
+"""In-process benchmarks for the detector and reporter hot paths.
+
+Every case runs against a fixed, seeded dataset (``synthetic_data.stream_events``)
+and records ops/s, latency percentiles and tracemalloc allocation figures.
+
+Usage:
+  python -m benchmarks.suite run [--out results.json] [--only NAME] [--quick] [--update-baseline]
+  python -m benchmarks.suite compare [results.json] [--baseline benchmarks/baseline.json] [--threshold 0.15]
+"""
+import argparse
+import copy
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+
+for path in (ROOT, os.path.join(ROOT, 'backend')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# both apps open their stores on import; keep everything in a scratch dir
+_scratch = tempfile.mkdtemp(prefix='bench-')
+os.environ.setdefault('DETECTOR_STORE', 'memory')
+os.environ.setdefault('DETECTOR_MODEL_PATH', os.path.join(_scratch, 'behavior.npz'))
+os.environ.setdefault('PROFILES_DB_PATH', os.path.join(_scratch, 'profiles.db'))
+os.environ.setdefault('FORWARD_SPILL_PATH', os.path.join(_scratch, 'forward_spill.ndjson'))
+
+import httpx  # noqa: E402
+
+import main as detector  # noqa: E402
+from detection import LoginEvent, detect_anomaly  # noqa: E402
+from records import SessionRecord  # noqa: E402
+from synthetic_data import stream_events  # noqa: E402
+from automated_reporter import main as reporter, scoring, storage  # noqa: E402
+from automated_reporter.match_index import compile_profile  # noqa: E402
+from automated_reporter.models import LoginEvent as ReporterEvent  # noqa: E402
+from ml_models import UserBehaviorModel  # noqa: E402
+
+from .harness import Case, compare, dump, load, run_suite  # noqa: E402
+
+SEED = 13
+USERS = 200
+HISTORY = 4000
+OPS = {'full': 3000, 'quick': 400}
+BATCH = 500
+
+
+def _dataset(ops):
+    """(history, measured) event lists; history builds baselines, measured is timed."""
+    events = list(stream_events(HISTORY + ops, n_users=USERS, seed=SEED, attack_rate=0.02))
+    return events[:HISTORY], events[HISTORY:]
+
+
+def _reporter_event(event):
+    return {**event, 'access_time': event['timestamp']}
+
+
+def build_cases(ops):
+    history, measured = _dataset(ops)
+    n = len(measured)
+
+    # --- detector ---
+    def detect_setup():
+        last = {}
+        pairs = []
+        for e in history + measured:
+            event = LoginEvent(**e)
+            session = last.get(event.username) or SessionRecord(event.username)
+            pairs.append((event, session))
+            last[event.username] = SessionRecord(event.username, last_location=event.location,
+                                                 last_device_fingerprint=event.device_fingerprint,
+                                                 last_access_time=event.access_time)
+        pairs = pairs[HISTORY:]
+        return (lambda i: detect_anomaly(*pairs[i])), n
+
+    def process_setup():
+        detector.alerts.clear()
+        detector.user_sessions.clear()
+        events = [LoginEvent(**e) for e in measured]
+
+        def op(i):
+            try:
+                detector.process_login_event(events[i])
+            except detector.AccountLockedError:
+                pass
+        return op, n
+
+    def detector_asgi_setup():
+        detector.alerts.clear()
+        detector.user_sessions.clear()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=detector.app), base_url='http://detector')
+
+        async def op(i):
+            await client.post('/api/login_event', json=measured[i])
+        return op, n
+
+    # --- behaviour model ---
+    model = UserBehaviorModel.fit(history)
+
+    def verdict_setup():
+        return (lambda i: model.verdict(measured[i])), n
+
+    def verdicts_batch_setup():
+        batches = [measured[i:i + BATCH] for i in range(0, n, BATCH)]
+        return (lambda i: model.verdicts(batches[i % len(batches)])), max(len(batches), 20)
+
+    # --- reporter ---
+    by_user = {}
+    for e in history:
+        if not e['is_attack']:
+            by_user.setdefault(e['username'], []).append(_reporter_event(e))
+    base_profiles = {u: storage.make_profile_from_events(evts) for u, evts in by_user.items()}
+    r_events = [_reporter_event(e) for e in measured if e['username'] in base_profiles]
+    rn = len(r_events)
+
+    def score_setup():
+        compiled = {u: compile_profile(p) for u, p in base_profiles.items()}
+        return (lambda i: scoring.score_event(base_profiles[r_events[i]['username']], r_events[i],
+                                              compiled[r_events[i]['username']])), rn
+
+    def score_batch_setup():
+        # /check/batch scores against the store's precompiled indexes
+        compiled = {u: compile_profile(p) for u, p in base_profiles.items()}
+        batches = [r_events[i:i + BATCH] for i in range(0, rn, BATCH)]
+        args = [([base_profiles[e['username']] for e in b], b, [compiled[e['username']] for e in b]) for b in batches]
+        return (lambda i: scoring.score_batch(*args[i % len(args)])), max(len(args), 20)
+
+    def _seed_reporter_store():
+        for u, p in base_profiles.items():
+            reporter.profiles.put('example.com', u, copy.deepcopy(p))
+
+    def check_setup():
+        _seed_reporter_store()
+        models = [ReporterEvent(**e) for e in r_events]
+
+        async def op(i):
+            await reporter.check_event(models[i])
+        return op, rn
+
+    def reporter_asgi_setup():
+        _seed_reporter_store()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=reporter.app), base_url='http://reporter')
+
+        async def op(i):
+            await client.post('/check', json=r_events[i])
+        return op, rn
+
+    # --- storage ---
+    def incremental_setup():
+        profiles = {u: copy.deepcopy(p) for u, p in base_profiles.items()}
+        return (lambda i: storage.update_profile_incremental(profiles[r_events[i]['username']], r_events[i])), rn
+
+    def make_profile_setup():
+        groups = list(by_user.values())
+        return (lambda i: storage.make_profile_from_events(groups[i % len(groups)])), min(rn, 500)
+
+    def flush_setup():
+        store = storage.ProfileStore(os.path.join(tempfile.mkdtemp(dir=_scratch), 'p.db'), json_path=None,
+                                     flush_interval=3600, max_dirty=10 ** 9)
+        for u, p in base_profiles.items():
+            store.put('example.com', u, copy.deepcopy(p))
+        store.flush()
+
+        def op(i):
+            # one flush of every profile touched by the last 50 events
+            for e in r_events[i * 50 % rn:(i * 50 % rn) + 50]:
+                store.apply_event('example.com', e['username'], e)
+            store.flush()
+        return op, max(1, min(200, rn // 50))
+
+    return [
+        Case('detector.detect_anomaly', detect_setup),
+        Case('detector.process_login_event', process_setup),
+        Case('detector.asgi.login_event', detector_asgi_setup, warmup=20),
+        Case('model.verdict', verdict_setup),
+        Case(f'model.verdicts.batch{BATCH}', verdicts_batch_setup, warmup=1),
+        Case('reporter.score_event', score_setup),
+        Case(f'reporter.score_batch.batch{BATCH}', score_batch_setup, warmup=1),
+        Case('reporter.check_event', check_setup, warmup=20),
+        Case('reporter.asgi.check', reporter_asgi_setup, warmup=20),
+        Case('storage.update_profile_incremental', incremental_setup),
+        Case('storage.make_profile_from_events', make_profile_setup, warmup=10),
+        Case('storage.apply_event_flush50', flush_setup, warmup=5),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='run the suite and write a results file')
+    run.add_argument('--out', default='benchmark-results.json')
+    run.add_argument('--only', help='run cases whose name contains this')
+    run.add_argument('--quick', action='store_true', help='smaller datasets for a fast smoke run')
+    run.add_argument('--update-baseline', action='store_true', help=f'also write {BASELINE_PATH}')
+    cmp = sub.add_parser('compare', help='flag regressions of a results file against the baseline')
+    cmp.add_argument('results', nargs='?', default='benchmark-results.json')
+    cmp.add_argument('--baseline', default=BASELINE_PATH)
+    cmp.add_argument('--threshold', type=float, default=0.15, help='allowed relative slowdown (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_suite(build_cases(OPS['quick' if args.quick else 'full']), only=args.only)
+        dump(results, args.out)
+        print(f'wrote {args.out}')
+        if args.update_baseline:
+            dump(results, BASELINE_PATH)
+            print(f'wrote {BASELINE_PATH}')
+        return
+
+    regressions = compare(load(args.baseline), load(args.results), args.threshold)
+    for line in regressions:
+        print('REGRESSION', line)
+    if regressions:
+        raise SystemExit(1)
+    print(f'no regressions beyond {args.threshold:.0%}')
+
+
+if __name__ == '__main__':
+    main()
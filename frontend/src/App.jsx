@@ -14,20 +14,56 @@ function App() {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetchAlerts();
-    const interval = setInterval(fetchAlerts, 5000);
-    return () => clearInterval(interval);
+    // Load history once, then let the backend push new alerts over the websocket
+    let socket = null;
+    let retry = null;
+    // stream_seq of the last frame seen; incident updates reuse alert_ids, so this is the resume cursor
+    let lastSeq = null;
+    let stopped = false;
+
+    const connect = () => {
+      const proto = window.location.protocol === 'https:' ? 'wss' : 'ws';
+      const cursor = lastSeq !== null ? `?after_seq=${lastSeq}` : '';
+      socket = new WebSocket(`${proto}://${window.location.host}/ws/alerts${cursor}`);
+      socket.onmessage = (msg) => {
+        const alert = JSON.parse(msg.data);
+        lastSeq = alert.stream_seq;
+        setAlerts(prev => {
+          // incident updates (repeat count, last seen) reuse the alert_id; replace the old copy
+          const next = [alert, ...prev.filter(a => a.alert_id !== alert.alert_id)];
+          calculateStats(next);
+          return next;
+        });
+      };
+      socket.onclose = () => {
+        if (!stopped) retry = setTimeout(connect, 2000);
+      };
+    };
+
+    fetchAlerts().then(seq => {
+      // resume the stream right after the snapshot /api/alerts returned
+      if (seq !== null) lastSeq = seq;
+      if (!stopped) connect();
+    });
+    return () => {
+      stopped = true;
+      clearTimeout(retry);
+      if (socket) socket.close();
+    };
   }, []);
 
   const fetchAlerts = async () => {
     try {
-      const res = await fetch('/api/alerts');
+      const res = await fetch('/api/alerts?limit=500');
+      const seq = res.headers.get('X-Stream-Seq');
       const data = await res.json();
       setAlerts(data || []);
       calculateStats(data || []);
       setLoading(false);
+      return seq !== null ? Number(seq) : null;
     } catch (err) {
       console.error('Error fetching alerts:', err);
+      return null;
     }
   };
 
@@ -163,6 +199,7 @@ function App() {
 
                   <div className="alert-summary">
                     <div className="summary-item"><span className="label">User:</span><span className="value">{alert.username}</span></div>
+                    {alert.count > 1 && (<div className="summary-item"><span className="label">Seen:</span><span className="value">{alert.count}×</span></div>)}
                     <div className="summary-item"><span className="label">Score:</span><span className="value" style={{ color: getSeverityColor(alert.severity) }}>{alert.score.toFixed(2)}</span></div>
                     <div className="summary-item"><span className="label">Action:</span><span className="value action-badge" style={{ background: getSeverityColor(alert.severity) + '30' }}>{alert.action || 'monitor'}</span></div>
                   </div>
@@ -170,7 +207,7 @@ function App() {
                   {expandedAlert === alert.alert_id && (
                     <div className="alert-details">
                       <div className="details-section"><h4>Risk Factors:</h4><ul>{alert.reasons.map((reason, i) => (<li key={i}><span className="factor-icon">🔹</span> {reason}</li>))}</ul></div>
-                      <div className="details-section"><h4>Detection Details:</h4><div className="details-grid"><div><strong>Created:</strong> {new Date(alert.created_at).toLocaleString()}</div><div><strong>Risk Factors:</strong> {alert.risk_factors.join(', ')}</div></div></div>
+                      <div className="details-section"><h4>Detection Details:</h4><div className="details-grid"><div><strong>Created:</strong> {new Date(alert.created_at).toLocaleString()}</div>{alert.count > 1 && (<div><strong>Last seen:</strong> {new Date(alert.last_seen).toLocaleString()}</div>)}<div><strong>Risk Factors:</strong> {alert.risk_factors.join(', ')}</div></div></div>
                       <div className="action-buttons">
                         {alert.status !== 'resolved' && (<button className="btn btn-resolve" onClick={() => markResolved(alert.alert_id)}>✓ Mark as Resolved</button>)}
                         <button className="btn btn-investigate" onClick={() => openInvestigate(alert)}>🔍 Investigate</button>
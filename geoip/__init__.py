@@ -0,0 +1,4 @@
+"""Local geo-IP lookups (IP range -> country/region) shared by the detector and the reporter."""
+from .database import DEFAULT_PATH, FORMAT_VERSION, GeoIPDatabase, Location, ip_key, open_database, write_database
+
+__all__ = ['DEFAULT_PATH', 'FORMAT_VERSION', 'GeoIPDatabase', 'Location', 'ip_key', 'open_database', 'write_database']
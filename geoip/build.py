@@ -0,0 +1,63 @@
+"""Build the memory-mapped geo-IP database from a CSV of IP ranges.
+
+Each row is either ``first_ip,last_ip,country[,region]`` or
+``network/prefix,country[,region]``, for IPv4 or IPv6. Addresses may be
+dotted or decimal integers (IPv4), as exported by the common free
+databases. A header row and extra trailing columns are ignored; ``.gz``
+input is read directly.
+
+Usage: python -m geoip.build ranges.csv [more.csv ...] [--out PATH]
+"""
+import argparse
+import csv
+import gzip
+import ipaddress
+from typing import Iterator, List, Optional, Tuple, Union
+
+from .database import DEFAULT_PATH, write_database
+
+
+def _address(cell: str) -> Union[int, str]:
+    cell = cell.strip()
+    return int(cell) if cell.isdigit() else cell
+
+
+def read_ranges(path: str) -> Iterator[Tuple[Union[int, str], Union[int, str], str, Optional[str]]]:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        for lineno, row in enumerate(csv.reader(f), 1):
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            try:
+                if '/' in row[0]:
+                    network = ipaddress.ip_network(row[0].strip(), strict=False)
+                    first, last, rest = str(network[0]), str(network[-1]), row[1:]
+                else:
+                    first, last, rest = _address(row[0]), _address(row[1]), row[2:]
+                    ipaddress.ip_address(first)
+                    ipaddress.ip_address(last)
+                country = rest[0].strip()
+            except (ValueError, IndexError):
+                if lineno == 1:
+                    continue  # header
+                raise ValueError(f'{path}:{lineno}: not an IP range row: {row!r}')
+            region = rest[1].strip() if len(rest) > 1 and rest[1].strip() else None
+            if country and country != '-':
+                yield first, last, country, region
+
+
+def build(paths: List[str], out: str = DEFAULT_PATH) -> dict:
+    return write_database((r for path in paths for r in read_ranges(path)), out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='CSV files of IP ranges')
+    parser.add_argument('--out', default=DEFAULT_PATH)
+    args = parser.parse_args()
+    stats = build(args.inputs, args.out)
+    print(f'wrote {args.out}: ranges={stats["ranges"]} locations={stats["names"]} dropped={stats["dropped"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import ipaddress
+import mmap
+import os
+import socket
+import struct
+import tempfile
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Union
+
+# Bump when the on-disk layout changes; older readers refuse newer files
+FORMAT_VERSION = 1
+MAGIC = b'GEOIP\x00'
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'geoip.bin')
+
+# header: magic, format version, range count, name count
+_HEADER = struct.Struct('<6sHII')
+# one range: first and last address as 16-byte big-endian keys, name index
+_RANGE = struct.Struct('<16s16sI')
+# one name: offset and length in the UTF-8 blob after the name table
+_NAME = struct.Struct('<II')
+_V4_PREFIX = b'\x00' * 10 + b'\xff\xff'
+
+Location = Tuple[str, Optional[str]]
+Address = Union[str, int, ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+def ip_key(address: Address) -> bytes:
+    """16-byte big-endian key; IPv4 maps into ``::ffff:0:0/96`` so both families share one table.
+
+    A bare int is taken as an IPv4 address when it fits in 32 bits (the
+    decimal form several range CSVs use).
+    """
+    if isinstance(address, int):
+        return _V4_PREFIX + address.to_bytes(4, 'big') if address < 1 << 32 else address.to_bytes(16, 'big')
+    if isinstance(address, str):
+        address = address.strip()
+        try:
+            return _V4_PREFIX + socket.inet_pton(socket.AF_INET, address)
+        except OSError:
+            pass
+        try:
+            return socket.inet_pton(socket.AF_INET6, address)
+        except OSError:
+            raise ValueError(f'{address!r} is not an IP address') from None
+    packed = address.packed
+    return _V4_PREFIX + packed if len(packed) == 4 else packed
+
+
+def write_database(ranges: Iterable[Tuple[Address, Address, str, Optional[str]]], path: str) -> dict:
+    """Write ``(first, last, country, region)`` ranges as a database file, atomically.
+
+    Ranges are sorted by address (duplicates keep their input order); a range
+    overlapping an earlier one is dropped, and touching ranges with the same
+    location are merged. Returns counts.
+    """
+    rows = sorted(((ip_key(first), ip_key(last), country, region or None)
+                   for first, last, country, region in ranges), key=lambda r: (r[0], r[1]))
+    names: dict = {}
+    kept: List[list] = []
+    dropped = 0
+    for first, last, country, region in rows:
+        if first > last or (kept and first <= kept[-1][1]):
+            dropped += 1
+            continue
+        name = names.setdefault((country, region), len(names))
+        prev = kept[-1] if kept else None
+        if prev is not None and prev[2] == name and int.from_bytes(prev[1], 'big') + 1 == int.from_bytes(first, 'big'):
+            prev[1] = last
+        else:
+            kept.append([first, last, name])
+
+    encoded = [(country + ('\t' + region if region else '')).encode('utf-8') for country, region in names]
+    blob_offset = 0
+    table = []
+    for data in encoded:
+        table.append(_NAME.pack(blob_offset, len(data)))
+        blob_offset += len(data)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.geoip.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(kept), len(encoded)))
+            f.write(b''.join(_RANGE.pack(first, last, name) for first, last, name in kept))
+            f.write(b''.join(table))
+            f.write(b''.join(encoded))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return {'ranges': len(kept), 'names': len(encoded), 'dropped': dropped}
+
+
+class GeoIPDatabase:
+    """Read-only IP range -> (country, region) table, memory-mapped.
+
+    The file is a sorted array of fixed-size ranges; ``lookup`` binary
+    searches it in place, so opening costs nothing however large the table
+    is and the pages are shared by every process that maps it. Only the
+    location names (a few thousand at most) are decoded up front. A bounded
+    LRU in front of the search makes repeat lookups a dict hit.
+    """
+
+    def __init__(self, path: str, cache_size: int = 65536):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f'{path}: not a geo-IP database')
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f'{path}: not a geo-IP database')
+        magic, version, self.count, n_names = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path}: not a geo-IP database')
+        if version > FORMAT_VERSION:
+            self.close()
+            raise ValueError(f'{path}: database format {version} is newer than {FORMAT_VERSION}')
+        table = _HEADER.size + self.count * _RANGE.size
+        blob = table + n_names * _NAME.size
+        self.names: List[Location] = []
+        for i in range(n_names):
+            offset, length = _NAME.unpack_from(self._map, table + i * _NAME.size)
+            country, _, region = self._map[blob + offset:blob + offset + length].decode('utf-8').partition('\t')
+            self.names.append((country, region or None))
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def __len__(self):
+        return self.count
+
+    def _lookup(self, address: str) -> Optional[Location]:
+        """``(country, region)`` for an address, None if unknown or not an IP."""
+        try:
+            key = ip_key(address)
+        except ValueError:
+            return None
+        m = self._map
+        base = _HEADER.size
+        size = _RANGE.size
+        # last range whose first address is <= key
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            at = base + mid * size
+            if m[at:at + 16] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+        at = base + (lo - 1) * size
+        _, last, name = _RANGE.unpack_from(m, at)
+        return self.names[name] if key <= last else None
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def open_database(path: Optional[str], cache_size: int = 65536) -> Optional[GeoIPDatabase]:
+    """The database at ``path``, or None when there is no file there."""
+    if not path or not os.path.exists(path):
+        return None
+    return GeoIPDatabase(path, cache_size)
@@ -0,0 +1,4 @@
+"""Values loaded from a file and swapped in when the file changes, shared by the model and rules handles."""
+from .handle import FileHandle
+
+__all__ = ['FileHandle']
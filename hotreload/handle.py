@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from typing import Any, Optional, Tuple, Type
+
+
+class FileHandle:
+    """The value loaded from one file, hot-swappable.
+
+    ``get`` is called on the request path; at most every ``check_interval``
+    seconds it stats the file and, if its mtime or size changed, calls
+    ``load`` and swaps the result in with a single assignment, so a caller
+    holding what ``get`` returned keeps a consistent value for as long as it
+    uses it. A file that fails to load (``load_errors``) is reported in
+    ``last_error`` and the previous value keeps serving. A missing file (or
+    no path) means ``empty``.
+
+    Subclasses set ``empty`` and ``load_errors`` and implement ``load``.
+    """
+
+    empty: Any = None
+    load_errors: Tuple[Type[BaseException], ...] = (Exception,)
+
+    def __init__(self, path: Optional[str], check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.value = self.empty
+        self.loaded_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.swaps = 0
+        self._stamp = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def load(self, path: str) -> Any:
+        raise NotImplementedError
+
+    def get(self) -> Any:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.reload()
+        return self.value
+
+    def reload(self, force: bool = False) -> bool:
+        """Load the file if it changed (or always with ``force``); True if the value was swapped."""
+        with self._lock:
+            try:
+                st = os.stat(self.path) if self.path else None
+            except OSError:
+                st = None
+            stamp = (st.st_mtime_ns, st.st_size) if st else None
+            if stamp == self._stamp and not force:
+                return False
+            if stamp is None:
+                swapped = self.value is not self.empty
+                self.value, self._stamp = self.empty, None
+                return swapped
+            try:
+                value = self.load(self.path)
+            except self.load_errors as e:
+                self.last_error = f'{type(e).__name__}: {e}'
+                self._stamp = stamp
+                return False
+            self.value, self._stamp = value, stamp
+            self.loaded_at = time.time()
+            self.last_error = None
+            self.swaps += 1
+            return True
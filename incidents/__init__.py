@@ -0,0 +1,5 @@
+"""Incident aggregation and per-user rate limiting for alerts (detector) and forwarded reports (reporter)."""
+from .aggregator import IncidentWindow
+from .ratelimit import TokenBucket
+
+__all__ = ['IncidentWindow', 'TokenBucket']
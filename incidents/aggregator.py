@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, List, Optional, Tuple
+
+
+class IncidentWindow:
+    """Open incidents by signature, each absorbing repeats seen within ``window`` seconds of its last one.
+
+    The caller picks the signature (e.g. username plus risk factors) and the
+    incident object; this only tracks which incidents are still open. Entries
+    are kept in last-seen order, so closing the ones that went quiet pops
+    from the front and costs nothing while none have. ``on_close`` is called
+    with each incident as it closes.
+    """
+
+    def __init__(self, window: float, on_close: Optional[Callable[[Any], None]] = None):
+        self.window = window
+        self.on_close = on_close
+        # signature -> [incident, last seen]
+        self._open: OrderedDict[Hashable, List[Any]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._open)
+
+    def __iter__(self) -> Iterator[Tuple[Hashable, Any]]:
+        return iter([(key, entry[0]) for key, entry in self._open.items()])
+
+    def get(self, key: Hashable, now: float) -> Optional[Any]:
+        """The open incident for ``key``, marked as seen at ``now``; None if there is none."""
+        self.expire(now)
+        entry = self._open.get(key)
+        if entry is None:
+            return None
+        if now > entry[1]:
+            entry[1] = now
+        self._open.move_to_end(key)
+        return entry[0]
+
+    def open(self, key: Hashable, incident: Any, now: float):
+        """Start a new incident for ``key``, replacing any open one."""
+        old = self._open.pop(key, None)
+        if old is not None and self.on_close is not None:
+            self.on_close(old[0])
+        self._open[key] = [incident, now]
+
+    def discard(self, key: Hashable):
+        self._open.pop(key, None)
+
+    def expire(self, now: float):
+        cutoff = now - self.window
+        open_ = self._open
+        while open_:
+            key, entry = next(iter(open_.items()))
+            if entry[1] >= cutoff:
+                break
+            del open_[key]
+            if self.on_close is not None:
+                self.on_close(entry[0])
+
+    def close_all(self):
+        open_, self._open = self._open, OrderedDict()
+        if self.on_close is not None:
+            for incident, _ in open_.values():
+                self.on_close(incident)
@@ -0,0 +1,55 @@
+import time
+from typing import Dict, Hashable, List, Optional
+
+
+class TokenBucket:
+    """Per-key token buckets: ``rate`` tokens a second, holding at most ``burst``.
+
+    A bucket is only touched when its key is seen, so the refill is computed
+    from the time since then. A bucket that has refilled completely behaves
+    exactly like a missing one, so once more than ``max_keys`` are held those
+    are swept away. Memory therefore tracks the keys that were limited
+    recently, not every key ever seen.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, last update]
+        self._buckets: Dict[Hashable, List[float]] = {}
+        self._sweep_at = max_keys
+        self.allowed = 0
+        self.limited = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Take one token from ``key``'s bucket; False (and nothing taken) when it is empty."""
+        if now is None:
+            now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._sweep_at:
+                self._sweep(now)
+            self._buckets[key] = [self.burst - 1.0, now]
+            self.allowed += 1
+            return True
+        tokens, last = bucket
+        if now > last:
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            self.allowed += 1
+            return True
+        bucket[0] = tokens
+        self.limited += 1
+        return False
+
+    def _sweep(self, now: float):
+        rate, burst = self.rate, self.burst
+        self._buckets = {key: b for key, b in self._buckets.items() if b[0] + (now - b[1]) * rate < burst}
+        # sweep again once the table has grown by another max_keys
+        self._sweep_at = len(self._buckets) + self.max_keys
@@ -0,0 +1,7 @@
+"""Streaming login-event intake (TCP/Unix sockets, tailed log files) shared by the detector and the reporter."""
+from .framing import (MAX_FRAME, FramingError, LengthPrefixedDecoder, NDJSONDecoder, decoder_for, encode_frames,
+                      encode_ndjson)
+from .server import IngestServer
+
+__all__ = ['MAX_FRAME', 'FramingError', 'IngestServer', 'LengthPrefixedDecoder', 'NDJSONDecoder', 'decoder_for',
+           'encode_frames', 'encode_ndjson']
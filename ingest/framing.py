@@ -0,0 +1,102 @@
+import struct
+from typing import Any, Iterable, List
+
+from serialization import dumps, loads
+
+# length prefix: 4-byte big-endian payload size
+_LENGTH = struct.Struct('>I')
+MAX_FRAME = 1 << 20
+
+
+class FramingError(ValueError):
+    """The stream cannot be split into events any more (the connection is dropped)."""
+
+
+class NDJSONDecoder:
+    """Newline-delimited JSON events, fed in arbitrary chunks.
+
+    Every complete line in a chunk is parsed with one ``loads`` call on a
+    JSON array built from the lines; if that fails, the lines are parsed one
+    by one and the bad ones are counted in ``errors`` and skipped.
+    """
+
+    def __init__(self, max_line: int = MAX_FRAME):
+        self.max_line = max_line
+        self.errors = 0
+        self._tail = b''
+
+    def feed(self, data: bytes) -> List[Any]:
+        data = self._tail + data if self._tail else data
+        end = data.rfind(b'\n')
+        if end < 0:
+            if len(data) > self.max_line:
+                raise FramingError(f'line longer than {self.max_line} bytes')
+            self._tail = data
+            return []
+        self._tail = data[end + 1:]
+        lines = [line for line in data[:end].split(b'\n') if line.strip()]
+        if not lines:
+            return []
+        try:
+            events = loads(b'[' + b','.join(lines) + b']')
+            if len(events) == len(lines):
+                return events
+        except ValueError:
+            pass
+        events = []
+        for line in lines:
+            try:
+                events.append(loads(line))
+            except ValueError:
+                self.errors += 1
+        return events
+
+
+class LengthPrefixedDecoder:
+    """Events framed as a 4-byte big-endian length followed by that many bytes of JSON."""
+
+    def __init__(self, max_frame: int = MAX_FRAME):
+        self.max_frame = max_frame
+        self.errors = 0
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> List[Any]:
+        buf = self._buf
+        buf += data
+        events = []
+        pos, size = 0, len(buf)
+        while size - pos >= 4:
+            (length,) = _LENGTH.unpack_from(buf, pos)
+            if length > self.max_frame:
+                raise FramingError(f'frame of {length} bytes exceeds {self.max_frame}')
+            if size - pos - 4 < length:
+                break
+            try:
+                events.append(loads(bytes(buf[pos + 4:pos + 4 + length])))
+            except ValueError:
+                self.errors += 1
+            pos += 4 + length
+        del buf[:pos]
+        return events
+
+
+def decoder_for(first: bytes):
+    """Pick the decoder from a stream's first byte.
+
+    A length prefix starts with a zero byte (frames are at most 16 MiB);
+    JSON text never does.
+    """
+    return LengthPrefixedDecoder() if first[:1] == b'\x00' else NDJSONDecoder()
+
+
+def encode_ndjson(events: Iterable[Any]) -> bytes:
+    return b''.join(dumps(event) + b'\n' for event in events)
+
+
+def encode_frames(events: Iterable[Any]) -> bytes:
+    out = []
+    for event in events:
+        payload = dumps(event)
+        out.append(_LENGTH.pack(len(payload)))
+        out.append(payload)
+    return b''.join(out)
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .framing import FramingError, NDJSONDecoder, decoder_for
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[List[Any]], Awaitable[Any]]
+
+READ_SIZE = 1 << 16
+
+
+class IngestServer:
+    """Streaming login-event intake over TCP, Unix sockets and tailed log files.
+
+    Each source decodes what it reads in bulk (``framing``) and puts the
+    decoded events on one bounded queue as a chunk. One consumer task
+    takes a chunk, adds every chunk already waiting behind it (up to
+    ``batch_size`` events), and awaits ``handler(events)`` on the result.
+    When ``max_pending`` chunks are waiting, sources stop reading until
+    the consumer catches up. For sockets, that pushes back on the senders
+    through TCP flow control. Events from one connection or file reach the
+    handler in order.
+
+    Sockets are one-way: nothing is written back, and results come out
+    through the service's own alert store and stream.
+
+    With ``validate`` (e.g. ``LoginEvent.parse_obj``), each decoded event is
+    passed through it before the handler sees the batch. An event it
+    rejects with ValueError (pydantic's ValidationError included) or
+    TypeError is counted in ``invalid`` and left out; the handler gets the
+    validated rest, so one bad event never costs the others their batch.
+    """
+
+    def __init__(self, handler: Handler, batch_size: int = 2000, max_pending: int = 64,
+                 validate: Optional[Callable[[Any], Any]] = None):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.validate = validate
+        self.queue: 'asyncio.Queue[List[Any]]' = asyncio.Queue(maxsize=max_pending)
+        self.stats: Dict[str, int] = {'connections': 0, 'connections_total': 0, 'bytes': 0, 'events': 0,
+                                      'parse_errors': 0, 'framing_errors': 0, 'invalid': 0, 'batches': 0,
+                                      'handler_errors': 0}
+        self._servers: List[asyncio.AbstractServer] = []
+        self._tasks: List[asyncio.Task] = []
+        self._unix_paths: List[str] = []
+        self._writers = set()
+        self._consumer: Optional[asyncio.Task] = None
+
+    def _ensure_consumer(self):
+        if self._consumer is None:
+            self._consumer = asyncio.get_running_loop().create_task(self._consume())
+
+    async def start_tcp(self, host: str, port: int) -> asyncio.AbstractServer:
+        self._ensure_consumer()
+        server = await asyncio.start_server(self._serve, host, port, limit=READ_SIZE)
+        self._servers.append(server)
+        return server
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        self._ensure_consumer()
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket from an earlier run
+        server = await asyncio.start_unix_server(self._serve, path, limit=READ_SIZE)
+        self._servers.append(server)
+        self._unix_paths.append(path)
+        return server
+
+    def tail(self, path: str, from_start: bool = False, poll_interval: float = 0.2) -> asyncio.Task:
+        """Follow an append-only NDJSON log, reopening it when it is rotated or truncated."""
+        self._ensure_consumer()
+        task = asyncio.get_running_loop().create_task(self._tail(path, from_start, poll_interval))
+        self._tasks.append(task)
+        return task
+
+    async def _put(self, events: List[Any]):
+        if events:
+            self.stats['events'] += len(events)
+            await self.queue.put(events)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats['connections'] += 1
+        self.stats['connections_total'] += 1
+        self._writers.add(writer)
+        decoder = None
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                self.stats['bytes'] += len(data)
+                if decoder is None:
+                    decoder = decoder_for(data)
+                errors = decoder.errors
+                events = decoder.feed(data)
+                self.stats['parse_errors'] += decoder.errors - errors
+                await self._put(events)
+        except FramingError as e:
+            self.stats['framing_errors'] += 1
+            log.warning('ingest: dropping connection: %s', e)
+        except ConnectionError:
+            pass
+        finally:
+            self.stats['connections'] -= 1
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _tail(self, path: str, from_start: bool, poll_interval: float):
+        f = None
+        decoder = NDJSONDecoder()
+        try:
+            while True:
+                if f is None:
+                    try:
+                        f = open(path, 'rb')
+                    except FileNotFoundError:
+                        from_start = True  # created later: all of it is new
+                        await asyncio.sleep(poll_interval)
+                        continue
+                    if not from_start:
+                        f.seek(0, os.SEEK_END)
+                    from_start = True  # anything after a rotation is new
+                    decoder = NDJSONDecoder()
+                data = f.read(READ_SIZE)
+                if data:
+                    self.stats['bytes'] += len(data)
+                    errors = decoder.errors
+                    try:
+                        events = decoder.feed(data)
+                    except FramingError as e:
+                        self.stats['framing_errors'] += 1
+                        log.warning('ingest: skipping to the end of %s: %s', path, e)
+                        f.seek(0, os.SEEK_END)
+                        decoder = NDJSONDecoder()
+                        continue
+                    self.stats['parse_errors'] += decoder.errors - errors
+                    await self._put(events)
+                    continue
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    st = None
+                if st is None or st.st_ino != os.fstat(f.fileno()).st_ino or st.st_size < f.tell():
+                    # rotated or truncated: whatever the old file still had is already read
+                    f.close()
+                    f = None
+                    continue
+                await asyncio.sleep(poll_interval)
+        finally:
+            if f is not None:
+                f.close()
+
+    async def _consume(self):
+        queue = self.queue
+        while True:
+            batch = await queue.get()
+            taken = 1
+            if len(batch) < self.batch_size and not queue.empty():
+                batch = list(batch)
+                while len(batch) < self.batch_size and not queue.empty():
+                    batch.extend(queue.get_nowait())
+                    taken += 1
+            try:
+                if self.validate is not None:
+                    batch = self._validated(batch)
+                if batch:
+                    await self.handler(batch)
+            except Exception:
+                self.stats['handler_errors'] += 1
+                log.exception('ingest: handler failed on a batch of %d events', len(batch))
+            finally:
+                self.stats['batches'] += 1
+                for _ in range(taken):
+                    queue.task_done()
+
+    def _validated(self, events: List[Any]) -> List[Any]:
+        validate = self.validate
+        valid = []
+        for event in events:
+            try:
+                valid.append(validate(event))
+            except (ValueError, TypeError):
+                self.stats['invalid'] += 1
+        return valid
+
+    async def drain(self):
+        """Wait until every queued event has been handed to the handler."""
+        await self.queue.join()
+
+    def info(self) -> Dict[str, Any]:
+        return {**self.stats, 'pending_chunks': self.queue.qsize(), 'max_pending': self.queue.maxsize,
+                'listening': [str(s.sockets[0].getsockname()) for s in self._servers if s.sockets],
+                'tailing': len(self._tasks)}
+
+    async def stop(self, timeout: float = 5.0):
+        """Stop reading, give the queue ``timeout`` seconds to drain, then stop the consumer."""
+        for server in self._servers:
+            server.close()
+        for writer in list(self._writers):
+            writer.close()
+        for task in self._tasks:
+            task.cancel()
+        for server in self._servers:
+            await server.wait_closed()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._consumer is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                log.warning('ingest: stopping with %d chunks still queued', self.queue.qsize())
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+        for path in self._unix_paths:
+            if os.path.exists(path):
+                os.unlink(path)
+        self._servers, self._tasks, self._unix_paths = [], [], []
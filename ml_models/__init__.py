@@ -0,0 +1,5 @@
+from .artifact import FORMAT_VERSION, load_model, save_model
+from .behavior import UserBehaviorModel, event_hour
+from .registry import ModelHandle
+
+__all__ = ['FORMAT_VERSION', 'ModelHandle', 'UserBehaviorModel', 'event_hour', 'load_model', 'save_model']
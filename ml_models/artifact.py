@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+from typing import Any, Dict
+
+import numpy as np
+
+from .behavior import KIND as BEHAVIOR_KIND, UserBehaviorModel
+
+# Bump when the on-disk layout changes; older readers refuse newer files
+FORMAT_VERSION = 1
+
+MODEL_KINDS = {BEHAVIOR_KIND: UserBehaviorModel}
+
+
+def save_model(model, path: str) -> str:
+    """Write ``model`` as a single ``.npz`` artifact, atomically.
+
+    The file holds the model's arrays plus a ``__meta__`` JSON string with
+    the format version, model kind and version. It is written to a temp file
+    and renamed into place, so a server watching ``path`` never loads a
+    half-written model.
+    """
+    meta: Dict[str, Any] = {**model.meta, 'format': FORMAT_VERSION}
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.npz.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, __meta__=np.array(json.dumps(meta)), **model.arrays())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return path
+
+
+def load_model(path: str):
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['__meta__']))
+        if meta.get('format', 0) > FORMAT_VERSION:
+            raise ValueError(f'{path}: artifact format {meta.get("format")} is newer than {FORMAT_VERSION}')
+        cls = MODEL_KINDS.get(meta.get('kind'))
+        if cls is None:
+            raise ValueError(f'{path}: unknown model kind {meta.get("kind")!r}')
+        arrays = {k: data[k] for k in data.files if k != '__meta__'}
+    return cls(meta=meta, **arrays)
@@ -0,0 +1,232 @@
+import math
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+KIND = 'user_behavior'
+
+# Pseudo-event counts that shrink sparse per-user estimates toward the population
+TYPING_PRIOR = 5.0
+HOUR_PRIOR = 4.0
+LOCATION_PRIOR = 2.0
+MIN_TYPING_STD = 1.0
+
+# Component weights of the combined anomaly score (sums to 1)
+WEIGHTS = {'typing': 0.35, 'location': 0.25, 'hour': 0.2, 'device': 0.2}
+
+DEFAULT_THRESHOLDS = {
+    'typing_z': 3.0,      # flag typing speed more than this many stds from the user's mean
+    'hour_p': 0.01,       # flag hours the user logs in at less often than this
+    'location_p': 0.02,   # flag locations the user logs in from less often than this
+}
+
+# Below this many events the scalar path beats numpy's per-call overhead
+SCALAR_BATCH_MAX = 8
+
+
+def event_hour(access_time: Optional[str]) -> int:
+    """Hour of day from ``HH:MM`` or an ISO timestamp; -1 when unparseable."""
+    if not access_time:
+        return -1
+    try:
+        hour = int(access_time[11:13]) if 'T' in access_time else int(access_time.split(':')[0])
+    except ValueError:
+        return -1
+    return hour if 0 <= hour < 24 else -1
+
+
+def _device_key(user: int, device: Optional[str]) -> int:
+    return (user << 32) | zlib.crc32((device or '').encode('utf-8'))
+
+
+class UserBehaviorModel:
+    """Per-user Gaussian typing model plus hour/location/device histograms.
+
+    Row 0 of every per-user array is the population model, used for
+    usernames not seen in training. Per-user rows are shrunk toward it with
+    the ``*_PRIOR`` pseudo-counts, so users with little history behave like
+    the population instead of flagging everything.
+
+    ``score``/``verdict`` are the scalar inference path; ``score_batch``
+    computes the same quantities for many events with array lookups.
+    """
+
+    def __init__(self, users: np.ndarray, locations: np.ndarray, counts: np.ndarray,
+                 typing_mean: np.ndarray, typing_std: np.ndarray, hour_p: np.ndarray,
+                 location_p: np.ndarray, device_keys: np.ndarray, meta: Dict[str, Any]):
+        self.users = users
+        self.locations = locations
+        self.counts = counts
+        self.typing_mean = typing_mean
+        self.typing_std = typing_std
+        self.hour_p = hour_p
+        self.location_p = location_p
+        self.device_keys = device_keys
+        self.meta = meta
+        self.thresholds = {**DEFAULT_THRESHOLDS, **meta.get('thresholds', {})}
+        # derived lookup structures, rebuilt on load rather than stored
+        self._user_index = {u: i for i, u in enumerate(users.tolist()) if i}
+        self._location_index = {loc: i for i, loc in enumerate(locations.tolist())}
+        self._unseen_location = len(locations)
+        self._hour_max = hour_p.max(axis=1)
+        self._location_max = location_p.max(axis=1)
+        self._device_set = set(device_keys.tolist())
+        # python copies for the scalar path (list indexing beats numpy scalars)
+        self._mean_l = typing_mean.tolist()
+        self._std_l = typing_std.tolist()
+        self._hour_l = hour_p.tolist()
+        self._loc_l = location_p.tolist()
+        self._hour_max_l = self._hour_max.tolist()
+        self._loc_max_l = self._location_max.tolist()
+
+    @property
+    def version(self) -> str:
+        return self.meta.get('version', '')
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'users': self.users, 'locations': self.locations, 'counts': self.counts,
+            'typing_mean': self.typing_mean, 'typing_std': self.typing_std, 'hour_p': self.hour_p,
+            'location_p': self.location_p, 'device_keys': self.device_keys,
+        }
+
+    # --- training ---
+    @classmethod
+    def fit(cls, events: Iterable[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None) -> 'UserBehaviorModel':
+        events = list(events)
+        users = ['*'] + sorted({e['username'] for e in events})
+        locations = sorted({e['location'] for e in events if e.get('location')})
+        user_index = {u: i for i, u in enumerate(users)}
+        location_index = {loc: i for i, loc in enumerate(locations)}
+        n_users, n_locs = len(users), len(locations) + 1
+
+        counts = np.zeros(n_users)
+        t_n = np.zeros(n_users)
+        t_sum = np.zeros(n_users)
+        t_sq = np.zeros(n_users)
+        hours = np.zeros((n_users, 24))
+        locs = np.zeros((n_users, n_locs))
+        devices = set()
+        for e in events:
+            rows = (0, user_index[e['username']])
+            ts = e.get('typing_speed')
+            h = event_hour(e.get('access_time'))
+            loc = location_index.get(e.get('location'), n_locs - 1)
+            for u in rows:
+                counts[u] += 1
+                if ts is not None:
+                    t_n[u] += 1
+                    t_sum[u] += ts
+                    t_sq[u] += ts * ts
+                if h >= 0:
+                    hours[u, h] += 1
+                locs[u, loc] += 1
+            devices.add(_device_key(rows[1], e.get('device_fingerprint')))
+
+        # population: Laplace-smoothed, with a pseudo-count for unseen locations
+        pop_n = max(t_n[0], 1.0)
+        pop_mean = t_sum[0] / pop_n
+        pop_var = max(t_sq[0] / pop_n - pop_mean * pop_mean, MIN_TYPING_STD ** 2)
+        pop_hour = (hours[0] + 1.0) / (hours[0].sum() + 24.0)
+        pop_loc = (locs[0] + 1.0) / (locs[0].sum() + n_locs)
+
+        # per-user rows shrink toward the population row
+        mean = (t_sum + TYPING_PRIOR * pop_mean) / (t_n + TYPING_PRIOR)
+        m2 = np.maximum(t_sq - t_n * (t_sum / np.maximum(t_n, 1.0)) ** 2, 0.0)
+        std = np.sqrt((m2 + TYPING_PRIOR * pop_var) / (t_n + TYPING_PRIOR))
+        hour_p = (hours + HOUR_PRIOR * pop_hour) / (hours.sum(axis=1, keepdims=True) + HOUR_PRIOR)
+        location_p = (locs + LOCATION_PRIOR * pop_loc) / (locs.sum(axis=1, keepdims=True) + LOCATION_PRIOR)
+        mean[0], std[0], hour_p[0], location_p[0] = pop_mean, math.sqrt(pop_var), pop_hour, pop_loc
+
+        meta = {'kind': KIND, 'n_events': len(events), 'thresholds': dict(DEFAULT_THRESHOLDS), **(meta or {})}
+        return cls(np.array(users), np.array(locations, dtype=str), counts, mean, np.maximum(std, MIN_TYPING_STD),
+                   hour_p, location_p, np.array(sorted(devices), dtype=np.int64), meta)
+
+    # --- scalar inference ---
+    def score(self, event: Dict[str, Any]) -> Tuple[float, Dict[str, float]]:
+        """Anomaly score in [0, 1] (1 = most unusual) and its components."""
+        u = self._user_index.get(event.get('username'), 0)
+        ts = event.get('typing_speed')
+        typing = 0.0
+        if ts is not None:
+            z = abs(ts - self._mean_l[u]) / self._std_l[u]
+            typing = 1.0 - math.exp(-0.5 * z * z)
+        h = event_hour(event.get('access_time'))
+        hour = 1.0 - self._hour_l[u][h] / self._hour_max_l[u] if h >= 0 else 0.0
+        loc = self._location_index.get(event.get('location'), self._unseen_location)
+        location = 1.0 - self._loc_l[u][loc] / self._loc_max_l[u]
+        device = 0.0
+        if u and _device_key(u, event.get('device_fingerprint')) not in self._device_set:
+            device = 1.0
+        parts = {'typing': typing, 'location': location, 'hour': hour, 'device': device}
+        total = 0.0
+        for k in ('typing', 'location', 'hour', 'device'):
+            total += WEIGHTS[k] * parts[k]
+        return total, parts
+
+    def verdict(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Score plus the per-rule flags ``detect_anomaly`` consumes."""
+        total, _ = self.score(event)
+        u = self._user_index.get(event.get('username'), 0)
+        ts = event.get('typing_speed')
+        h = event_hour(event.get('access_time'))
+        loc = self._location_index.get(event.get('location'), self._unseen_location)
+        return {
+            'score': total,
+            'typing': ts is not None and abs(ts - self._mean_l[u]) / self._std_l[u] > self.thresholds['typing_z'],
+            'hour': h >= 0 and self._hour_l[u][h] < self.thresholds['hour_p'],
+            'location': self._loc_l[u][loc] < self.thresholds['location_p'],
+        }
+
+    # --- vectorised inference ---
+    def _columns(self, events: List[Dict[str, Any]]):
+        n = len(events)
+        uidx = np.fromiter((self._user_index.get(e.get('username'), 0) for e in events), np.int64, n)
+        ts = np.fromiter((np.nan if e.get('typing_speed') is None else e['typing_speed'] for e in events), float, n)
+        hours = np.fromiter((event_hour(e.get('access_time')) for e in events), np.int64, n)
+        locs = np.fromiter((self._location_index.get(e.get('location'), self._unseen_location) for e in events),
+                           np.int64, n)
+        keys = np.fromiter((_device_key(u, e.get('device_fingerprint')) for u, e in zip(uidx.tolist(), events)),
+                           np.int64, n)
+        return uidx, ts, hours, locs, keys
+
+    def score_batch(self, events: List[Dict[str, Any]]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Vectorised ``score`` over a list of events.
+
+        Returns the score array and the component arrays; keys starting with
+        ``_`` are the raw statistics ``verdicts`` thresholds.
+        """
+        uidx, ts, hours, locs, keys = self._columns(events)
+        z = np.abs(ts - self.typing_mean[uidx]) / self.typing_std[uidx]
+        has_ts = ~np.isnan(ts)
+        typing = np.where(has_ts, 1.0 - np.exp(-0.5 * np.where(has_ts, z, 0.0) ** 2), 0.0)
+        has_hour = hours >= 0
+        hp = self.hour_p[uidx, np.maximum(hours, 0)]
+        hour = np.where(has_hour, 1.0 - hp / self._hour_max[uidx], 0.0)
+        lp = self.location_p[uidx, locs]
+        location = 1.0 - lp / self._location_max[uidx]
+        pos = np.searchsorted(self.device_keys, keys)
+        seen = self.device_keys[np.minimum(pos, len(self.device_keys) - 1)] == keys if len(self.device_keys) else \
+            np.zeros(len(keys), dtype=bool)
+        device = np.where((uidx > 0) & ~seen, 1.0, 0.0)
+        parts = {'typing': typing, 'location': location, 'hour': hour, 'device': device}
+        total = np.zeros(len(events))
+        for k in ('typing', 'location', 'hour', 'device'):
+            total = total + WEIGHTS[k] * parts[k]
+        parts['_z'], parts['_has_ts'], parts['_hour_p'], parts['_has_hour'], parts['_location_p'] = \
+            z, has_ts, hp, has_hour, lp
+        return total, parts
+
+    def verdicts(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``verdict`` for many events; vectorised once the batch is big enough."""
+        if len(events) <= SCALAR_BATCH_MAX:
+            return [self.verdict(e) for e in events]
+        total, parts = self.score_batch(events)
+        typing = parts['_has_ts'] & (np.where(parts['_has_ts'], parts['_z'], 0.0) > self.thresholds['typing_z'])
+        hour = parts['_has_hour'] & (parts['_hour_p'] < self.thresholds['hour_p'])
+        location = parts['_location_p'] < self.thresholds['location_p']
+        return [
+            {'score': s, 'typing': t, 'hour': h, 'location': loc}
+            for s, t, h, loc in zip(total.tolist(), typing.tolist(), hour.tolist(), location.tolist())
+        ]
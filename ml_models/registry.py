@@ -0,0 +1,36 @@
+from typing import Any, Dict
+
+from hotreload import FileHandle
+
+from .artifact import load_model
+
+
+class ModelHandle(FileHandle):
+    """The currently active model for one artifact path, hot-swappable.
+
+    ``get`` loads the artifact again when it changed (see
+    ``hotreload.FileHandle``). A model that fails to load leaves the
+    previous one serving. A missing artifact means no model (callers fall
+    back to the rule thresholds).
+    """
+
+    def load(self, path: str):
+        return load_model(path)
+
+    @property
+    def model(self):
+        return self.value
+
+    def info(self) -> Dict[str, Any]:
+        model = self.value
+        return {
+            'path': self.path,
+            'loaded': model is not None,
+            'kind': model.meta.get('kind') if model is not None else None,
+            'version': model.version if model is not None else None,
+            'trained_at': model.meta.get('trained_at') if model is not None else None,
+            'n_events': model.meta.get('n_events') if model is not None else None,
+            'loaded_at': self.loaded_at,
+            'swaps': self.swaps,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,70 @@
+"""Train the behaviour model from login event logs and write an artifact.
+
+Inputs may be JSON arrays (``synthetic_events.json``) or NDJSON files, or
+directories of them (``data/``).
+
+Usage: python -m ml_models.train synthetic_events.json data/ [--out PATH] [--version V]
+"""
+import argparse
+import datetime
+import json
+import os
+from typing import Any, Dict, Iterator, List
+
+from .artifact import save_model
+from .behavior import UserBehaviorModel
+
+DEFAULT_ARTIFACT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'behavior.npz')
+EVENT_SUFFIXES = ('.json', '.ndjson', '.jsonl')
+
+
+def iter_event_files(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(EVENT_SUFFIXES):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def read_events(path: str) -> Iterator[Dict[str, Any]]:
+    """Events from a JSON array or NDJSON file (one object per line)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == '[':
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def train(paths: List[str], version: str = '') -> UserBehaviorModel:
+    events = [e for p in iter_event_files(paths) for e in read_events(p) if e.get('username')]
+    if not events:
+        raise ValueError('no training events found')
+    trained_at = datetime.datetime.utcnow().isoformat() + 'Z'
+    return UserBehaviorModel.fit(events, meta={
+        'version': version or datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S'),
+        'trained_at': trained_at,
+        'sources': list(paths),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='event files or directories')
+    parser.add_argument('--out', default=DEFAULT_ARTIFACT)
+    parser.add_argument('--version', default='')
+    args = parser.parse_args()
+    model = train(args.inputs, args.version)
+    save_model(model, args.out)
+    print(f'wrote {args.out}: version={model.version} users={len(model.users) - 1} events={model.meta["n_events"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""Per-site detection rules, declared in JSON and compiled for the hot paths."""
+from .config import (DEFAULT_PATH, DEFAULT_RULES, DEFAULTS, DETECTOR_FACTORS, REPORTER_COMPONENTS, DetectorRules,
+                     ReporterRules, RuleSet, hour_mask, load_rules)
+from .handle import RulesHandle
+
+__all__ = ['DEFAULT_PATH', 'DEFAULT_RULES', 'DEFAULTS', 'DETECTOR_FACTORS', 'REPORTER_COMPONENTS', 'DetectorRules',
+           'ReporterRules', 'RuleSet', 'RulesHandle', 'hour_mask', 'load_rules']
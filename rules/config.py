@@ -0,0 +1,153 @@
+import copy
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Union
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+# Detector risk factors, in the order detect_anomaly evaluates them
+DETECTOR_FACTORS = ('typing_speed', 'location', 'device_fingerprint', 'impossible_travel', 'location_shift',
+                    'login_velocity', 'shared_device', 'ip_location', 'access_time')
+# Reporter similarity components; the weighted sum is taken in this order
+REPORTER_COMPONENTS = ('typing', 'device', 'ua', 'location', 'time', 'ip')
+
+# The values both services used before rules were configurable
+DEFAULTS: Dict[str, Any] = {
+    'detector': {
+        'weights': {'typing_speed': 0.3, 'location': 0.4, 'device_fingerprint': 0.3, 'impossible_travel': 0.4,
+                    'location_shift': 0.4, 'login_velocity': 0.3, 'shared_device': 0.4, 'ip_location': 0.3,
+                    'access_time': 0.2},
+        'max_typing_speed': 200,
+        'usual_locations': ['IN', 'US', 'UK'],
+        'usual_hours': ['6-22'],
+        'alert_at': 0.5,
+        'high_above': 0.8,
+    },
+    'reporter': {
+        'weights': {'typing': 0.35, 'device': 0.25, 'ua': 0.1, 'location': 0.15, 'time': 0.1, 'ip': 0.05},
+        'typing_cutoff': 0.6,
+        'ua_cutoff': 0.45,
+        'suspicious_below': 0.6,
+    },
+}
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any], where: str) -> Dict[str, Any]:
+    # every key must already exist in the defaults, so typos fail loudly
+    if not isinstance(override, dict):
+        raise ValueError(f'{where}: expected an object')
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if key not in base:
+            raise ValueError(f'{where}: unknown key {key!r}')
+        merged[key] = _merge(base[key], value, f'{where}.{key}') if isinstance(base[key], dict) else value
+    return merged
+
+
+def hour_mask(spec: Iterable[Union[int, str]]) -> int:
+    """Bitmask of the hours in ``spec``: ints, or inclusive ``'a-b'`` ranges (``'22-5'`` wraps)."""
+    mask = 0
+    for item in spec:
+        if isinstance(item, str) and '-' in item:
+            first, _, last = item.partition('-')
+            first, last = int(first), int(last)
+            hours = range(first, last + 1) if first <= last else list(range(first, 24)) + list(range(0, last + 1))
+        else:
+            hours = [int(item)]
+        for hour in hours:
+            if not 0 <= hour < 24:
+                raise ValueError(f'usual_hours: {hour} is not an hour of the day')
+            mask |= 1 << hour
+    return mask
+
+
+class DetectorRules:
+    """One site's detector rules, flattened for ``detection.detect_anomaly``.
+
+    Each risk factor's weight is an attribute of the same name; a weight of
+    0 turns the rule off (``disabled``). Locations are a frozenset and the
+    usual hours a 24-bit mask.
+    """
+
+    __slots__ = DETECTOR_FACTORS + ('disabled', 'max_typing_speed', 'usual_locations', 'hour_mask', 'alert_at',
+                                    'high_above')
+
+    def __init__(self, section: Dict[str, Any]):
+        for name in DETECTOR_FACTORS:
+            setattr(self, name, float(section['weights'][name]))
+        self.disabled = frozenset(name for name in DETECTOR_FACTORS if not getattr(self, name))
+        self.max_typing_speed = float(section['max_typing_speed'])
+        self.usual_locations = frozenset(str(loc) for loc in section['usual_locations'])
+        self.hour_mask = hour_mask(section['usual_hours'])
+        self.alert_at = float(section['alert_at'])
+        self.high_above = float(section['high_above'])
+
+
+class ReporterRules:
+    """One site's reporter weights and cutoffs; ``weights`` follows ``REPORTER_COMPONENTS``."""
+
+    __slots__ = ('weights', 'typing_cutoff', 'ua_cutoff', 'suspicious_below')
+
+    def __init__(self, section: Dict[str, Any]):
+        self.weights = tuple(float(section['weights'][k]) for k in REPORTER_COMPONENTS)
+        self.typing_cutoff = float(section['typing_cutoff'])
+        self.ua_cutoff = float(section['ua_cutoff'])
+        self.suspicious_below = float(section['suspicious_below'])
+
+
+class RuleSet:
+    """Compiled rules for every configured site, plus the default for the rest.
+
+    A rules file is JSON of the form::
+
+        {"default": {"detector": {...}, "reporter": {...}},
+         "sites": {"bank.example": {"detector": {"usual_locations": ["IN"]}}}}
+
+    ``default`` is laid over ``DEFAULTS`` and each site over ``default``;
+    ``weights`` merge key by key, every other value replaces. A RuleSet is
+    never modified after it is built, so swapping one in is atomic.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, source: Optional[str] = None):
+        config = config or {}
+        if not isinstance(config, dict) or not isinstance(config.get('sites', {}), dict):
+            raise ValueError('rules: expected an object with "default" and "sites" objects')
+        unknown = set(config) - {'default', 'sites'}
+        if unknown:
+            raise ValueError(f'rules: unknown key {sorted(unknown)[0]!r}')
+        default = _merge(DEFAULTS, config.get('default', {}), 'default')
+        self.source = source
+        self.default_detector = DetectorRules(default['detector'])
+        self.default_reporter = ReporterRules(default['reporter'])
+        self._detector: Dict[str, DetectorRules] = {}
+        self._reporter: Dict[str, ReporterRules] = {}
+        for site, section in config.get('sites', {}).items():
+            merged = _merge(default, section, f'sites.{site}')
+            self._detector[site] = DetectorRules(merged['detector'])
+            self._reporter[site] = ReporterRules(merged['reporter'])
+
+    @property
+    def sites(self):
+        return sorted(self._detector)
+
+    def detector(self, site: Optional[str] = None) -> DetectorRules:
+        return self._detector.get(site, self.default_detector)
+
+    def reporter(self, site: Optional[str] = None) -> ReporterRules:
+        return self._reporter.get(site, self.default_reporter)
+
+
+def load_rules(path: str) -> RuleSet:
+    """Read and compile a rules file; ValueError if it is not valid."""
+    with open(path, 'rb') as f:
+        try:
+            config = json.loads(f.read())
+        except ValueError as e:
+            raise ValueError(f'{path}: {e}') from None
+    try:
+        return RuleSet(config, source=path)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f'{path}: {e}') from None
+
+
+DEFAULT_RULES = RuleSet()
@@ -0,0 +1,35 @@
+from typing import Any, Dict
+
+from hotreload import FileHandle
+
+from .config import DEFAULT_RULES, RuleSet, load_rules
+
+
+class RulesHandle(FileHandle):
+    """The active ``RuleSet`` for one rules file, hot-swappable.
+
+    ``get`` compiles the file again when it changed (see
+    ``hotreload.FileHandle``). A file that fails to load leaves the
+    previous rules serving; no file means the built-in defaults.
+    """
+
+    empty = DEFAULT_RULES
+    load_errors = (OSError, ValueError)
+
+    def load(self, path: str) -> RuleSet:
+        return load_rules(path)
+
+    @property
+    def rules(self) -> RuleSet:
+        return self.value
+
+    def info(self) -> Dict[str, Any]:
+        rules = self.value
+        return {
+            'path': self.path,
+            'source': rules.source,
+            'sites': rules.sites,
+            'loaded_at': self.loaded_at,
+            'swaps': self.swaps,
+            'last_error': self.last_error,
+        }
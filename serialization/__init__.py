@@ -0,0 +1,6 @@
+"""JSON encoding and streaming responses shared by the detector and the reporter."""
+from .encoder import HAVE_ORJSON, dumps, loads
+from .responses import JSONBytesResponse, array_chunks, grouped_object_chunks, json_array_response
+
+__all__ = ['HAVE_ORJSON', 'JSONBytesResponse', 'array_chunks', 'dumps', 'grouped_object_chunks',
+           'json_array_response', 'loads']
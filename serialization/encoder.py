@@ -0,0 +1,28 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same JSON, just slower
+    orjson = None
+
+HAVE_ORJSON = orjson is not None
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        """Compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj, option=_OPTIONS)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(obj: Any) -> bytes:
+        """Compact UTF-8 JSON bytes."""
+        return _encoder.encode(obj).encode('utf-8')
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
@@ -27,7 +27,9 @@ if (Is-Up "http://127.0.0.1:8000/api/alerts") {
     Write-Output "✓ AI backend already running."
 } else {
     Write-Output "✓ Starting AI backend on :8000..."
-    Start-Process -NoNewWindow -FilePath $python -ArgumentList '-m','uvicorn','backend.main:app','--port','8000','--host','127.0.0.1' -PassThru
+    # backend/ is a flat module directory: put it on sys.path with --app-dir; the repository root
+    # (working directory, via python -m) provides the shared packages it imports
+    Start-Process -NoNewWindow -FilePath $python -WorkingDirectory $PSScriptRoot -ArgumentList '-m','uvicorn','main:app','--app-dir','backend','--port','8000','--host','127.0.0.1' -PassThru
     Start-Sleep -Seconds 2
 }
 
@@ -36,7 +38,7 @@ if (Is-Up "http://127.0.0.1:8100/health") {
     Write-Output "✓ Automated reporter already running."
 } else {
     Write-Output "✓ Starting automated reporter on :8100..."
-    Start-Process -NoNewWindow -FilePath $python -ArgumentList '-m','uvicorn','automated_reporter.main:app','--port','8100','--host','127.0.0.1' -PassThru
+    Start-Process -NoNewWindow -FilePath $python -WorkingDirectory $PSScriptRoot -ArgumentList '-m','uvicorn','automated_reporter.main:app','--port','8100','--host','127.0.0.1' -PassThru
     Start-Sleep -Seconds 2
 }
 
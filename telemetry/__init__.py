@@ -0,0 +1,16 @@
+"""Lightweight in-process metrics shared by the detector and the reporter."""
+import os
+
+from .asgi import MetricsMiddleware
+from .registry import DEFAULT_BUCKETS, Counter, Gauge, Histogram, Registry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_enabled() -> bool:
+    """The ``METRICS_ENABLED`` switch (on unless set to 0/false/off)."""
+    return os.getenv('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'off', 'no')
+
+
+__all__ = ['CONTENT_TYPE', 'DEFAULT_BUCKETS', 'Counter', 'Gauge', 'Histogram', 'MetricsMiddleware', 'Registry',
+           'metrics_enabled']
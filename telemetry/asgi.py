@@ -0,0 +1,36 @@
+from time import perf_counter
+from typing import Dict, Tuple
+
+from .registry import Histogram, Registry
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request per (method, route).
+
+    Requests are keyed by the matched route template (``/profiles/{site}/{username}``),
+    not the raw path, so the number of histograms stays bounded. Unmatched
+    requests share one ``<unmatched>`` series.
+    """
+
+    def __init__(self, app, registry: Registry, name: str = 'http_request_duration_seconds'):
+        self.app = app
+        self.registry = registry
+        self.name = name
+        self._by_route: Dict[Tuple[str, str], Histogram] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # the router stores the matched route in the (shared) scope
+            route = getattr(scope.get('route'), 'path', '<unmatched>')
+            key = (scope['method'], route)
+            hist = self._by_route.get(key)
+            if hist is None:
+                hist = self._by_route[key] = self.registry.histogram(
+                    self.name, 'HTTP request latency by route', {'method': key[0], 'route': key[1]})
+            hist.observe(perf_counter() - started)
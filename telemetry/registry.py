@@ -0,0 +1,143 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, 50us .. 5s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    __slots__ = ('registry', 'name', 'labels')
+    kind = ''
+
+    def __init__(self, registry: 'Registry', name: str, labels: Labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+
+class Counter(_Metric):
+    """Monotonic counter; ``fn`` reads the value from elsewhere at scrape time."""
+
+    __slots__ = ('value', 'fn')
+    kind = 'counter'
+
+    def __init__(self, registry, name, labels, fn: Optional[Callable[[], float]] = None):
+        super().__init__(registry, name, labels)
+        self.value = 0.0
+        self.fn = fn
+
+    def inc(self, amount: float = 1.0):
+        if self.registry.enabled:
+            self.value += amount
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, _format_labels(self.labels), self.fn() if self.fn else self.value)]
+
+
+class Gauge(Counter):
+    __slots__ = ()
+    kind = 'gauge'
+
+    def set(self, value: float):
+        if self.registry.enabled:
+            self.value = value
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; ``observe`` only bumps pre-allocated slots."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+    kind = 'histogram'
+
+    def __init__(self, registry, name, labels, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, labels)
+        self.buckets = tuple(buckets)
+        # one extra slot for observations above the last bucket (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if self.registry.enabled:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        out = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += n
+            out.append((self.name + '_bucket', _format_labels(self.labels, f'le="{_format_value(bound)}"'), cumulative))
+        out.append((self.name + '_sum', _format_labels(self.labels), self.sum))
+        out.append((self.name + '_count', _format_labels(self.labels), self.count))
+        return out
+
+
+class Registry:
+    """Process-wide set of metrics rendered in the Prometheus text format.
+
+    Metrics are created up front (or once per new label set) and then only
+    mutated in place, so recording is a few attribute updates with no
+    allocation. With ``enabled`` False every update is a single attribute
+    check; callback metrics are only evaluated when scraped.
+    """
+
+    def __init__(self, prefix: str = '', enabled: bool = True):
+        self.prefix = prefix
+        self.enabled = enabled
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._metrics: Dict[Tuple[str, Labels], _Metric] = {}
+
+    def _get(self, cls, name: str, help: str, labels: Optional[Dict[str, str]], **kwargs):
+        full = self.prefix + name
+        key = (full, tuple(sorted((labels or {}).items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            known = self._help.setdefault(full, (cls.kind, help))
+            if known[0] != cls.kind:
+                raise ValueError(f'{full} already registered as a {known[0]}')
+            metric = self._metrics[key] = cls(self, full, key[1], **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Optional[Dict[str, str]] = None,
+                fn: Optional[Callable[[], float]] = None) -> Counter:
+        return self._get(Counter, name, help, labels, fn=fn)
+
+    def gauge(self, name: str, help: str, labels: Optional[Dict[str, str]] = None,
+              fn: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._get(Gauge, name, help, labels, fn=fn)
+
+    def histogram(self, name: str, help: str, labels: Optional[Dict[str, str]] = None,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self) -> str:
+        by_name: Dict[str, List[_Metric]] = {}
+        for (name, _), metric in self._metrics.items():
+            by_name.setdefault(name, []).append(metric)
+        lines = []
+        for name, metrics in by_name.items():
+            kind, help = self._help[name]
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for metric in metrics:
+                for sample, labels, value in metric.samples():
+                    lines.append(f'{sample}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'backend')
+
+# backend/ is run as a flat module directory (`uvicorn main:app`), while
+# automated_reporter/ is imported as a package from the project root.
+for path in (ROOT, BACKEND):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# keep the backend's state in memory unless a test opts into a store
+os.environ.setdefault('DETECTOR_STORE', 'memory')
+_state_tmp = tempfile.mkdtemp(prefix='detector-tests-')
+os.environ.setdefault('PROFILES_DB_PATH', os.path.join(_state_tmp, 'profiles.db'))
+os.environ.setdefault('FORWARD_SPILL_PATH', os.path.join(_state_tmp, 'forward_spill.ndjson'))
+# no geo-IP database unless a test builds one
+os.environ.setdefault('GEOIP_DB_PATH', os.path.join(_state_tmp, 'geoip.bin'))
+# built-in rules unless a test writes a rules file
+os.environ.setdefault('RULES_PATH', os.path.join(_state_tmp, 'rules.json'))
+# no behaviour model artifact, so the backend uses its fixed rule thresholds
+os.environ.setdefault('DETECTOR_MODEL_PATH', os.path.join(_state_tmp, 'behavior.npz'))
+
+
+@pytest.fixture
+def login_event():
+    """Factory for login-event payloads; the defaults are an ordinary daytime login.
+
+    Other fields (``site``, ``ip_address``, ...) are passed as keywords; the
+    reporter's LoginEvent ignores ``event_id`` and ``timestamp``.
+    """
+    def make(i, username='alice', location='IN', typing_speed=150.0, device='dev-1', access_time='10:00', **fields):
+        return {
+            'event_id': f'evt-{i}',
+            'timestamp': '2025-11-28T10:00:00Z',
+            'username': username,
+            'device_fingerprint': device,
+            'location': location,
+            'typing_speed': typing_speed,
+            'access_time': access_time,
+            **fields,
+        }
+    return make
+
+
+@pytest.fixture
+def attack_event(login_event):
+    """Factory for login events the detector alerts on and locks the account for."""
+    def make(i, username):
+        return login_event(i, username, location='RU', typing_speed=250.0, device='dev-x', access_time='03:00')
+    return make
@@ -0,0 +1,60 @@
+import datetime
+import time
+from types import SimpleNamespace
+
+from alert_store import AlertStore, parse_timestamp
+
+
+def _alert(i, username, severity, status='new', minute=0):
+    return SimpleNamespace(
+        alert_id=f'A-{i}', username=username, severity=severity, status=status,
+        created_at=f'2025-11-28T10:{minute:02d}:00Z',
+    )
+
+
+def _ids(page):
+    return [a.alert_id for a in page]
+
+
+def test_cursor_pagination_with_filters():
+    store = AlertStore()
+    for i in range(10):
+        store.add(_alert(i, 'alice' if i % 2 else 'bob', 'high' if i % 3 == 0 else 'medium', minute=i))
+
+    page, cursor = store.query(limit=2, username='alice')
+    assert _ids(page) == ['A-9', 'A-7']
+    page, cursor = store.query(limit=2, username='alice', cursor=cursor)
+    assert _ids(page) == ['A-5', 'A-3']
+    page, cursor = store.query(limit=2, username='alice', cursor=cursor)
+    assert _ids(page) == ['A-1'] and cursor is None
+
+    page, _ = store.query(severity='high', desc=False)
+    assert _ids(page) == ['A-0', 'A-3', 'A-6', 'A-9']
+    page, _ = store.query(username='alice', severity='high')
+    assert _ids(page) == ['A-9', 'A-3']
+
+    after = parse_timestamp('2025-11-28T10:02:00Z')
+    before = parse_timestamp('2025-11-28T10:05:00Z')
+    page, _ = store.query(created_after=after, created_before=before, desc=False)
+    assert _ids(page) == ['A-2', 'A-3', 'A-4']
+
+
+def test_retention_evicts_oldest_from_every_index():
+    store = AlertStore(max_count=100)
+    for i in range(1000):
+        store.add(_alert(i, f'user{i % 7}', 'high' if i % 2 else 'medium', minute=i % 60))
+    assert len(store) == 100
+    assert store.get('A-899') is None and store.get('A-900') is not None
+    page, _ = store.query(limit=1000, severity='medium', desc=False)
+    assert page[0].alert_id == 'A-900' and len(page) == 50
+
+
+    store = AlertStore(max_age=600)
+    now = time.time()
+    for i in range(60):
+        alert = _alert(i, 'alice', 'high')
+        alert.created_at = datetime.datetime.fromtimestamp(now - 60 * (59 - i), datetime.timezone.utc).isoformat()
+        store.add(alert)
+    store.enforce_retention(now=now + 30)
+    assert _ids(store) == [f'A-{i}' for i in range(50, 60)]
+    assert len(store._by_user['alice']) == 10
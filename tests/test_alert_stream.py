@@ -0,0 +1,51 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main as backend
+from broadcaster import AlertBroadcaster
+
+
+def setup_function():
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+    backend.alert_broadcaster = AlertBroadcaster()
+
+
+def test_new_alerts_are_pushed_once_and_resumable(attack_event):
+    with TestClient(backend.app) as client:
+        with client.websocket_connect('/ws/alerts') as ws:
+            first = client.post('/api/login_event', json=attack_event(1, 'alice')).json()
+            second = client.post('/api/login_event', json=attack_event(2, 'bob')).json()
+            first_frame = json.loads(ws.receive_text())
+            assert first_frame['alert_id'] == first['alert_id']
+            assert json.loads(ws.receive_text())['alert_id'] == second['alert_id']
+
+        # reconnecting with a cursor only replays what came after it
+        with client.websocket_connect(f"/ws/alerts?after_seq={first_frame['stream_seq']}") as ws:
+            assert json.loads(ws.receive_text())['alert_id'] == second['alert_id']
+
+
+def test_slow_consumer_drops_oldest_then_is_disconnected():
+    broadcaster = AlertBroadcaster(max_queue=2, max_drops=3, history=10, start_seq=0)
+    slow = broadcaster.subscribe()
+    for i in range(4):
+        broadcaster.publish(f'{{"n":{i}}}')
+    assert slow.dropped == 2
+    assert [slow.queue.get_nowait(), slow.queue.get_nowait()] == ['{"n":2,"stream_seq":3}', '{"n":3,"stream_seq":4}']
+
+    for i in range(4, 10):
+        broadcaster.publish(f'{{"n":{i}}}')
+    assert slow.closed
+    assert broadcaster.stats()['subscribers'] == 0
+    assert broadcaster.replay_after(8) == ['{"n":8,"stream_seq":9}', '{"n":9,"stream_seq":10}']
+
+
+def test_resume_cursor_survives_repeated_alert_ids():
+    # frames X, Y, X (an incident update reuses X's alert_id): resuming after the first X still gets Y
+    broadcaster = AlertBroadcaster(history=2, start_seq=0)
+    x, y, x2 = (broadcaster.publish(f'{{"alert_id":"{a}"}}') for a in 'XYX')
+    assert [json.loads(f)['alert_id'] for f in broadcaster.replay_after(x)] == ['Y', 'X']
+    assert broadcaster.replay_after(x2) == []
+    # fell out of the buffer, or a cursor from another run: replay everything held
+    assert len(broadcaster.replay_after(0)) == len(broadcaster.replay_after(99)) == 2
@@ -0,0 +1,105 @@
+import csv
+import gzip
+import io
+import json
+
+import backfill
+from automated_reporter import storage
+from state_store import open_state_store
+from synthetic_data import stream_events
+
+FIELDS = ['event_id', 'timestamp', 'site', 'username', 'device_fingerprint', 'location', 'typing_speed',
+          'access_time', 'user_agent', 'ip_address']
+
+
+def _write_logs(tmp_path, events):
+    half = len(events) // 2
+    with gzip.open(tmp_path / 'part1.ndjson.gz', 'wt', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(e) + '\n' for e in events[:half]))
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(events[half:])
+    (tmp_path / 'part2.csv').write_text(buf.getvalue())
+
+
+def test_read_logs_handles_gzip_ndjson_and_csv(tmp_path):
+    events = list(stream_events(40, n_users=5, seed=3))
+    _write_logs(tmp_path, events)
+    read = list(backfill.read_logs([str(tmp_path)]))
+    assert [e['event_id'] for e in read] == [e['event_id'] for e in events]
+    assert read[-1]['typing_speed'] == events[-1]['typing_speed']
+
+
+def _run(tmp_path, name, workers, **options):
+    out = io.StringIO()
+    totals = backfill.backfill([str(tmp_path / 'logs')], workers=workers,
+                               store_url=f'sqlite:///{tmp_path / name}.db',
+                               profiles_db=str(tmp_path / f'{name}-profiles.db'), chunk_size=100, out=out,
+                               **options)
+    assert out.getvalue().startswith(('progress', 'done'))
+    store = open_state_store(f'sqlite:///{tmp_path / name}.db')
+    alerts, sessions = store.load_alerts(), store.load_sessions()
+    store.close()
+    return totals, alerts, sessions
+
+
+def test_backfill_is_partition_independent_and_writes_the_stores(tmp_path):
+    events = list(stream_events(1500, n_users=40, seed=11, attack_rate=0.1))
+    (tmp_path / 'logs').mkdir()
+    _write_logs(tmp_path / 'logs', events)
+
+    one, alerts_one, sessions_one = _run(tmp_path, 'one', 1)
+    two, alerts_two, sessions_two = _run(tmp_path, 'two', 2)
+
+    assert one == two
+    assert one['events'] == 1500 and one['invalid'] == 0
+    assert one['alerts'] > 0 and len(alerts_one) == one['alerts']
+    # the same alerts, in event time order, whatever the partitioning
+    key = [(a['username'], a['created_at'], a['reasons']) for _, a in alerts_one]
+    assert key == [(a['username'], a['created_at'], a['reasons']) for _, a in alerts_two]
+    assert key == sorted(key, key=lambda k: k[1]) and key[0][1].startswith('2025-01-01')
+    assert sessions_one == sessions_two and len(sessions_one) == one['sessions']
+
+    profiles = storage.ProfileStore(str(tmp_path / 'two-profiles.db'), json_path=None, flush_interval=60)
+    counts = {}
+    for e in events:
+        counts[e['username']] = counts.get(e['username'], 0) + 1
+    for username, n in counts.items():
+        assert profiles.get('example.com', username)['samples'] == n
+    profiles.close()
+
+    # a second run appends its alerts after the existing ones
+    again, alerts_again, _ = _run(tmp_path, 'one', 2)
+    assert [seq for seq, _ in alerts_again] == list(range(1, 2 * one['alerts'] + 1))
+
+
+def test_backfill_counts_events_it_cannot_evaluate_and_carries_on(tmp_path):
+    events = list(stream_events(200, n_users=10, seed=5, attack_rate=0.2))
+    events[50] = dict(events[50], access_time='25:99')
+    events[120] = dict(events[120], access_time='noon')
+    (tmp_path / 'logs').mkdir()
+    _write_logs(tmp_path / 'logs', events)
+
+    totals, alerts, _ = _run(tmp_path, 'bad', 1)
+    assert totals['events'] == 200 and totals['invalid'] == 2
+    assert totals['alerts'] > 0 and len(alerts) == totals['alerts']
+
+
+def test_backfilled_alerts_are_folded_rate_limited_and_retained_like_live_ones(tmp_path, monkeypatch):
+    events = list(stream_events(1500, n_users=40, seed=11, attack_rate=0.1))
+    (tmp_path / 'logs').mkdir()
+    _write_logs(tmp_path / 'logs', events)
+
+    raw, raw_alerts, _ = _run(tmp_path, 'raw', 1, raw_alerts=True)
+    folded, folded_alerts, _ = _run(tmp_path, 'folded', 1)
+
+    assert raw['folded'] == raw['rate_limited'] == 0 and len(raw_alerts) == raw['alerts']
+    assert folded['folded'] > 0 and len(folded_alerts) == folded['alerts']
+    assert folded['alerts'] + folded['folded'] + folded['rate_limited'] == raw['alerts']
+    # every repeat is counted on the incident it was folded into
+    assert sum(a['count'] for _, a in folded_alerts) == folded['alerts'] + folded['folded']
+
+    monkeypatch.setattr(backfill, 'ALERT_RETENTION_MAX_COUNT', 5)
+    kept, kept_alerts, _ = _run(tmp_path, 'kept', 1, raw_alerts=True)
+    assert [seq for seq, _ in kept_alerts] == list(range(kept['alerts'] - 4, kept['alerts'] + 1))
@@ -0,0 +1,56 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main as backend
+
+
+def setup_function():
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+
+
+def test_batch_json_array_matches_single_event_path(login_event):
+    client = TestClient(backend.app)
+    events = [
+        login_event(1, 'alice'),
+        login_event(2, 'bob'),
+        login_event(3, 'alice', location='RU', typing_speed=250.0, device='dev-2'),
+        login_event(4, 'alice'),
+        login_event(5, 'bob', location='US'),
+    ]
+    r = client.post('/api/login_events/batch', json=events)
+    assert r.status_code == 200
+    data = r.json()
+    assert data['processed'] == 5
+    statuses = [item['status'] for item in data['results']]
+    # alice is locked by event 3, so event 4 is rejected just like the single endpoint would
+    assert statuses == [200, 200, 200, 403, 200]
+    assert data['results'][2]['alert']['action'] == 'lock_account'
+    assert backend.user_sessions['alice'].locked
+    assert backend.user_sessions['bob'].last_location == 'US'
+
+
+def test_batch_ndjson_and_invalid_entries(login_event):
+    client = TestClient(backend.app)
+    body = '\n'.join([json.dumps(login_event(1, 'carol')), json.dumps({'username': 'carol'}), ''])
+    r = client.post('/api/login_events/batch', content=body,
+                    headers={'Content-Type': 'application/x-ndjson'})
+    assert r.status_code == 200
+    data = r.json()
+    assert data['summary'] == {'ok': 1, 'alert': 0, 'locked': 0, 'invalid': 1}
+    assert data['results'][1]['status'] == 422
+
+
+def test_batch_keeps_going_past_events_it_cannot_evaluate(login_event):
+    client = TestClient(backend.app)
+    events = [login_event(1, 'dave'), login_event(2, 'dave', access_time=''),
+              login_event(3, 'erin', access_time='2025-11-28T10:00:00Z')]
+    r = client.post('/api/login_events/batch', json=events)
+    assert r.status_code == 200
+    data = r.json()
+    assert [item['status'] for item in data['results']] == [200, 422, 200]
+    assert data['summary'] == {'ok': 2, 'alert': 0, 'locked': 0, 'invalid': 1}
+    # an ISO access time is read as its clock time
+    assert backend.user_sessions['erin'].last_access_time == '10:00'
+    assert client.post('/api/login_event', json=login_event(4, 'dave', access_time='late')).status_code == 422
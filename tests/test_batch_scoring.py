@@ -0,0 +1,78 @@
+import random
+
+from fastapi.testclient import TestClient
+
+from automated_reporter import main as reporter
+from automated_reporter import scoring
+
+UAS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 13_4) Safari/605.1',
+    'curl/8.0',
+    '',
+]
+
+
+def _random_profile(rng):
+    return {
+        'avg_typing_speed': rng.choice([None, 0.4, rng.uniform(80, 240)]),
+        'std_typing_speed': rng.choice([None, 0.0, rng.uniform(1, 40)]),
+        'device_fingerprints': [f'dev-{rng.randint(0, 5)}' for _ in range(rng.randint(0, 3))],
+        'locations': rng.sample(['US', 'IN', 'UK', 'RU'], rng.randint(0, 3)),
+        'user_agents': rng.sample(UAS, rng.randint(0, 3)),
+        'ip_addresses': rng.sample(['10.0.', '192.168.1.5', '', '172.16.'], rng.randint(0, 3)),
+        'typical_hours': sorted(rng.sample(range(24), rng.randint(0, 6))),
+        'samples': 10,
+    }
+
+
+def _random_event(rng):
+    return {
+        'site': 'example.com',
+        'username': 'alice',
+        'typing_speed': rng.choice([None, rng.uniform(40, 320)]),
+        'device_fingerprint': rng.choice([None, f'dev-{rng.randint(0, 5)}']),
+        'location': rng.choice([None, 'US', 'IN', 'CN']),
+        'user_agent': rng.choice([None] + UAS),
+        'ip_address': rng.choice([None, '10.0.0.7', '192.168.1.5', '8.8.8.8']),
+        'access_time': rng.choice([None, '10:00', f'2025-11-28T{rng.randint(0, 23):02d}:15:00Z', '2025-11-28Txx:00']),
+    }
+
+
+def test_batch_scores_are_bit_identical_to_single_event_path():
+    rng = random.Random(7)
+    profiles = [_random_profile(rng) for _ in range(50)]
+    pairs = [(rng.choice(profiles), _random_event(rng)) for _ in range(2000)]
+    similarities, reasons = scoring.score_batch([p for p, _ in pairs], [e for _, e in pairs])
+    for (profile, event), similarity, batch_reasons in zip(pairs, similarities.tolist(), reasons):
+        expected, expected_reasons = scoring.score_event(profile, event)
+        assert similarity == expected
+        assert batch_reasons == expected_reasons
+
+
+def test_check_batch_endpoint(monkeypatch):
+    forwarded = []
+
+    def fake_forward(report):
+        forwarded.append(report)
+        return True
+
+    monkeypatch.setattr(reporter, 'forward_to_ai_backend', fake_forward)
+    reporter.profiles.put('example.com', 'bob', {
+        'avg_typing_speed': 150.0, 'std_typing_speed': 10.0, 'device_fingerprints': ['dev-1'],
+        'locations': ['US'], 'typical_hours': [9, 10], 'samples': 5,
+    })
+    client = TestClient(reporter.app)
+    good = {'site': 'example.com', 'username': 'bob', 'typing_speed': 152.0, 'device_fingerprint': 'dev-1',
+            'location': 'US', 'access_time': '2025-11-28T09:30:00Z'}
+    bad = {'site': 'example.com', 'username': 'bob', 'typing_speed': 300.0, 'device_fingerprint': 'dev-9',
+           'location': 'RU', 'access_time': '2025-11-28T03:30:00Z'}
+    missing = {'site': 'example.com', 'username': 'nobody'}
+    r = client.post('/check/batch', json=[good, bad, missing])
+    assert r.status_code == 200
+    results = r.json()
+    assert results[0]['suspicious'] is False
+    assert results[1]['suspicious'] is True and results[1]['forwarded'] is True
+    assert 'error' in results[2]
+    assert len(forwarded) == 1
+    assert reporter.profiles.get('example.com', 'bob')['samples'] == 7
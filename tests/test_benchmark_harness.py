@@ -0,0 +1,37 @@
+import asyncio
+import copy
+
+from benchmarks.harness import Case, compare, run_case
+
+
+def test_run_case_records_latency_and_allocations():
+    data = list(range(300))
+
+    def setup():
+        return (lambda i: [data[i]] * 100), len(data)
+
+    result = run_case(Case('alloc', setup, warmup=10), alloc_ops=50)
+    assert result['ops'] == 290
+    lat = result['latency_us']
+    assert result['ops_per_sec'] > 0 and lat['p50'] <= lat['p95'] <= lat['p99'] <= lat['max']
+    assert result['alloc']['peak_bytes'] > 0
+
+    def async_setup():
+        async def op(i):
+            await asyncio.sleep(0)
+        return op, 20
+
+    assert run_case(Case('async', async_setup, warmup=5))['ops'] == 15
+
+
+def test_compare_flags_regressions_only_beyond_threshold():
+    base = {'results': {'x': {'ops_per_sec': 1000.0, 'latency_us': {'p99': 10.0}, 'alloc': {'peak_bytes': 1000}}}}
+    same = copy.deepcopy(base)
+    same['results']['x']['ops_per_sec'] = 900.0
+    assert compare(base, same, threshold=0.15) == []
+
+    slow = copy.deepcopy(base)
+    slow['results']['x']['ops_per_sec'] = 500.0
+    slow['results']['x']['latency_us']['p99'] = 30.0
+    slow['results']['x']['alloc']['peak_bytes'] = 100000
+    assert len(compare(base, slow, threshold=0.15)) == 3
@@ -0,0 +1,88 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from automated_reporter import main as reporter, storage
+from automated_reporter.locks import KeyedLocks
+
+
+@pytest.fixture
+def event(login_event):
+    # a reporter event: the profile reads the hour from an ISO access time
+    return lambda username, i: login_event(i, username, location='US', typing_speed=150.0 + i, device='fp-1',
+                                           access_time='2024-01-01T09:00:00Z', site='example.com')
+
+
+async def _post_all(requests):
+    transport = httpx.ASGITransport(app=reporter.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://reporter') as client:
+        responses = await asyncio.gather(*(client.post(url, json=body) for url, body in requests))
+    assert all(r.status_code == 200 for r in responses)
+    return responses
+
+
+def test_concurrent_add_event_for_new_users_loses_no_updates(tmp_path, monkeypatch, event):
+    # a small hot tier keeps evicting the new profiles, so most lookups are
+    # cold reads that other requests for the same user overlap with
+    store = storage.ProfileStore(str(tmp_path / 'profiles.db'), json_path=None, flush_interval=60,
+                                 max_cached=2)
+    monkeypatch.setattr(reporter, 'profiles', store)
+    users = [f'user{u}' for u in range(20)]
+    requests = [(f'/profiles/example.com/{u}/add_event', event(u, i)) for u in users for i in range(10)]
+    random.Random(3).shuffle(requests)
+
+    # each user's first request creates the profile the others fold into
+    asyncio.run(_post_all(requests))
+
+    for u in users:
+        assert store.get('example.com', u)['samples'] == 10
+    store.close()
+
+
+def test_concurrent_checks_on_evicted_profiles_apply_every_event(tmp_path, monkeypatch, event):
+    # two cached profiles for six users: most checks read their profile from
+    # SQLite (or the write-back buffer) in a worker thread, so requests for
+    # the same user overlap unless the user's lock spans the read
+    store = storage.ProfileStore(str(tmp_path / 'profiles.db'), json_path=None, flush_interval=60,
+                                 max_cached=2)
+    monkeypatch.setattr(reporter, 'profiles', store)
+    monkeypatch.setattr(reporter, 'forward_to_ai_backend', lambda report: True)
+    users = [f'user{u}' for u in range(6)]
+    for u in users:
+        store.put('example.com', u, storage.make_profile_from_events([event(u, 0)]))
+    store.flush()
+    store._cache.clear()
+    requests = [('/check', event(u, i)) for u in users for i in range(15)]
+    random.Random(5).shuffle(requests)
+
+    asyncio.run(_post_all(requests))
+
+    for u in users:
+        assert store.get('example.com', u)['samples'] == 16
+    store.close()
+
+
+def test_keyed_locks_serialise_each_key_without_deadlock():
+    locks = KeyedLocks(stripes=64)
+    inside = {}
+    most = {}
+
+    async def hold(key, keys=None):
+        async with (locks.hold(keys) if keys else locks.lock(key)):
+            inside[key] = inside.get(key, 0) + 1
+            most[key] = max(most.get(key, 0), inside[key])
+            await asyncio.sleep(0.005)
+            inside[key] -= 1
+
+    async def main():
+        # batches holding overlapping key sets in different orders must not deadlock
+        await asyncio.wait_for(asyncio.gather(
+            *(hold(k) for _ in range(10) for k in ('dave', 'erin')),
+            hold('batch1', ['dave', 'erin']), hold('batch2', ['erin', 'dave']),
+        ), 5)
+        return sum(inside.values())
+
+    assert asyncio.run(main()) == 0
+    assert most['dave'] == most['erin'] == 1
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import httpx
+
+from automated_reporter.forwarder import Forwarder, build_detector_payload
+
+
+def _report(i):
+    return {'username': f'user{i}', 'site': 'example.com', 'location': 'RU', 'typing_speed': 250.0,
+            'score': 0.7, 'reasons': ['Device fingerprint mismatch']}
+
+
+def test_reports_are_micro_batched_over_one_pool(tmp_path):
+    batches = []
+
+    def handler(request):
+        batches.append(json.loads(request.content))
+        return httpx.Response(200, json={'processed': len(batches[-1])})
+
+    async def scenario():
+        fwd = Forwarder('http://detector/api/login_events/batch', str(tmp_path / 'spill.ndjson'),
+                        batch_size=50, transport=httpx.MockTransport(handler))
+        await fwd.start()
+        for i in range(120):
+            fwd.submit(_report(i))
+        await fwd.stop()
+        return fwd.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert sum(len(b) for b in batches) == 120
+    assert max(len(b) for b in batches) <= 50 and len(batches) < 120
+    assert metrics['sent'] == 120 and metrics['queue_depth'] == 0
+
+
+def test_failed_batches_spill_to_disk_and_replay_on_recovery(tmp_path):
+    spill = tmp_path / 'spill.ndjson'
+    state = {'up': False, 'received': 0}
+
+    def handler(request):
+        if not state['up']:
+            return httpx.Response(503)
+        state['received'] += len(json.loads(request.content))
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        fwd = Forwarder('http://detector/api/login_events/batch', str(spill), batch_size=10, max_retries=1,
+                        backoff_base=0.001, max_queue=5, transport=httpx.MockTransport(handler))
+        await fwd.start()
+        for i in range(8):  # queue holds 5, the rest spill immediately
+            fwd.submit(_report(i))
+        await asyncio.sleep(0.2)
+        assert fwd.metrics()['spilled'] == 8
+        state['up'] = True
+        fwd.submit(_report(99))
+        await fwd.stop()
+        return fwd.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert state['received'] == 9
+    assert metrics['replayed'] == 8
+    assert not spill.exists() or spill.read_text() == ''
+
+
+def test_a_leftover_sending_file_is_replayed_on_start_and_trimmed_to_what_was_not_sent(tmp_path):
+    spill = tmp_path / 'spill.ndjson'
+    sending = tmp_path / 'spill.ndjson.sending'
+    sending.write_text(''.join(json.dumps(build_detector_payload(_report(i))) + '\n' for i in range(25)))
+    state = {'accept': 2, 'received': []}
+
+    def handler(request):
+        if not state['accept']:
+            return httpx.Response(503)
+        state['accept'] -= 1
+        state['received'].extend(p['username'] for p in json.loads(request.content))
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        fwd = Forwarder('http://detector/api/login_events/batch', str(spill), batch_size=10, max_retries=0,
+                        transport=httpx.MockTransport(handler))
+        await fwd.start()
+        await asyncio.sleep(0.1)
+        # the detector went away after two chunks: only the unsent five remain
+        assert [json.loads(line)['username'] for line in sending.read_text().splitlines()] == \
+            [f'user{i}' for i in range(20, 25)]
+        state['accept'] = 10
+        fwd.submit(_report(99))
+        await fwd.stop()
+        return fwd.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert state['received'] == [f'user{i}' for i in range(20)] + ['user99'] + [f'user{i}' for i in range(20, 25)]
+    assert metrics['replayed'] == 25
+    assert not sending.exists() and not spill.exists()
+
+
+def test_a_report_the_detector_fails_on_is_dropped_not_spilled(tmp_path):
+    received = []
+
+    def handler(request):
+        batch = json.loads(request.content)
+        if any(p['username'] == 'poison' for p in batch):
+            return httpx.Response(500)
+        received.extend(p['username'] for p in batch)
+        return httpx.Response(200, json={'summary': {'invalid': 0}})
+
+    async def scenario():
+        fwd = Forwarder('http://detector/api/login_events/batch', str(tmp_path / 'spill.ndjson'), batch_size=10,
+                        max_retries=1, backoff_base=0.001, transport=httpx.MockTransport(handler))
+        await fwd.start()
+        for i in range(5):
+            fwd.submit(_report(i))
+        fwd.submit(dict(_report(5), username='poison'))
+        await fwd.stop()
+        return fwd.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert sorted(received) == [f'user{i}' for i in range(5)]
+    assert (metrics['sent'], metrics['rejected'], metrics['spilled']) == (5, 1, 0)
+
+
+def test_detector_payload_carries_site_ip_and_a_clock_time():
+    payload = build_detector_payload(dict(_report(1), ip_address='203.0.113.7'))
+    assert (payload['site'], payload['ip_address']) == ('example.com', '203.0.113.7')
+    hour, minute = payload['access_time'].split(':')
+    assert len(hour) == len(minute) == 2
@@ -0,0 +1,105 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import geoip
+from geoip.build import build
+from automated_reporter import main as reporter
+from detection import LoginEvent, detect_anomaly, locate_events
+from records import SessionRecord
+
+CSV = """ip_start,ip_end,country,region
+1.0.0.0,1.0.0.255,AU,Queensland
+1.0.1.0,1.0.3.255,CN,Fujian
+1.0.4.0,1.0.7.255,CN,Fujian
+16843008,16843263,JP,Tokyo
+8.8.8.0/24,US,California
+1.0.2.0,1.0.2.9,XX,overlaps
+2001:db8::,2001:db8::ffff,DE,Berlin
+"""
+
+
+@pytest.fixture
+def db(tmp_path):
+    src = tmp_path / 'ranges.csv'
+    src.write_text(CSV)
+    stats = build([str(src)], str(tmp_path / 'geoip.bin'))
+    # the two touching Fujian ranges merge, the overlapping one is dropped
+    assert stats == {'ranges': 5, 'names': 5, 'dropped': 1}
+    db = geoip.open_database(str(tmp_path / 'geoip.bin'))
+    yield db
+    db.close()
+
+
+def test_lookup_ranges_boundaries_and_misses(db):
+    assert len(db) == 5
+    assert db.lookup('1.0.0.0') == ('AU', 'Queensland')
+    assert db.lookup('1.0.0.255') == ('AU', 'Queensland')
+    assert db.lookup('1.0.5.7') == ('CN', 'Fujian')
+    assert db.lookup('1.1.1.100') == ('JP', 'Tokyo')  # decimal-integer range
+    assert db.lookup('8.8.8.8') == ('US', 'California')
+    assert db.lookup('::ffff:8.8.8.8') == ('US', 'California')
+    assert db.lookup('2001:db8::42') == ('DE', 'Berlin')
+    assert db.lookup('0.0.0.1') is None
+    assert db.lookup('1.0.8.0') is None
+    assert db.lookup('255.255.255.255') is None
+    assert db.lookup('not an ip') is None
+    db.lookup('8.8.8.8')
+    assert db.lookup.cache_info().hits == 1
+
+
+def test_missing_or_foreign_files(tmp_path):
+    assert geoip.open_database(str(tmp_path / 'absent.bin')) is None
+    bogus = tmp_path / 'bogus.bin'
+    bogus.write_bytes(b'not a database at all')
+    with pytest.raises(ValueError):
+        geoip.GeoIPDatabase(str(bogus))
+
+
+def test_duplicate_and_overlapping_ranges_with_and_without_a_region(tmp_path):
+    path = str(tmp_path / 'geoip.bin')
+    stats = geoip.write_database([
+        ('1.0.0.0', '1.0.0.255', 'US', 'CA'),
+        ('1.0.0.0', '1.0.0.255', 'US', None),
+        ('1.0.0.128', '1.0.1.255', 'US', ''),
+        ('1.0.2.0', '1.0.2.255', 'FR', None),
+        ('1.0.2.0', '1.0.2.255', 'FR', 'Paris'),
+    ], path)
+    # the first of each duplicate wins, the overlapping range is dropped
+    assert stats['dropped'] == 3
+    db = geoip.open_database(path)
+    assert db.lookup('1.0.0.7') == ('US', 'CA')
+    assert db.lookup('1.0.1.7') is None
+    assert db.lookup('1.0.2.7') == ('FR', None)
+    db.close()
+
+
+@pytest.fixture
+def event(login_event):
+    return lambda **fields: LoginEvent(**login_event(1, **{'location': 'US', **fields}))
+
+
+def test_detector_locates_events_and_flags_mismatched_ip_country(db, event):
+    events = [event(ip_address='1.0.0.9', access_time='03:00'), event(location='', ip_address='8.8.8.8'), event()]
+    countries = locate_events(events, db)
+    assert countries == ['AU', 'US', None]
+    assert events[1].location == 'US'  # filled in from the IP
+
+    alert = detect_anomaly(events[0], SessionRecord('alice'), signals={'ip_country': 'AU'})
+    assert alert is not None and 'ip_location' in alert.risk_factors
+    assert 'IP address located in AU, not US' in alert.reasons
+    assert detect_anomaly(events[1], SessionRecord('alice'), signals={'ip_country': 'US'}) is None
+
+
+def test_reporter_check_uses_local_database(db, monkeypatch):
+    monkeypatch.setattr(reporter, 'geo_db', db)
+    monkeypatch.setattr(reporter, 'GEOIP_ENABLED', True)
+    monkeypatch.setattr(reporter, 'forward_to_ai_backend', lambda report: True)
+    client = TestClient(reporter.app)
+    base = {'site': 'example.com', 'username': 'geo-user', 'typing_speed': 150.0, 'location': 'California',
+            'device_fingerprint': 'fp', 'access_time': '2025-01-01T10:00:00Z'}
+    assert client.post('/profiles', json={'site': 'example.com', 'username': 'geo-user', 'events': [base]}).status_code == 200
+
+    home = client.post('/check', json={**base, 'ip_address': '8.8.8.8'}).json()
+    away = client.post('/check', json={**base, 'ip_address': '1.0.0.1'}).json()
+    assert not any(r.startswith('Geo-IP') for r in home['reasons'])
+    assert 'Geo-IP location AU/Queensland unusual' in away['reasons']
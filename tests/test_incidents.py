@@ -0,0 +1,79 @@
+import incidents
+import main as backend
+from automated_reporter import main as reporter
+from records import AlertRecord
+
+T0 = 1764324000 * 10 ** 6  # 2025-11-28T10:00:00Z
+
+
+def _alert(n, seconds, factors=('location', 'access_time'), score=0.6, username='mallory', severity='medium'):
+    action = 'lock_account' if severity == 'high' else 're_authenticate'
+    return AlertRecord(f'A-test-{n}', T0 + seconds * 10 ** 6, severity, score, username,
+                       [f'reason {f}' for f in factors], list(factors), action=action)
+
+
+def test_token_bucket_refills_and_sweeps_idle_keys():
+    bucket = incidents.TokenBucket(rate=1.0, burst=2, max_keys=2)
+    assert [bucket.allow('a', 0.0) for _ in range(3)] == [True, True, False]
+    assert bucket.allow('a', 0.5) is False
+    assert bucket.allow('a', 1.5) is True and bucket.allow('a', 1.5) is False
+    assert (bucket.allowed, bucket.limited) == (3, 3)
+    bucket.allow('b', 2.0)
+    # 'a' has refilled by t=10, so the sweep forgets it
+    bucket.allow('c', 10.0)
+    assert len(bucket) == 1
+
+
+def test_incident_window_closes_quiet_incidents():
+    closed = []
+    window = incidents.IncidentWindow(10.0, on_close=closed.append)
+    window.open('k1', 'first', 0.0)
+    window.open('k2', 'second', 5.0)
+    assert window.get('k1', 8.0) == 'first'  # seen again: now the newest
+    assert window.get('k2', 16.0) is None and closed == ['second']
+    assert window.get('k1', 17.0) == 'first'
+    assert window.get('k1', 30.0) is None and closed == ['second', 'first']
+
+
+def test_repeat_alerts_fold_into_one_incident(monkeypatch):
+    backend.alerts.clear()
+    monkeypatch.setattr(backend, 'open_incidents',
+                        incidents.IncidentWindow(300, on_close=backend._on_incident_closed))
+    monkeypatch.setattr(backend, 'alert_limiter', incidents.TokenBucket(rate=1 / 60, burst=2))
+    published = []
+    monkeypatch.setattr(backend.alert_broadcaster, 'publish', published.append)
+
+    first = _alert(0, 0)
+    assert backend.record_alert(first) is first
+    for i in range(1, 10):
+        assert backend.record_alert(_alert(i, i, score=0.6 + i / 100)) is first
+    assert list(backend.alerts) == [first]
+    data = first.dict()
+    assert (data['count'], data['score'], data['created_at'], data['last_seen']) == (
+        10, 0.69, '2025-11-28T10:00:00Z', '2025-11-28T10:00:09Z')
+    # the bucket (2 tokens) covered the new alert and one update; the rest wait for the incident to close
+    assert len(published) == 2 and 'A-test-0' in backend.unpublished_incidents
+
+    # a different risk-factor signature is a separate incident, but the user is out of tokens
+    assert backend.record_alert(_alert(20, 20, factors=('device_fingerprint',))) is None
+    # an alert that locks the account is always stored and published, tokens or not
+    lock = _alert(21, 21, factors=('device_fingerprint',), score=0.9, severity='high')
+    assert backend.record_alert(lock) is lock and backend.alerts.get('A-test-21') is lock
+    assert published[-1] == lock.json()
+    # once the incident goes quiet past the window, its final state goes out
+    backend.open_incidents.expire(first.last_us / 1e6 + 301)
+    assert not backend.unpublished_incidents
+    assert b'"count":10' in published[-1].encode()
+    backend.alerts.clear()
+
+
+def test_reporter_forwards_each_incident_once(monkeypatch):
+    monkeypatch.setattr(reporter, 'open_incidents', incidents.IncidentWindow(300))
+    monkeypatch.setattr(reporter, 'report_limiter', incidents.TokenBucket(rate=1 / 60, burst=2))
+    report = {'site': 'bank.example', 'username': 'mallory', 'score': 0.5, 'risk_factors': ['typing', 'device']}
+    assert [reporter.admit_report(dict(report, score=0.5 + i / 10)) for i in range(4)] == [True, False, False, False]
+    [incident] = reporter.list_incidents()
+    assert (incident['count'], incident['max_score']) == (4, 0.8)
+    other = dict(report, risk_factors=['location'])
+    third = dict(report, risk_factors=['ua'])
+    assert [reporter.admit_report(other), reporter.admit_report(third)] == [True, False]
@@ -0,0 +1,123 @@
+import asyncio
+import os
+
+import pytest
+
+import ingest
+import main as backend
+
+
+def test_decoders_reassemble_events_split_across_chunks(login_event):
+    events = [login_event(i) for i in range(50)]
+    for decoder, data in ((ingest.NDJSONDecoder(), ingest.encode_ndjson(events)),
+                          (ingest.LengthPrefixedDecoder(), ingest.encode_frames(events))):
+        out = []
+        for start in range(0, len(data), 37):
+            out.extend(decoder.feed(data[start:start + 37]))
+        assert out == events and decoder.errors == 0
+
+
+def test_decoders_skip_bad_events_and_reject_oversized_frames():
+    decoder = ingest.NDJSONDecoder()
+    assert decoder.feed(b'{"a": 1}\nnot json\n\n{"a": 2}\n{"a"') == [{'a': 1}, {'a': 2}]
+    assert decoder.errors == 1
+    assert decoder.feed(b': 3}\n') == [{'a': 3}]
+
+    assert isinstance(ingest.decoder_for(ingest.encode_frames([{}])), ingest.LengthPrefixedDecoder)
+    assert isinstance(ingest.decoder_for(b'{"a": 1}\n'), ingest.NDJSONDecoder)
+    with pytest.raises(ingest.FramingError):
+        ingest.LengthPrefixedDecoder(max_frame=16).feed(b'\x00\x00\x01\x00')
+    with pytest.raises(ingest.FramingError):
+        ingest.NDJSONDecoder(max_line=16).feed(b'x' * 32)
+
+
+def test_socket_server_keeps_each_connection_in_order(tmp_path):
+    path = str(tmp_path / 'ingest.sock')
+    received = []
+
+    async def handler(batch):
+        received.extend(batch)
+        await asyncio.sleep(0)
+
+    async def main():
+        server = ingest.IngestServer(handler, batch_size=100, max_pending=2)
+        await server.start_unix(path)
+        for encode, name in ((ingest.encode_ndjson, 'nd'), (ingest.encode_frames, 'lp')):
+            _, writer = await asyncio.open_unix_connection(path)
+            writer.write(encode([{'n': name, 'i': i} for i in range(1000)]) + b'garbage\n' * (name == 'nd'))
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        while server.stats['connections'] or server.stats['events'] < 2000:
+            await asyncio.sleep(0.01)
+        await server.drain()
+        info = server.info()
+        await server.stop()
+        return info
+
+    info = asyncio.run(main())
+    assert [e['i'] for e in received if e['n'] == 'nd'] == list(range(1000))
+    assert [e['i'] for e in received if e['n'] == 'lp'] == list(range(1000))
+    assert info['events'] == 2000 and info['parse_errors'] == 1 and info['connections_total'] == 2
+    assert not os.path.exists(path)
+
+
+def test_tail_follows_appends_and_rotation(tmp_path):
+    path = str(tmp_path / 'logins.ndjson')
+    with open(path, 'wb') as f:
+        f.write(ingest.encode_ndjson([{'i': -1}]))  # already there before the tail starts
+    received = []
+
+    async def handler(batch):
+        received.extend(e['i'] for e in batch)
+
+    async def wait_for(count):
+        while len(received) < count:
+            await asyncio.sleep(0.01)
+
+    async def main():
+        server = ingest.IngestServer(handler)
+        server.tail(path, poll_interval=0.01)
+        await asyncio.sleep(0.05)
+        with open(path, 'ab') as f:
+            f.write(ingest.encode_ndjson([{'i': 0}, {'i': 1}]) + b'{"i": ')
+            f.flush()
+            await asyncio.sleep(0.05)
+            f.write(b'2}\n')
+        await asyncio.wait_for(wait_for(3), 5)
+        os.rename(path, path + '.1')
+        with open(path, 'wb') as f:
+            f.write(ingest.encode_ndjson([{'i': 3}]))
+        await asyncio.wait_for(wait_for(4), 5)
+        await server.stop()
+
+    asyncio.run(main())
+    assert received == [0, 1, 2, 3]
+
+
+def test_backend_intake_drops_invalid_events_and_runs_the_rest(tmp_path, login_event):
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+    path = str(tmp_path / 'ingest.sock')
+    events = [login_event(1, 'ingest-user'), {'username': 'no-fields'},
+              login_event(3, 'ingest-user', access_time='25:99'),
+              login_event(2, 'ingest-user', location='RU', typing_speed=250.0, device='dev-2')]
+
+    async def main():
+        server = ingest.IngestServer(backend.ingest_events, validate=backend.ingest_server.validate)
+        await server.start_unix(path)
+        _, writer = await asyncio.open_unix_connection(path)
+        writer.write(ingest.encode_ndjson(events))
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+        while server.stats['connections'] or server.stats['events'] < len(events):
+            await asyncio.sleep(0.01)
+        await server.drain()
+        await server.stop()
+        return server.stats
+
+    stats = asyncio.run(main())
+    assert (stats['invalid'], stats['handler_errors']) == (2, 0)
+    assert backend.user_sessions['ingest-user'].locked
+    assert [a.username for a in backend.alerts] == ['ingest-user']
@@ -0,0 +1,39 @@
+import asyncio
+
+import httpx
+
+import main as backend
+from detection import LoginEvent
+from load_driver import run_load
+from synthetic_data import stream_events
+
+
+def setup_function():
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+
+
+def test_stream_is_seeded_and_labelled():
+    first = list(stream_events(2000, n_users=50, seed=3, attack_rate=0.05))
+    assert first == list(stream_events(2000, n_users=50, seed=3, attack_rate=0.05))
+    assert first != list(stream_events(2000, n_users=50, seed=4, attack_rate=0.05))
+    attacks = [e for e in first if e['is_attack']]
+    assert 50 < len(attacks) < 150
+    assert all(e['campaign'] for e in attacks)
+    assert [e['timestamp'] for e in first] == sorted(e['timestamp'] for e in first)
+    LoginEvent(**first[0])
+
+
+def test_load_driver_reports_latency_and_detection():
+    events = stream_events(400, n_users=40, seed=1, attack_rate=0.1)
+    transport = httpx.ASGITransport(app=backend.app)
+    [summary] = asyncio.run(run_load(events, rps=100000, targets={'backend': 'http://detector'}, warmup=100,
+                                     max_in_flight=32, transport=transport))
+    assert summary['requests'] == 300
+    assert summary['errors'] == 0
+    assert set(summary['statuses']) <= {'200', '403'}
+    lat = summary['latency_ms']
+    assert 0 < lat['p50'] <= lat['p95'] <= lat['p99'] <= lat['max']
+    confusion = summary['confusion']
+    assert sum(confusion.values()) == 300
+    assert confusion['tp'] > 0 and 0 < summary['recall'] <= 1
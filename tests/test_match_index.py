@@ -0,0 +1,61 @@
+import random
+
+from automated_reporter import storage
+from automated_reporter.match_index import compile_profile
+
+
+def _reference_ua_similarity(profile, user_agent):
+    def jaccard(a, b):
+        sa = set([t for t in a.lower().split() if len(t) > 2])
+        sb = set([t for t in b.lower().split() if len(t) > 2])
+        if not sa or not sb:
+            return 0.0
+        return len(sa & sb) / len(sa | sb)
+    return max([jaccard(ua, user_agent) for ua in profile['user_agents'] if ua] or [0.0])
+
+
+def test_compiled_lookups_match_list_scans():
+    rng = random.Random(3)
+    words = ['mozilla/5.0', 'windows', 'chrome/120', 'safari', 'linux', 'x86_64', 'mobile', 'ok']
+    for _ in range(300):
+        profile = {
+            'device_fingerprints': [f'd{rng.randint(0, 9)}' for _ in range(rng.randint(0, 4))],
+            'locations': rng.sample(['US', 'IN', 'UK'], rng.randint(0, 3)),
+            'user_agents': [' '.join(rng.sample(words, rng.randint(0, 5))) for _ in range(rng.randint(0, 4))],
+            'ip_addresses': rng.sample(['10.', '10.1.2.3', '192.168.', '', '8.8.8.8'], rng.randint(0, 3)),
+            'typical_hours': rng.sample(range(24), rng.randint(0, 5)),
+        }
+        compiled = compile_profile(profile)
+        ua = ' '.join(rng.sample(words, rng.randint(1, 5)))
+        assert compiled.best_ua_similarity(ua) == _reference_ua_similarity(profile, ua)
+        ip = rng.choice(['10.1.2.3', '10.9.9.9', '192.168.0.1', '8.8.8.8', '1.1.1.1'])
+        assert compiled.ip_matches(ip) == any(p and ip.startswith(p) for p in profile['ip_addresses'])
+        hour = rng.randint(0, 23)
+        assert compiled.hour_matches(hour) == (hour in profile['typical_hours'])
+        assert (f'd{hour % 10}' in compiled.devices) == (f'd{hour % 10}' in profile['device_fingerprints'])
+
+
+def test_index_follows_profile_updates_including_evictions(tmp_path):
+    store = storage.ProfileStore(str(tmp_path / 'profiles.db'), json_path=None, flush_interval=60)
+    store.put('example.com', 'alice', storage.make_profile_from_events([
+        {'device_fingerprint': 'd1', 'location': 'US', 'ip_address': '10.0.0.1',
+         'user_agent': 'Mozilla/5.0 Windows Chrome/120', 'access_time': '2025-11-28T09:00:00Z'},
+    ]))
+    compiled = store.compiled('example.com', 'alice')
+    event = {'device_fingerprint': 'd2', 'location': 'IN', 'ip_address': '172.16.0.9',
+             'user_agent': 'Mozilla/5.0 Linux Firefox/118', 'access_time': '2025-11-28T22:00:00Z'}
+    store.apply_event('example.com', 'alice', event)
+
+    assert store.compiled('example.com', 'alice') is compiled
+    assert compiled.devices == {'d1', 'd2'}
+    assert compiled.ip_matches('172.16.0.9')
+    assert compiled.best_ua_similarity('Mozilla/5.0 Linux Firefox/118') == 1.0
+
+    # enough new devices push d1 out of the bounded top-K set
+    for i in range(storage.TOP_K['device_fingerprints'] * 3):
+        store.apply_event('example.com', 'alice', {'device_fingerprint': f'new-{i}'})
+    fresh = compile_profile(store.get('example.com', 'alice'))
+    assert 'd1' not in compiled.devices
+    assert compiled.devices == fresh.devices
+    assert compiled.hour_mask == fresh.hour_mask
+    store.close()
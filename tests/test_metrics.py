@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+
+import main as backend
+from automated_reporter import main as reporter
+from telemetry import Registry
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry(prefix='t_')
+    hist = registry.histogram('latency_seconds', 'Latency', {'stage': 'a'}, buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        hist.observe(v)
+    registry.counter('events_total', 'Events').inc(3)
+    registry.gauge('depth', 'Depth', fn=lambda: 7)
+    text = registry.render()
+    assert '# TYPE t_latency_seconds histogram' in text
+    assert 't_latency_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{stage="a",le="1"} 2' in text
+    assert 't_latency_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 't_latency_seconds_count{stage="a"} 3' in text
+    assert 't_events_total 3' in text
+    assert 't_depth 7' in text
+
+    # the same name and labels return the same pre-allocated metric
+    assert registry.histogram('latency_seconds', 'Latency', {'stage': 'a'}) is hist
+    registry.enabled = False
+    hist.observe(0.01)
+    assert hist.count == 3
+
+
+def test_detector_metrics_endpoint():
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+    client = TestClient(backend.app)
+    client.post('/api/login_event', json={
+        'event_id': 'm-1', 'timestamp': '2025-11-28T10:00:00Z', 'username': 'metrics-user',
+        'device_fingerprint': 'dev-1', 'location': 'IN', 'typing_speed': 150.0, 'access_time': '10:00'})
+    r = client.get('/metrics')
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('text/plain')
+    assert 'detector_http_request_duration_seconds_count{method="POST",route="/api/login_event"}' in r.text
+    assert 'detector_stage_duration_seconds_count{stage="detect"}' in r.text
+    assert 'detector_events_total{result="ok"}' in r.text
+
+
+def test_reporter_metrics_endpoint():
+    client = TestClient(reporter.app)
+    event = {'site': 'metrics.example', 'username': 'u1', 'device_fingerprint': 'd1', 'typing_speed': 100.0,
+             'location': 'IN', 'access_time': '2025-11-28T10:00:00Z'}
+    client.post('/profiles', json={'site': 'metrics.example', 'username': 'u1', 'events': [event]})
+    assert client.post('/check', json=event).status_code == 200
+    reporter.profiles.flush()
+    text = client.get('/metrics').text
+    assert 'reporter_check_stage_duration_seconds_count{stage="score"} ' in text
+    assert 'reporter_checks_total{result="ok"}' in text
+    assert 'reporter_profile_flush_duration_seconds_count' in text
+    assert 'reporter_forward_queue_depth 0' in text
@@ -0,0 +1,70 @@
+import json
+import os
+
+import numpy as np
+
+from detection import LoginEvent, UserSession, detect_anomaly
+from ml_models import ModelHandle, UserBehaviorModel, load_model, save_model
+from ml_models.train import read_events
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _history():
+    events = []
+    for i in range(60):
+        events.append({'username': 'alice', 'typing_speed': 150.0 + (i % 7), 'location': 'IN',
+                       'device_fingerprint': 'dev-a', 'access_time': f'{9 + i % 3:02d}:15'})
+        events.append({'username': 'bob', 'typing_speed': 90.0 + (i % 5), 'location': 'US',
+                       'device_fingerprint': 'dev-b', 'access_time': f'{22 + i % 2:02d}:40'})
+    return events
+
+
+def test_train_roundtrip_and_batch_matches_scalar(tmp_path):
+    model = UserBehaviorModel.fit(_history(), meta={'version': 'v1'})
+    path = save_model(model, str(tmp_path / 'behavior.npz'))
+    loaded = load_model(path)
+    assert loaded.version == 'v1'
+
+    events = list(read_events(os.path.join(ROOT, 'synthetic_events.json'))) + _history()[:20] + [
+        {'username': 'alice', 'typing_speed': 260.0, 'location': 'RU', 'device_fingerprint': 'x',
+         'access_time': '03:00'},
+        {'username': 'mallory', 'typing_speed': None, 'location': None, 'access_time': 'bad'},
+    ]
+    scores, _ = loaded.score_batch(events)
+    assert np.allclose(scores, [loaded.score(e)[0] for e in events], rtol=0, atol=1e-12)
+    flags = [{k: v for k, v in verdict.items() if k != 'score'} for verdict in loaded.verdicts(events)]
+    assert flags == [{k: v for k, v in loaded.verdict(e).items() if k != 'score'} for e in events]
+
+    odd = loaded.verdict(events[-2])
+    assert odd['typing'] and odd['location'] and odd['hour']
+    assert not any(loaded.verdict(e)[k] for e in _history()[:20] for k in ('typing', 'location', 'hour'))
+
+
+def test_per_user_model_replaces_fixed_thresholds():
+    model = UserBehaviorModel.fit(_history())
+    # bob always logs in after 22:00; the fixed rule counts that against him, his model does not
+    event = LoginEvent(event_id='e1', timestamp='2025-11-28T23:40:00Z', username='bob',
+                       device_fingerprint='dev-b', location='RU', typing_speed=92.0, access_time='23:40')
+    assert detect_anomaly(event, UserSession(username='bob')).risk_factors == ['location', 'access_time']
+    verdict = model.verdict(event.dict())
+    assert verdict['location'] and not verdict['hour']
+    assert detect_anomaly(event, UserSession(username='bob'), verdict) is None
+
+
+def test_handle_hot_swaps_on_artifact_change(tmp_path):
+    path = str(tmp_path / 'behavior.npz')
+    handle = ModelHandle(path, check_interval=0)
+    assert handle.get() is None
+
+    save_model(UserBehaviorModel.fit(_history(), meta={'version': 'v1'}), path)
+    assert handle.get().version == 'v1'
+    save_model(UserBehaviorModel.fit(_history(), meta={'version': 'v2'}), path)
+    os.utime(path, ns=(1, 1))  # make sure the stamp differs even on coarse clocks
+    assert handle.get().version == 'v2'
+
+    # a broken artifact keeps the last good model serving
+    with open(path, 'w') as f:
+        json.dump({}, f)
+    assert handle.get().version == 'v2'
+    assert handle.info()['last_error']
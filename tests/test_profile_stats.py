@@ -0,0 +1,63 @@
+import random
+import statistics
+
+from automated_reporter import storage
+
+
+def test_welford_matches_batch_statistics():
+    rng = random.Random(11)
+    values = [rng.gauss(160, 25) for _ in range(5000)]
+    profile = storage.make_profile_from_events([{'typing_speed': v} for v in values[:10]])
+    for v in values[10:]:
+        storage.update_profile_incremental(profile, {'typing_speed': v})
+    assert abs(profile['avg_typing_speed'] - statistics.fmean(values)) < 1e-9
+    assert abs(profile['std_typing_speed'] - statistics.pstdev(values)) < 1e-6
+
+
+def test_legacy_profile_is_seeded_from_its_mean_and_std():
+    profile = {'avg_typing_speed': 100.0, 'std_typing_speed': 10.0, 'samples': 4}
+    storage.update_profile_incremental(profile, {'typing_speed': 100.0})
+    assert profile['typing_samples'] == 5
+    assert abs(profile['std_typing_speed'] - (400.0 / 5) ** 0.5) < 1e-9
+
+
+def test_profile_size_and_typical_hours_stay_bounded():
+    rng = random.Random(5)
+    profile = storage.make_profile_from_events([])
+    for i in range(3000):
+        storage.update_profile_incremental(profile, {
+            'device_fingerprint': f'dev-{rng.randint(0, 500)}',
+            'location': rng.choice(['US', 'IN', 'UK', 'DE', 'FR', 'BR', 'JP', 'CN', 'RU', 'ZA']),
+            'access_time': f'2025-11-28T{rng.choice([9, 10, 11]):02d}:00:00Z',
+        })
+    assert len(profile['device_fingerprints']) == storage.TOP_K['device_fingerprints']
+    assert len(profile['locations']) == storage.TOP_K['locations']
+
+    # a single 3am login long ago is no longer "typical"
+    storage.update_profile_incremental(profile, {'access_time': '2025-11-28T03:00:00Z'})
+    for _ in range(200):
+        storage.update_profile_incremental(profile, {'access_time': '2025-11-28T10:00:00Z'})
+    assert 3 not in profile['typical_hours']
+    assert 10 in profile['typical_hours']
+
+
+def test_frequent_device_survives_churn():
+    profile = storage.make_profile_from_events([])
+    for i in range(1000):
+        event = {'device_fingerprint': 'laptop' if i % 2 == 0 else f'burner-{i}'}
+        storage.update_profile_incremental(profile, event)
+    assert 'laptop' in profile['device_fingerprints']
+
+
+def test_events_without_a_field_leave_its_counts_alone():
+    profile = storage.make_profile_from_events([
+        {'device_fingerprint': 'laptop', 'ip_address': '203.0.113.7', 'user_agent': 'Firefox',
+         'access_time': '2025-11-28T09:00:00Z'},
+    ])
+    before = {k: dict(profile[k + '_counts']) for k in ('ip_addresses', 'user_agents')}
+    hours = list(profile['hour_weights'])
+    for _ in range(500):
+        storage.update_profile_incremental(profile, {'device_fingerprint': 'laptop', 'access_time': 'noon'})
+    assert {k: profile[k + '_counts'] for k in before} == before
+    assert profile['hour_weights'] == hours
+    assert profile['device_fingerprints_counts']['laptop'] > 1.0
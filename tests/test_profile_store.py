@@ -0,0 +1,68 @@
+import json
+import time
+
+from automated_reporter import storage
+
+
+def test_only_dirty_profiles_are_written_and_reloaded(tmp_path):
+    legacy = tmp_path / 'profiles.json'
+    legacy.write_text(json.dumps({'example.com': {'alice': {'avg_typing_speed': 190.0, 'samples': 3}}}))
+    db = str(tmp_path / 'profiles.db')
+
+    store = storage.ProfileStore(db, json_path=str(legacy), flush_interval=60)
+    alice = store.get('example.com', 'alice')
+    assert alice['samples'] == 3
+    assert store.get('example.com', 'nobody') is None
+
+    storage.update_profile_incremental(alice, {'typing_speed': 200.0})
+    store.mark_dirty('example.com', 'alice')
+    store.put('other.org', 'bob', storage.make_profile_from_events([{'typing_speed': 120.0}]))
+    store.flush()
+    assert store.flushes == 1
+    store.flush()  # nothing dirty -> no write
+    assert store.flushes == 1
+    store.close()
+
+    reopened = storage.ProfileStore(db, json_path=str(legacy), flush_interval=60)
+    assert reopened.get('example.com', 'alice')['samples'] == 4
+    assert set(reopened.all()) == {'example.com', 'other.org'}
+    reopened.close()
+
+
+def test_dirty_threshold_triggers_background_flush(tmp_path):
+    store = storage.ProfileStore(str(tmp_path / 'profiles.db'), json_path=None, flush_interval=60, max_dirty=5)
+    for i in range(5):
+        store.put('example.com', f'user{i}', {'samples': i})
+    deadline = time.time() + 2
+    while store.flushes == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.flushes == 1
+    store.close()
+
+
+def test_hot_tier_is_bounded_and_writes_back_evicted_profiles(tmp_path):
+    db = str(tmp_path / 'profiles.db')
+    store = storage.ProfileStore(db, json_path=None, flush_interval=60, max_cached=2)
+    for i in range(3):
+        store.put('example.com', f'user{i}', {'samples': i})
+    # user0 was least recently used: evicted while still dirty, so held for write-back
+    assert store.cache_size() == 2
+    assert store.cache_stats()['writeback_pending'] == 1
+    user0 = store.get('example.com', 'user0')
+    assert user0 == {'samples': 0} and store.misses == 1
+    store.apply_event('example.com', 'user0', {'typing_speed': 90.0})
+
+    store.flush()
+    assert store.cache_stats()['writeback_pending'] == 0
+    # evicting clean profiles just drops them; they are re-read from SQLite
+    for i in range(3):
+        assert store.get('example.com', f'user{i}') is not None
+    stats = store.cache_stats()
+    assert stats['cached'] == 2 and stats['evictions'] >= 3 and stats['hits'] >= 1
+    store.close()
+
+    reopened = storage.ProfileStore(db, json_path=None, flush_interval=60, max_cached=1)
+    assert reopened.get('example.com', 'user0')['samples'] == 1
+    assert [reopened.get('example.com', f'user{i}')['samples'] for i in (1, 2)] == [1, 2]
+    assert reopened.cache_size() == 1
+    reopened.close()
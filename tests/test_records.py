@@ -0,0 +1,46 @@
+import json
+
+from detection import LoginEvent, detect_anomaly
+from records import AlertRecord, Codebook, SessionRecord, pack, unpack
+
+
+def test_alert_record_round_trips_the_api_payload():
+    data = {
+        'alert_id': 'A-20251128-abc123', 'created_at': '2025-11-28T10:00:00.123456Z', 'severity': 'high',
+        'score': 1.3, 'username': 'alice',
+        'reasons': ['Unusual login location: RU', 'Device fingerprint changed', 'Unusual access time: 03:00'],
+        'risk_factors': ['location', 'device_fingerprint', 'access_time'], 'status': 'new',
+        'action': 'lock_account', 'count': 3, 'last_seen': '2025-11-28T10:02:00Z',
+    }
+    record = AlertRecord.from_dict(data)
+    assert record.dict() == data
+    assert json.loads(record.json()) == data
+    assert record.to_model().dict() == data
+    assert record.created_ts == 1764324000.123456
+
+    # payloads stored before incidents were counted
+    old = AlertRecord.from_dict({k: v for k, v in data.items() if k not in ('count', 'last_seen')})
+    assert (old.count, old.last_seen) == (1, data['created_at'])
+
+    # unknown vocabulary is kept verbatim
+    odd = AlertRecord.from_dict(data | {'severity': 'critical', 'status': 'triaged', 'action': None,
+                                        'created_at': '2025-11-28T10:00:00Z'})
+    assert (odd.severity, odd.status, odd.action, odd.created_at) == ('critical', 'triaged', None, '2025-11-28T10:00:00Z')
+
+
+def test_full_codebook_falls_back_to_strings():
+    book = Codebook(['a', 'b'], capacity=3)
+    assert unpack(book, pack(book, ['b', 'c', 'a'])) == ['b', 'c', 'a']
+    assert pack(book, ['a', 'd']) == ('a', 'd')
+    assert len(book) == 3
+
+
+def test_detection_uses_compact_records():
+    session = SessionRecord('bob', last_location='IN', last_device_fingerprint='dev-1')
+    event = LoginEvent(event_id='e1', timestamp='2025-11-28T10:00:00Z', username='bob', device_fingerprint='dev-2',
+                       location='RU', typing_speed=250.0, access_time='03:00')
+    alert = detect_anomaly(event, session)
+    assert isinstance(alert, AlertRecord)
+    assert alert.risk_factors == ['typing_speed', 'location', 'device_fingerprint', 'location_shift', 'access_time']
+    assert alert.reasons[3] == 'Sudden location shift from IN to RU'
+    assert SessionRecord.from_dict(session.dict()).dict() == session.dict()
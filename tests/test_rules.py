@@ -0,0 +1,112 @@
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import rules
+from automated_reporter import main as reporter
+from automated_reporter import scoring
+from detection import LoginEvent, UserSession, detect_anomaly
+from test_batch_scoring import _random_event, _random_profile
+
+SITE_RULES = {
+    'default': {'reporter': {'suspicious_below': 0.5}},
+    'sites': {
+        'bank.example': {
+            'detector': {'usual_locations': ['IN'], 'usual_hours': ['8-18'], 'weights': {'device_fingerprint': 0}},
+            'reporter': {'weights': {'device': 0.5, 'typing': 0.1}, 'ua_cutoff': 0.9},
+        },
+    },
+}
+
+
+@pytest.fixture
+def event(login_event):
+    return lambda **fields: LoginEvent(**login_event(1, location='US', typing_speed=120.0, device='dev-2',
+                                                     access_time='07:00', **fields))
+
+
+def test_site_rules_are_laid_over_the_defaults(event):
+    ruleset = rules.RuleSet(SITE_RULES)
+    bank, other = ruleset.detector('bank.example'), ruleset.detector('shop.example')
+    assert other is ruleset.detector(None) and other.usual_locations == {'IN', 'US', 'UK'}
+    assert bank.usual_locations == {'IN'} and bank.hour_mask == rules.hour_mask(range(8, 19))
+    assert bank.device_fingerprint == 0.0 and bank.location == 0.4
+    assert ruleset.reporter('bank.example').weights == (0.1, 0.5, 0.1, 0.15, 0.1, 0.05)
+    assert ruleset.reporter('bank.example').suspicious_below == 0.5
+    assert ruleset.sites == ['bank.example']
+
+    session = UserSession(username='alice', last_device_fingerprint='dev-1')
+    bank_event = event(site='bank.example')
+    alert = detect_anomaly(bank_event, session, rules=ruleset.detector(bank_event.site))
+    # location and hour only: the device rule is switched off for this site
+    assert alert.risk_factors == ['location', 'access_time']
+    assert alert.reasons == ['Unusual login location: US', 'Unusual access time: 07:00']
+    assert detect_anomaly(event(), session, rules=ruleset.detector(None)) is None
+
+
+def test_invalid_rules_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match='wieghts'):
+        rules.RuleSet({'default': {'detector': {'wieghts': {}}}})
+    with pytest.raises(ValueError, match='velocity'):
+        rules.RuleSet({'sites': {'a': {'detector': {'weights': {'velocity': 1}}}}})
+    with pytest.raises(ValueError):
+        rules.hour_mask([24])
+    assert rules.hour_mask(['22-1']) == (1 << 22) | (1 << 23) | 1 | 2
+    path = tmp_path / 'rules.json'
+    path.write_text('{"default": {"reporter": {"ua_cutoff": "high"}}}')
+    with pytest.raises(ValueError, match='rules.json'):
+        rules.load_rules(str(path))
+
+
+def test_handle_swaps_rules_when_the_file_changes(tmp_path):
+    path = tmp_path / 'rules.json'
+    handle = rules.RulesHandle(str(path), check_interval=0)
+    assert handle.get() is rules.DEFAULT_RULES
+
+    path.write_text(json.dumps(SITE_RULES))
+    first = handle.get()
+    assert first.sites == ['bank.example'] and handle.swaps == 1
+
+    # a broken edit keeps the previous rules serving
+    path.write_text('{"sites": ')
+    assert handle.get() is first and handle.info()['last_error'].startswith('ValueError')
+
+    path.write_text(json.dumps({'sites': {'shop.example': {}}}))
+    assert handle.get().sites == ['shop.example'] and handle.info()['last_error'] is None
+
+    path.unlink()
+    assert handle.get() is rules.DEFAULT_RULES
+
+
+def test_batch_scoring_with_mixed_site_rules_matches_single_events():
+    rng = random.Random(11)
+    ruleset = rules.RuleSet(SITE_RULES)
+    profiles = [_random_profile(rng) for _ in range(20)]
+    pairs = [(rng.choice(profiles), {**_random_event(rng), 'site': rng.choice(['bank.example', 'example.com'])})
+             for _ in range(500)]
+    batch_rules = [ruleset.reporter(e['site']) for _, e in pairs]
+    similarities, reasons = scoring.score_batch([p for p, _ in pairs], [e for _, e in pairs], rules=batch_rules)
+    for (profile, event), site_rules, similarity, batch_reasons in zip(pairs, batch_rules, similarities.tolist(),
+                                                                      reasons):
+        assert (similarity, batch_reasons) == scoring.score_event(profile, event, rules=site_rules)
+
+
+def test_reporter_applies_reloaded_site_thresholds(tmp_path, monkeypatch):
+    path = tmp_path / 'rules.json'
+    monkeypatch.setattr(reporter, 'rules_handle', rules.RulesHandle(str(path), check_interval=3600))
+    monkeypatch.setattr(reporter, 'forward_to_ai_backend', lambda report: None)
+    client = TestClient(reporter.app)
+    event = {'site': 'bank.example', 'username': 'rules-user', 'typing_speed': 100, 'device_fingerprint': 'dev-1',
+             'location': 'US', 'user_agent': 'Mozilla/5.0 Chrome/120.0', 'ip_address': '10.0.0.1',
+             'access_time': '2025-11-28T10:00:00Z'}
+    assert client.post('/profiles', json={**event, 'events': [event]}).status_code == 200
+    # new device only: similarity 0.75, which the default cutoff lets through
+    result = client.post('/check', json={**event, 'device_fingerprint': 'dev-8'}).json()
+    assert result['suspicious'] is False and result['similarity'] == 0.75
+
+    path.write_text(json.dumps({'sites': {'bank.example': {'reporter': {'suspicious_below': 0.8}}}}))
+    assert client.post('/rules/reload').json()['sites'] == ['bank.example']
+    result = client.post('/check', json={**event, 'device_fingerprint': 'dev-9'}).json()
+    assert result['suspicious'] is True and result['reasons'] == ['Device fingerprint mismatch']
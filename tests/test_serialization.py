@@ -0,0 +1,56 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main as backend
+from automated_reporter import main as reporter, storage
+from serialization import array_chunks, dumps, grouped_object_chunks
+
+
+def test_chunked_writers_produce_valid_json():
+    payloads = [dumps({'i': i}) for i in range(7)]
+    chunks = list(array_chunks(payloads, per_chunk=3))
+    assert len(chunks) > 1
+    assert json.loads(b''.join(chunks)) == [{'i': i} for i in range(7)]
+    rows = [('a.com', 'x', b'1'), ('a.com', 'y"', b'2'), ('b.com', 'z', b'3')]
+    assert json.loads(b''.join(grouped_object_chunks(rows, per_chunk=1))) == {
+        'a.com': {'x': 1, 'y"': 2}, 'b.com': {'z': 3}}
+    assert json.loads(b''.join(grouped_object_chunks([]))) == {}
+
+
+def test_alert_pages_are_streamed_from_cached_payloads():
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+    client = TestClient(backend.app)
+    created = []
+    for i in range(300):
+        r = client.post('/api/login_event', json={
+            'event_id': f'evt-{i}', 'timestamp': '2025-11-28T10:00:00Z', 'username': f'user{i}',
+            'device_fingerprint': 'dev-x', 'location': 'RU', 'typing_speed': 250.0, 'access_time': '03:00'})
+        created.append(r.json())
+    stored = backend.alerts.get(created[0]['alert_id'])
+    assert stored.payload() is stored.payload()
+
+    r = client.get('/api/alerts', params={'limit': 280, 'order': 'asc'})
+    assert r.json() == created[:280]
+    assert r.headers['x-next-cursor']
+    r = client.get('/api/alerts', params={'limit': 280, 'order': 'asc', 'cursor': r.headers['x-next-cursor']})
+    assert r.json() == created[280:] and 'x-next-cursor' not in r.headers
+
+
+def test_profiles_listing_streams_stored_and_cached_profiles(tmp_path, monkeypatch):
+    store = storage.ProfileStore(str(tmp_path / 'profiles.db'), json_path=None, flush_interval=60)
+    for i in range(12):
+        store.put('b.com' if i % 2 else 'a.com', f'user{i:02d}', {'samples': i})
+    store.flush()
+    # newer than the stored copy and not flushed yet
+    store.get('a.com', 'user00')['samples'] = 100
+    monkeypatch.setattr(reporter, 'profiles', store)
+
+    r = TestClient(reporter.app).get('/profiles')
+    data = r.json()
+    assert list(data) == ['a.com', 'b.com']
+    assert data['a.com']['user00'] == {'samples': 100}
+    assert sum(len(users) for users in data.values()) == 12
+    assert list(store.iter_payloads(page_size=5))[5][:2] == ('a.com', 'user10')
+    store.close()
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from detection import LoginEvent
+import sharding
+from sharding import ShardRouter, shard_for, shard_store_url
+
+
+@pytest.fixture
+def event(login_event):
+    return lambda *args, **kwargs: LoginEvent(**login_event(*args, **kwargs))
+
+
+def test_shard_mapping_is_stable():
+    assert shard_for('alice', 4) == shard_for('alice', 4)
+    assert {shard_for(f'user{i}', 4) for i in range(100)} == {0, 1, 2, 3}
+    assert shard_store_url('sqlite:///data/detector.db', 2) == 'sqlite:///data/detector.shard2.db'
+    assert shard_store_url('memory', 2) == 'memory'
+
+
+def test_router_keeps_per_user_lock_state(event):
+    router = ShardRouter(2)
+
+    async def scenario():
+        events = [
+            event(1, 'alice'),
+            event(2, 'bob'),
+            event(3, 'alice', location='RU', typing_speed=250.0, device='dev-2'),
+            event(4, 'alice'),
+            event(5, 'bob', location='US'),
+        ]
+        results = await router.process(events)
+        assert [status for status, _ in results] == ['ok', 'ok', 'alert', 'locked', 'ok']
+        assert results[2][1]['action'] == 'lock_account'
+        # a separate request still sees alice's lock on her shard
+        assert (await router.process([event(6, 'alice')]))[0][0] == 'locked'
+        assert await router.unlock('alice')
+        assert not await router.unlock('nobody')
+        sessions = await router.sessions()
+        assert set(sessions) == {'alice', 'bob'}
+        assert not sessions['alice']['locked']
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        router.close()
+
+
+def test_shard_batch_reports_events_it_cannot_evaluate(event):
+    sharding._init_worker('memory')
+    good = event(1, 'carol').dict()
+    results = sharding._process_batch([good, dict(good, access_time='never'), dict(good, event_id='evt-3')])
+    assert [status for status, _ in results] == ['ok', 'invalid', 'ok']
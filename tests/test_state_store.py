@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as backend
+from detection import AnomalyAlert
+from state_store import SQLiteStateStore
+
+
+def test_alerts_and_sessions_survive_restart(tmp_path, monkeypatch, attack_event):
+    path = str(tmp_path / 'detector.db')
+    monkeypatch.setattr(backend, 'state_store', SQLiteStateStore(path))
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+
+    client = TestClient(backend.app)
+    created = [client.post('/api/login_event', json=attack_event(i, f'user{i}')).json() for i in range(5)]
+    client.post('/api/unlock_account', params={'username': 'user0'})
+    backend.state_store.close()
+
+    # simulate a cold start against the same file
+    monkeypatch.setattr(backend, 'state_store', SQLiteStateStore(path))
+    backend.load_state()
+    assert [a.alert_id for a in backend.alerts] == [a['alert_id'] for a in created]
+    assert backend.user_sessions['user1'].locked
+    assert not backend.user_sessions['user0'].locked
+
+    # sequence numbers (and so cursors) continue where they left off
+    seq = backend.alerts.add(AnomalyAlert(**created[0] | {'alert_id': 'A-new'}))
+    assert seq == 6
+    backend.state_store.close()
+
+
+def test_retention_is_applied_to_the_log(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / 'detector.db'))
+    for seq in range(1, 11):
+        alert = AnomalyAlert(
+            alert_id=f'A-{seq}', created_at='2025-11-28T10:00:00Z', severity='high', score=1.0,
+            username='alice', reasons=[], risk_factors=[], status='new',
+        )
+        store.append_alert(seq, alert, keep_from=max(1, seq - 2))
+    store.flush()
+    assert [seq for seq, _ in store.load_alerts()] == [8, 9, 10]
+    assert [seq for seq, _ in store.load_alerts(limit=2)] == [9, 10]
+    store.close()
+
+
+def test_alerts_are_decoded_in_chunks_in_seq_order(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / 'detector.db'))
+    for seq in range(1, 11):
+        store.append_alert(seq, AnomalyAlert(
+            alert_id=f'A-{seq}', created_at='2025-11-28T10:00:00Z', severity='high', score=1.0,
+            username='alice', reasons=[], risk_factors=[], status='new',
+        ))
+    store.flush()
+    loaded = store.load_alerts(chunk_size=3)
+    assert [(seq, a['alert_id']) for seq, a in loaded] == [(seq, f'A-{seq}') for seq in range(1, 11)]
+    assert [seq for seq, _ in store.load_alerts(limit=4, chunk_size=3)] == [7, 8, 9, 10]
+    store.close()
+
+
+def test_max_age_retention_is_applied_to_the_log(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / 'detector.db'), max_age=3600)
+    for seq, created_at in enumerate(('2020-01-01T00:00:00Z', '2099-01-01T00:00:00Z'), 1):
+        store.append_alert(seq, AnomalyAlert(
+            alert_id=f'A-{seq}', created_at=created_at, severity='high', score=1.0,
+            username='alice', reasons=[], risk_factors=[], status='new',
+        ))
+    store.flush()
+    assert [seq for seq, _ in store.load_alerts()] == [2]
+    store.close()
+
+
+def test_a_failed_commit_is_reported_and_the_writer_keeps_going(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / 'detector.db'))
+    alert = AnomalyAlert(alert_id='A-1', created_at='2025-11-28T10:00:00Z', severity='high', score=1.0,
+                                 username='alice', reasons=[], risk_factors=[], status='new')
+    # not a valid row: the commit fails inside the writer thread
+    store._queue.put(('alert', 'not-a-seq', 'A-0', object(), 0, None))
+    with pytest.raises(sqlite3.Error):
+        store.flush()
+    assert store.failed_batches == 1
+    store.append_alert(1, alert)
+    store.flush()
+    assert [seq for seq, _ in store.load_alerts()] == [1]
+    store.close()
@@ -0,0 +1,68 @@
+import random
+
+from fastapi.testclient import TestClient
+
+import main as backend
+from travel import is_impossible_travel
+from windows import HyperLogLog, VelocityTracker, estimate_union
+
+
+def test_rates_slide_and_expire():
+    tracker = VelocityTracker(window=60, buckets=6, limits={'account_events': 3})
+    for i in range(4):
+        signals = tracker.observe('alice', 'dev-1', 1000.0 + i)
+    assert signals['account_events'] == 4 and signals['account_burst']
+    assert tracker.observe('bob', 'dev-2', 1055.0)['account_events'] == 1
+    # alice's slice has left the window; only bob's is still counted
+    assert tracker.observe('alice', 'dev-1', 1065.0)['account_events'] == 1
+    assert len(tracker) == 4
+    tracker.observe('carol', 'dev-3', 5000.0)
+    assert len(tracker) == 2
+    # too late for the window: reported, not counted
+    assert tracker.observe('carol', 'dev-3', 10.0)['account_events'] == 1
+
+
+def test_distinct_accounts_per_device():
+    tracker = VelocityTracker(window=600, buckets=10, limits={'device_accounts': 3})
+    for i in range(3):
+        assert not tracker.observe(f'user{i}', 'dev-x', 100.0 + i * 70)['shared_device']
+    signals = tracker.observe('user3', 'dev-x', 400.0)
+    assert signals['device_accounts'] == 4 and signals['shared_device']
+    assert tracker.observe('user3', 'dev-x', 401.0)['device_accounts'] == 4
+
+    rng = random.Random(1)
+    sketches = [HyperLogLog(10) for _ in range(4)]
+    for n in range(20000):
+        sketches[n % 4].add(rng.getrandbits(64))
+    assert sketches[0].registers is not None
+    assert abs(estimate_union(sketches) - 20000) < 20000 * 0.1
+
+
+def test_state_is_capped():
+    tracker = VelocityTracker(window=60, max_keys=10)
+    for i in range(100):
+        tracker.observe(f'user{i}', f'dev-{i}', 1.0)
+    assert len(tracker) == 10 and tracker.overflow == 190
+
+
+def test_travel_uses_event_time():
+    assert is_impossible_travel('IN', 'US', 600)
+    assert not is_impossible_travel('IN', 'US', 20 * 3600)
+    assert not is_impossible_travel('FR', 'BE', 0)
+    assert is_impossible_travel('IN', 'XX', 0) is None
+
+    backend.alerts.clear()
+    backend.user_sessions.clear()
+    client = TestClient(backend.app)
+
+    def login(i, location, timestamp):
+        return client.post('/api/login_event', json={
+            'event_id': f'evt-{i}', 'timestamp': timestamp, 'username': 'traveller', 'device_fingerprint': 'dev-t',
+            'location': location, 'typing_speed': 150.0, 'access_time': '10:00'}).json()
+
+    login(1, 'IN', '2025-11-28T00:00:00Z')
+    # a day later the trip is plausible, so only the (fixed-rule) location counts
+    assert login(2, 'US', '2025-11-29T00:00:00Z') == {'result': 'ok'}
+    alert = login(3, 'DE', '2025-11-29T01:00:00Z')
+    assert 'impossible_travel' in alert['risk_factors']
+    assert backend.user_sessions['traveller'].dict()['last_seen'] == '2025-11-29T01:00:00Z'